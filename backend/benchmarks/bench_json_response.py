@@ -0,0 +1,92 @@
+"""
+Chat-history response encoding benchmark.
+
+Compares the previous path for a chat response (FastAPI's ``jsonable_encoder``
+followed by ``JSONResponse``'s ``json.dumps``) with ``utils.json_response.dumps``
+(orjson when installed), then reports the bytes on the wire uncompressed,
+gzip and brotli (when installed) plus the CPU time each encoding adds.
+
+Run from ``backend/``:
+    python -m benchmarks.bench_json_response --messages 50,500,5000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from middleware.compression import brotli, compress
+from utils.json_response import dumps, orjson
+
+
+def history_payload(messages: int) -> dict:
+    start = datetime(2025, 1, 31, 9, 0, 0)
+    texts = [
+        "How many students are enrolled in Computer Science this semester?",
+        "There are 412 students in Computer Science. Would you like the list of recent admissions?",
+        "add student name: Ayesha Khan, id 1042, age 19, department Computer Science, email ayesha@example.edu",
+    ]
+    return {
+        "thread_id": "bench-thread",
+        "response": texts[1],
+        "history": [
+            {
+                "id": str(ObjectId()),
+                "thread_id": "bench-thread",
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": texts[i % len(texts)],
+                "timestamp": start + timedelta(seconds=37 * i),
+            }
+            for i in range(messages)
+        ],
+    }
+
+
+def cpu_per_call(fn, min_seconds: float = 0.3) -> float:
+    """CPU seconds per call, looping until at least `min_seconds` of CPU time."""
+    calls = 0
+    start = time.process_time()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.process_time() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def previous_render(payload: dict) -> bytes:
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=lambda v: [int(n) for n in v.split(",") if n], default=[50, 500, 5000])
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson else 'stdlib json (install orjson for the fast path)'}; "
+          f"brotli: {'yes' if brotli else 'not installed'}")
+    for messages in args.messages:
+        payload = history_payload(messages)
+        body = dumps(payload)
+        assert json.loads(body) == json.loads(previous_render(payload))
+
+        old = cpu_per_call(lambda: previous_render(payload))
+        new = cpu_per_call(lambda: dumps(payload))
+        print(f"\n{messages} messages, {len(body):,} bytes JSON")
+        print(f"  jsonable_encoder + json.dumps  {old * 1e3:9.3f} ms CPU")
+        print(f"  json_response.dumps            {new * 1e3:9.3f} ms CPU   ({old / new:.1f}x faster)")
+        for coding in ("gzip", "br"):
+            if coding == "br" and brotli is None:
+                continue
+            compressed = compress(body, coding)
+            cost = cpu_per_call(lambda: compress(body, coding))
+            print(f"  {coding:<4} {len(compressed):>12,} bytes on the wire ({len(compressed) / len(body):6.1%})"
+                  f"   +{cost * 1e3:.3f} ms CPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Password hashing throughput benchmark.
+
+Measures bcrypt verifications per second (one verification == one login)
+in-thread versus through the process pool in ``utils.auth_utils``, and reports
+logins/sec per core so BCRYPT_ROUNDS and PASSWORD_POOL_WORKERS can be sized.
+
+Run from ``backend/``:
+    BCRYPT_ROUNDS=12 python -m benchmarks.bench_password_pool --logins 64
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from utils import auth_utils
+from utils.auth_utils import (
+    BCRYPT_ROUNDS,
+    PASSWORD_POOL_WORKERS,
+    PasswordPoolBusy,
+    hash_password,
+    verify_password,
+    verify_password_async,
+)
+
+PASSWORD = "correct horse battery staple"
+
+
+def bench_inline(hashed: str, logins: int) -> float:
+    start = time.perf_counter()
+    for _ in range(logins):
+        assert verify_password(PASSWORD, hashed)
+    return time.perf_counter() - start
+
+
+async def bench_pool(hashed: str, logins: int) -> tuple[float, int]:
+    """Fire all logins at once; returns (elapsed, shed_count)."""
+    async def one():
+        try:
+            assert await verify_password_async(PASSWORD, hashed)
+            return 0
+        except PasswordPoolBusy:
+            return 1
+
+    # Warm the pool so process start-up is not counted
+    await verify_password_async(PASSWORD, hashed)
+    start = time.perf_counter()
+    shed = sum(await asyncio.gather(*(one() for _ in range(logins))))
+    return time.perf_counter() - start, shed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+
+    hashed = hash_password(PASSWORD)
+    cores = os.cpu_count() or 1
+    print(f"bcrypt rounds={BCRYPT_ROUNDS} workers={PASSWORD_POOL_WORKERS} "
+          f"queue_limit={auth_utils.PASSWORD_QUEUE_LIMIT} cores={cores}")
+
+    inline = bench_inline(hashed, args.logins)
+    print(f"  in-thread      {args.logins / inline:8.1f} logins/s  (1 core)")
+
+    elapsed, shed = asyncio.run(bench_pool(hashed, args.logins))
+    done = args.logins - shed
+    rate = done / elapsed
+    print(f"  process pool   {rate:8.1f} logins/s  {rate / min(cores, PASSWORD_POOL_WORKERS):8.1f} logins/s/core"
+          f"  shed={shed}")
+    auth_utils.shutdown_password_pool()
+
+
+if __name__ == "__main__":
+    main()
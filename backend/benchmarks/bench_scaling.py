@@ -0,0 +1,220 @@
+"""
+Dataset-size scaling benchmark.
+
+For each dataset size, loads seeded synthetic ``students`` / ``chats`` /
+``signup`` data (``benchmarks.synthetic``) and measures every analytics
+endpoint, the thread list, the ``read_students`` tool and a chat turn (with its
+history queries broken out from the chat trace). For each it reports p50/p95 latency
+over ``--repeat`` calls and the peak Python memory allocated by one call
+(tracemalloc, measured in a separate pass so tracing does not skew latency).
+Response caches are cleared before every call. Set CHAT_STORAGE=bucketed to
+measure the bucketed chat layout (``db.chats``).
+
+Backends:
+    memory  in-memory stand-in (``mongomock``), fine for CI-sized sweeps; it
+            ignores indexes, so sorted reads scale linearly there
+    mongod  a real server; the ``--db`` database is dropped and reloaded per size
+
+Run from ``backend/``:
+    python -m benchmarks.bench_scaling --sizes 1000,10000 --repeat 10
+    python -m benchmarks.bench_scaling --backend mongod --uri mongodb://localhost:27017 \\
+        --sizes 10000,100000,1000000 --csv scaling.csv --plot scaling.png
+"""
+import argparse
+import asyncio
+import csv
+import time
+import tracemalloc
+
+ENDPOINTS = {
+    "dashboard": "/analytics/analytics/dashboard",
+    "total-students": "/analytics/analytics/total-students",
+    "students-by-department": "/analytics/analytics/students-by-department",
+    "students/recent": "/analytics/analytics/students/recent?limit=20",
+    "active_last_7_days": "/analytics/analytics/students/active_last_7_days?limit=100",
+    "active_last_7_days/count": "/analytics/analytics/students/active_last_7_days?count_only=true",
+    "trends": "/analytics/analytics/trends",
+    "chats (thread list)": "/students/chats?limit=20",
+}
+CHAT_STAGES = ("load_context", "load_history")
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    from benchmarks.loadtest import percentile
+    return percentile(sorted_values, q)
+
+
+class Target:
+    """One measured operation: `call` is awaited once per sample."""
+
+    def __init__(self, name: str, call):
+        self.name = name
+        self.call = call
+
+
+def build_targets(client, env, seed: int) -> list[Target]:
+    from benchmarks.synthetic import SYNTHETIC_OWNER
+    from routes.analytics import analytics_cache
+    from utils.auth_utils import create_access_token
+    from utils.tracing import TOOL_FUNCTIONS
+
+    # The thread list is per user; synthetic threads all belong to one
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': SYNTHETIC_OWNER})}"}
+
+    def uncached_get(path):
+        async def call():
+            analytics_cache.invalidate()
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+        return call
+
+    targets = [Target(name, uncached_get(path)) for name, path in ENDPOINTS.items()]
+
+    read_students = TOOL_FUNCTIONS.get("read_students")
+    if read_students is not None:
+        async def call_read_students():
+            result = read_students()
+            if result["Error"]:
+                raise RuntimeError(result["Message"])
+        targets.append(Target("tool:read_students", call_read_students))
+
+    async def chat_turn():
+        response = await client.post(f"/students/chat/thread-{seed}-1", json={"user_input": "What are the cafeteria timings?"})
+        response.raise_for_status()
+    targets.append(Target("chat_turn", chat_turn))
+    return targets
+
+
+async def measure(target: Target, repeat: int) -> dict:
+    await target.call()  # warm-up
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await target.call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    tracemalloc.start()
+    try:
+        await target.call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def chat_stage_timings(db, since) -> dict[str, dict]:
+    """p50/p95 of the chat history spans recorded by chat turns since `since`."""
+    stages: dict[str, list[float]] = {name: [] for name in CHAT_STAGES}
+    for trace in db["chat_traces"].find({"started_at": {"$gte": since}}, {"spans": 1}):
+        for s in trace["spans"]:
+            if s["name"] in stages:
+                stages[s["name"]].append(s["duration_ms"])
+    out = {}
+    for name, values in stages.items():
+        values.sort()
+        out[f"chat:{name}"] = {
+            "p50_ms": round(_percentile(values, 50), 3),
+            "p95_ms": round(_percentile(values, 95), 3),
+            "peak_kib": None,
+        }
+    return out
+
+
+async def run_size(env, size: int, args) -> list[dict]:
+    from datetime import datetime
+
+    import httpx
+
+    from benchmarks.synthetic import populate
+
+    load = populate(env.db, size, int(size * args.chat_ratio), args.signups, args.seed, password_hash="synthetic")
+    print(f"size={size}: loaded in {sum(load.values()):.1f}s")
+
+    rows = []
+    started = datetime.utcnow()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=env.app), base_url="http://scaling", timeout=None) as client:
+        for target in build_targets(client, env, args.seed):
+            result = await measure(target, args.repeat)
+            rows.append({"size": size, "endpoint": target.name, **result})
+    for name, result in chat_stage_timings(env.db, started).items():
+        rows.append({"size": size, "endpoint": name, **result})
+
+    for row in rows:
+        peak = "-" if row["peak_kib"] is None else f"{row['peak_kib']:.1f}"
+        print(f"  {row['endpoint']:<28}p50={row['p50_ms']:10.3f}ms  p95={row['p95_ms']:10.3f}ms  peak={peak:>10} KiB")
+    return rows
+
+
+def plot(rows: list[dict], path: str) -> None:
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed; skipping the plot (the CSV has the same data)")
+        return
+
+    fig, (latency_ax, memory_ax) = plt.subplots(1, 2, figsize=(14, 6))
+    for endpoint in dict.fromkeys(row["endpoint"] for row in rows):
+        points = [row for row in rows if row["endpoint"] == endpoint]
+        sizes = [row["size"] for row in points]
+        latency_ax.plot(sizes, [row["p50_ms"] for row in points], marker="o", label=endpoint)
+        if points[0]["peak_kib"] is not None:
+            memory_ax.plot(sizes, [row["peak_kib"] for row in points], marker="o", label=endpoint)
+    for ax, label in ((latency_ax, "p50 latency (ms)"), (memory_ax, "peak allocation per call (KiB)")):
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("students / chat messages")
+        ax.set_ylabel(label)
+        ax.grid(True, which="both", alpha=0.3)
+    latency_ax.legend(fontsize="small")
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"plot written to {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("memory", "mongod"), default="memory")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="scaling_bench", help="mongod database to use (dropped per size)")
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in v.split(",") if s], default=[1000, 10000])
+    parser.add_argument("--chat-ratio", type=float, default=1.0, help="chat messages per student")
+    parser.add_argument("--signups", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", dest="csv_path")
+    parser.add_argument("--plot", dest="plot_path")
+    args = parser.parse_args()
+    if args.db == "hackathon_smit":
+        parser.error("refusing to overwrite the application database")
+
+    from benchmarks.standins import install
+
+    database = None
+    if args.backend == "mongod":
+        from pymongo import MongoClient
+        database = MongoClient(args.uri)[args.db]
+    env = install(seed=args.seed, database=database)
+
+    rows = []
+    for size in args.sizes:
+        rows.extend(asyncio.run(run_size(env, size, args)))
+
+    if args.csv_path:
+        with open(args.csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["size", "endpoint", "p50_ms", "p95_ms", "peak_kib"])
+            writer.writeheader()
+            writer.writerows(rows)
+    if args.plot_path:
+        plot(rows, args.plot_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Welcome email rendering benchmark.
+
+Compares the precompiled per-department path in ``email_utils.templates`` with
+the previous one (format the full HTML document and build a MIME tree for every
+send) over a batch of messages. No SMTP traffic is generated.
+
+Run from ``backend/``:
+    python -m benchmarks.bench_welcome_email --messages 10000
+"""
+import argparse
+import random
+import time
+from email import message_from_bytes
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from email_utils.email import (
+    GMAIL_USER,
+    WELCOME_FROM_NAME,
+    WELCOME_PHONE,
+    WELCOME_SITE_URL,
+    welcome_template,
+)
+from email_utils.templates import WELCOME_HTML_TEMPLATE, WELCOME_TEXT_TEMPLATE
+
+DEPARTMENTS = ["Computer Science", "Software Engineering", "Mathematics", "Physics", "Business", None]
+SENDER = f"{WELCOME_FROM_NAME} <{GMAIL_USER}>"
+
+
+def legacy_message(to_email: str, name: str, department: str | None) -> str:
+    """The pre-template path: full format of both bodies plus a fresh MIME tree."""
+    html_body = WELCOME_HTML_TEMPLATE.format(
+        name=name, department=department, site_url=WELCOME_SITE_URL, phone=WELCOME_PHONE
+    )
+    dept_line = f"You are added in the {department} department.\n" if department else "Your enrollment has been created.\n"
+    text_body = WELCOME_TEXT_TEMPLATE.format(
+        name=name, dept_line=dept_line, from_name=WELCOME_FROM_NAME, phone=WELCOME_PHONE, site_url=WELCOME_SITE_URL
+    )
+    msg = MIMEMultipart("alternative")
+    msg["From"] = SENDER
+    msg["To"] = to_email
+    msg["Subject"] = f"Welcome! You are added in {department}" if department else "Welcome to Admissions"
+    msg.attach(MIMEText(text_body, "plain"))
+    msg.attach(MIMEText(html_body, "html"))
+    return msg.as_string()
+
+
+def template_message(to_email: str, name: str, department: str | None) -> bytes:
+    return welcome_template.build_message(SENDER, to_email, name, department)
+
+
+def _batch(n: int, seed: int) -> list[tuple[str, str, str | None]]:
+    rng = random.Random(seed)
+    return [
+        (f"student{i}@example.com", f"Student {i}", rng.choice(DEPARTMENTS))
+        for i in range(n)
+    ]
+
+
+def _check_parity() -> None:
+    """Both paths must produce the same decoded bodies for plain names."""
+    for department in DEPARTMENTS:
+        legacy = message_from_bytes(legacy_message("a@example.com", "Ali Khan", department).encode())
+        fresh = message_from_bytes(template_message("a@example.com", "Ali Khan", department))
+        for old, new in zip(legacy.get_payload(), fresh.get_payload()):
+            assert old.get_payload(decode=True) == new.get_payload(decode=True), department
+        assert legacy["Subject"] == fresh["Subject"], department
+
+
+def _time(fn, batch) -> float:
+    start = time.perf_counter()
+    for to_email, name, department in batch:
+        fn(to_email, name, department)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    _check_parity()
+    batch = _batch(args.messages, args.seed)
+
+    results = {
+        "legacy (format + MIME)": _time(legacy_message, batch),
+        "precompiled template": _time(template_message, batch),
+    }
+    baseline = results["legacy (format + MIME)"]
+    print(f"{args.messages} messages, {len(DEPARTMENTS)} departments")
+    for label, elapsed in results.items():
+        per_msg = elapsed / args.messages * 1e6
+        print(f"  {label:<24} {elapsed:8.3f}s  {per_msg:8.1f} us/msg  x{baseline / elapsed:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
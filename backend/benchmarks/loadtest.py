@@ -0,0 +1,259 @@
+"""
+Offline end-to-end load test.
+
+Drives ``main.app`` in-process over httpx's ASGI transport with the stand-ins
+from ``benchmarks.standins`` (in-memory Mongo, fake LLM, SMTP sink). For every
+scenario and concurrency level it reports throughput, p50/p95/p99 latency,
+errors and Mongo operations per request.
+
+Scenarios:
+    chat       POST /students/chat/{thread_id}, a mix of questions and admissions
+    auth       POST /users/login for pre-registered accounts
+    analytics  the dashboard, totals, department breakdown and listings
+    mixed      60% chat, 10% auth, 30% analytics
+
+Run from ``backend/``:
+    python -m benchmarks.loadtest --concurrency 1,8,32 --requests 400 --llm-latency 0.3
+    python -m benchmarks.loadtest --scenarios chat --json results.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from collections import Counter
+
+DEPARTMENTS = ["Computer Science", "Software Engineering", "Mathematics", "Physics", "Business"]
+QUESTIONS = [
+    "What are the cafeteria timings?",
+    "How many students are in Computer Science?",
+    "Show me the details of student id 12",
+    "Which departments does the campus have?",
+    "What is the admission deadline?",
+]
+PASSWORD = "loadtest-password"
+ANALYTICS_PATHS = [
+    "/analytics/analytics/dashboard",
+    "/analytics/analytics/total-students",
+    "/analytics/analytics/students-by-department",
+    "/analytics/analytics/students/recent?limit=20",
+    "/analytics/analytics/students/active_last_7_days?count_only=true",
+]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+# ---------- Requests ----------
+class Traffic:
+    """Request builders sharing seeded randomness and unique ids."""
+
+    def __init__(self, seed: int, users: int, threads: int):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.threads = threads
+        self._ids = itertools.count(1_000_000)
+
+    async def chat(self, client):
+        thread_id = f"load-{self.rng.randrange(self.threads)}"
+        if self.rng.random() < 0.1:
+            student_id = next(self._ids)
+            text = (f"add student name: Load Tester, id {student_id}, age 20, "
+                    f"department {self.rng.choice(DEPARTMENTS)}, email load{student_id}@example.com")
+        else:
+            text = self.rng.choice(QUESTIONS)
+        return "chat", await client.post(f"/students/chat/{thread_id}", json={"user_input": text})
+
+    async def auth(self, client):
+        email = f"user{self.rng.randrange(self.users)}@example.com"
+        return "auth", await client.post("/users/login", json={"email": email, "password": PASSWORD})
+
+    async def analytics(self, client):
+        return "analytics", await client.get(self.rng.choice(ANALYTICS_PATHS))
+
+
+SCENARIOS = {
+    "chat": [("chat", 1)],
+    "auth": [("auth", 1)],
+    "analytics": [("analytics", 1)],
+    "mixed": [("chat", 6), ("auth", 1), ("analytics", 3)],
+}
+
+
+def _failed(response) -> bool:
+    if response.status_code >= 400:
+        return True
+    # Chat and user routes report failures in the body with a 200
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get("status") == "error"
+
+
+# ---------- Setup ----------
+async def seed_database(env, client, students: int, users: int, seed: int) -> None:
+    from datetime import datetime, timedelta
+
+    from db.counters import reconcile_counters
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    docs = []
+    for i in range(students):
+        created = now - timedelta(days=rng.randrange(120), seconds=rng.randrange(86400))
+        docs.append({
+            "id": i + 1,
+            "name": f"Student {i + 1}",
+            "age": rng.randrange(17, 30),
+            "email": f"student{i + 1}@example.com",
+            "department": rng.choice(DEPARTMENTS),
+            "created_at": created,
+            "last_active": created + timedelta(days=rng.randrange(30)),
+        })
+    if docs:
+        env.db["students"].insert_many(docs)
+    reconcile_counters(env.db)
+
+    for i in range(users):
+        response = await client.post(
+            "/users/register", json={"name": f"Load User {i}", "email": f"user{i}@example.com", "password": PASSWORD}
+        )
+        response.raise_for_status()
+
+
+# ---------- Run ----------
+async def run_level(client, traffic: Traffic, ops, mix, requests: int, concurrency: int) -> dict:
+    kinds = [kind for kind, weight in mix for _ in range(weight)]
+    plan = [traffic.rng.choice(kinds) for _ in range(requests)]
+    latencies: dict[str, list[float]] = {kind: [] for kind, _ in mix}
+    errors: Counter = Counter()
+    statuses: Counter = Counter()
+    queue = iter(plan)
+
+    async def worker():
+        for kind in queue:
+            start = time.perf_counter()
+            try:
+                _, response = await getattr(traffic, kind)(client)
+                failed = _failed(response)
+                statuses[response.status_code] += 1
+            except Exception:
+                failed = True
+                statuses["exception"] += 1
+            latencies[kind].append(time.perf_counter() - start)
+            if failed:
+                errors[kind] += 1
+
+    ops_before = ops.snapshot()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    ops_used = ops.snapshot() - ops_before
+
+    everything = sorted(itertools.chain.from_iterable(latencies.values()))
+    result = {
+        "concurrency": concurrency,
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "errors": sum(errors.values()),
+        "statuses": {str(code): n for code, n in statuses.items()},
+        "p50_ms": round(percentile(everything, 50) * 1000, 2),
+        "p95_ms": round(percentile(everything, 95) * 1000, 2),
+        "p99_ms": round(percentile(everything, 99) * 1000, 2),
+        "db_ops": sum(ops_used.values()),
+        "db_ops_per_request": round(sum(ops_used.values()) / requests, 2) if requests else 0.0,
+        "db_ops_by_collection": {f"{c}.{op}": n for (c, op), n in ops_used.most_common()},
+        "by_kind": {},
+    }
+    for kind, values in latencies.items():
+        values.sort()
+        result["by_kind"][kind] = {
+            "requests": len(values),
+            "errors": errors[kind],
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+    return result
+
+
+def print_result(scenario: str, result: dict) -> None:
+    print(f"{scenario:<10} c={result['concurrency']:<4} {result['throughput_rps']:9.1f} req/s  "
+          f"p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms  "
+          f"errors={result['errors']:<4} db_ops/req={result['db_ops_per_request']}  "
+          f"statuses={result['statuses']}")
+    if len(result["by_kind"]) > 1:
+        for kind, stats in result["by_kind"].items():
+            print(f"{'':<12}{kind:<10} n={stats['requests']:<5} p50={stats['p50_ms']:8.2f}ms "
+                  f"p95={stats['p95_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms errors={stats['errors']}")
+
+
+async def main_async(args) -> list[dict]:
+    import httpx
+
+    from benchmarks.standins import install
+
+    env = install(llm_latency=args.llm_latency, llm_jitter=args.llm_jitter,
+                  smtp_latency=args.smtp_latency, seed=args.seed)
+    from utils.auth_utils import shutdown_password_pool
+
+    results = []
+    transport = httpx.ASGITransport(app=env.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            await seed_database(env, client, args.students, args.users, args.seed)
+            traffic = Traffic(args.seed, args.users, args.threads)
+            for scenario in args.scenarios:
+                for concurrency in args.concurrency:
+                    # Warm-up pass so first-call costs (pools, caches) are not measured
+                    await run_level(client, traffic, env.ops, SCENARIOS[scenario], min(args.requests, concurrency * 2), concurrency)
+                    result = await run_level(client, traffic, env.ops, SCENARIOS[scenario], args.requests, concurrency)
+                    result["scenario"] = scenario
+                    print_result(scenario, result)
+                    results.append(result)
+    finally:
+        shutdown_password_pool()
+    print(f"emails captured by SMTP sink: {len(env.smtp.sent)}")
+    return results
+
+
+def _csv_ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=lambda v: v.split(","), default=list(SCENARIOS),
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=_csv_ints, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--students", type=int, default=500, help="students seeded before the run")
+    parser.add_argument("--users", type=int, default=10, help="accounts registered for the auth scenario")
+    parser.add_argument("--threads", type=int, default=50, help="distinct chat threads")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM latency, seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.02)
+    parser.add_argument("--smtp-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(main_async(args))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
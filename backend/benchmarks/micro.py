@@ -0,0 +1,302 @@
+"""
+Micro-benchmarks for the CPU-bound code on every request, with stored baselines.
+
+Each benchmark is a zero-argument callable timed with ``timeit`` (auto-ranged
+loop, best of ``--repeat`` runs, reported in ns per call). Timings are also
+divided by a fixed pure-Python calibration loop measured right before each
+benchmark, so a baseline taken on one machine stays comparable on another;
+``compare`` uses those normalized figures. The suite runs ``--rounds`` times
+and reports the median round; the spread between rounds is recorded too and
+widens the allowed slowdown, so a noisy benchmark needs a larger change to be
+flagged.
+
+Run from ``backend/``:
+    python -m benchmarks.micro run                     # print timings
+    python -m benchmarks.micro run --filter token      # only matching names
+    python -m benchmarks.micro save                    # refresh benchmarks/baselines/micro.json
+    python -m benchmarks.micro compare --threshold 0.20
+
+``compare`` exits with status 1 when any benchmark is slower than its baseline
+by more than the threshold plus that noise. Changes to the code measured here should include
+its output; refresh the baseline in the same commit when a change is expected
+to move the numbers.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import timeit
+import types
+from datetime import datetime, timedelta
+from typing import Callable
+from unittest import mock
+
+REPEAT = 7
+ROUNDS = 7
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+_benchmarks: dict[str, Callable] = {}
+_skipped: dict[str, str] = {}
+# Baseline entries excluded by --filter, so compare does not report them missing
+_filtered_out: set[str] = set()
+
+
+def benchmark(name: str):
+    def register(fn):
+        _benchmarks[name] = fn
+        return fn
+    return register
+
+
+def calibration():
+    total = 0
+    for i in range(1000):
+        total += i * i
+    return total
+
+
+# ---------- Suites ----------
+def _chat_samples() -> list[str]:
+    return [
+        "add student name: Ayesha Khan, id 1042, age 19, department Computer Science, email ayesha.khan@example.edu",
+        "Please register an admission for my name is John Smith roll no 77 age 21 email john@example.com",
+        "What are the cafeteria timings on Friday?",
+        "How many students are in the Mathematics department this semester?",
+    ]
+
+
+def register_extractors() -> None:
+    from routes import student_routes as sr
+
+    samples = _chat_samples()
+    extractors = {
+        "email": sr._extract_email,
+        "id": sr._extract_id,
+        "name": sr._extract_name,
+        "department": sr._extract_department,
+        "age": sr._extract_age,
+    }
+    for field, extract in extractors.items():
+        benchmark(f"extract_{field}")(lambda extract=extract: [extract(text) for text in samples])
+
+
+def register_tokens() -> None:
+    from utils import auth_utils
+
+    claims = {"email": "user@example.com", "name": "Bench User", "user_id": "652f0c0a9b1e8a3d4c2b1a00"}
+    token = auth_utils.create_access_token(claims)
+
+    def verify_uncached():
+        auth_utils._token_cache.clear()
+        return auth_utils.verify_access_token(token)
+
+    benchmark("create_access_token")(lambda: auth_utils.create_access_token(claims))
+    benchmark("verify_access_token_cached")(lambda: auth_utils.verify_access_token(token))
+    benchmark("verify_access_token_uncached")(verify_uncached)
+
+
+def register_welcome_email() -> None:
+    from email_utils.email import _build_welcome_html, _build_welcome_text
+
+    benchmark("welcome_html")(lambda: _build_welcome_html("Ayesha Khan", "Computer Science"))
+    benchmark("welcome_text")(lambda: _build_welcome_text("Ayesha Khan", "Computer Science"))
+
+
+def register_documents() -> None:
+    # Importing campus_faq builds the Groq client and the agent tool; neither is
+    # timed here, so stand in for them when they are not installed. The loader
+    # and splitter (langchain) are what load_documents measures and stay real.
+    stubs = {}
+    if importlib.util.find_spec("langchain_groq") is None:
+        stubs["langchain_groq"] = types.SimpleNamespace(ChatGroq=lambda **kwargs: None)
+    if importlib.util.find_spec("agents") is None:
+        stubs["agents"] = types.SimpleNamespace(function_tool=lambda fn: fn)
+    env = {} if os.getenv("GROQ_API_KEY") else {"GROQ_API_KEY": "benchmark"}
+    with mock.patch.dict(sys.modules, stubs), mock.patch.dict(os.environ, env):
+        from tools.campus_faq import load_documents
+
+    path = os.path.join(DATA_DIR, "cafeteria.txt")
+    benchmark("load_documents")(lambda: load_documents(path))
+
+
+def register_serialization() -> None:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from model.model import DashboardResponse, DepartmentCount, RecentStudents, StudentsByDeptResponse
+
+    now = datetime(2025, 1, 31, 12, 0, 0)
+    departments = [DepartmentCount(department=f"Department {i}", count=100 - i) for i in range(12)]
+    students = [
+        {"id": i, "name": f"Student {i}", "department": f"Department {i % 12}",
+         "email": f"student{i}@example.edu", "created_at": now - timedelta(hours=i)}
+        for i in range(50)
+    ]
+    dashboard = DashboardResponse(
+        total_students=5000, total_departments=12, departments=departments,
+        recent=RecentStudents(count=len(students), students=students), active_last_7_days=812, as_of=now,
+    )
+    by_department = StudentsByDeptResponse(results=departments, total_departments=12, total_students=5000, as_of=now)
+    history = {
+        "thread_id": "bench",
+        "response": "ok",
+        "history": [
+            {"id": f"{i:024x}", "thread_id": "bench", "role": "user" if i % 2 == 0 else "assistant",
+             "content": "How many students are in Computer Science? " * 3, "timestamp": now + timedelta(seconds=i)}
+            for i in range(100)
+        ],
+    }
+    dashboard_adapter = TypeAdapter(DashboardResponse)
+
+    # What FastAPI does for a response_model: validate, dump in JSON mode, json.dumps
+    benchmark("dashboard_response_model")(
+        lambda: json.dumps(dashboard_adapter.dump_python(dashboard_adapter.validate_python(dashboard), mode="json"))
+    )
+    benchmark("dashboard_model_dump_json")(dashboard.model_dump_json)
+    benchmark("by_department_model_dump_json")(by_department.model_dump_json)
+    benchmark("chat_history_jsonable_encoder")(lambda: json.dumps(jsonable_encoder(history)))
+
+
+SUITES = [register_extractors, register_tokens, register_welcome_email, register_documents, register_serialization]
+
+
+def register_all() -> None:
+    for suite in SUITES:
+        try:
+            suite()
+        except Exception as e:
+            # e.g. the RAG stack (langchain, GROQ_API_KEY) is not installed here
+            _skipped[suite.__name__.removeprefix("register_")] = f"{type(e).__name__}: {e}"
+
+
+# ---------- Runner ----------
+def time_call(fn, repeat: int) -> float:
+    """Best-of-`repeat` nanoseconds per call."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def _interquartile(values: list[float]) -> float:
+    if len(values) < 2:
+        return 0.0
+    q1, _, q3 = statistics.quantiles(values, n=4, method="inclusive")
+    return q3 - q1
+
+
+def run(name_filter: str | None, repeat: int, rounds: int = ROUNDS) -> dict:
+    """
+    Time every benchmark once per round. Each entry reports the median over
+    rounds (`ns`, `relative`), the best round (`min`) and `spread`, the
+    interquartile range of the rounds relative to the median: its noise.
+    """
+    register_all()
+    samples: dict[str, list[tuple[float, float]]] = {}
+    units = []
+    for _ in range(rounds):
+        for name, fn in _benchmarks.items():
+            if name_filter and not re.search(name_filter, name):
+                continue
+            # Calibrate next to each benchmark so CPU frequency drift cancels out
+            unit = time_call(calibration, 3)
+            ns = time_call(fn, repeat)
+            units.append(unit)
+            samples.setdefault(name, []).append((ns, ns / unit))
+    results = {}
+    for name, timings in samples.items():
+        relative = [r for _, r in timings]
+        median = statistics.median(relative)
+        results[name] = {
+            "ns": round(statistics.median(ns for ns, _ in timings), 1),
+            "relative": round(median, 4),
+            "min": round(min(relative), 4),
+            "spread": round(_interquartile(relative) / median, 4),
+        }
+    unit = statistics.median(units) if units else time_call(calibration, 3)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calibration_ns": round(unit, 1),
+        "rounds": rounds,
+        "repeat": repeat,
+        "results": results,
+        "skipped": dict(_skipped),
+    }
+
+
+def print_run(run_data: dict) -> None:
+    print(f"python {run_data['python']} {run_data['machine']}  calibration={run_data['calibration_ns']:.0f} ns")
+    for name, r in run_data["results"].items():
+        print(f"  {name:<34}{r['ns']:>14,.1f} ns   x{r['relative']:.4f}  ±{r['spread']:.0%}")
+    for suite, reason in run_data["skipped"].items():
+        print(f"  (skipped {suite}: {reason})")
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Return the names of benchmarks slower than baseline by more than
+    `threshold` plus the noise (the larger `spread` of the two runs), on both
+    the median and the best round.
+    """
+    regressions = []
+    print(f"{'benchmark':<34}{'baseline':>12}{'current':>12}{'change':>10}{'allowed':>10}")
+    for name, r in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<34}{'-':>12}{r['relative']:>12.4f}{'new':>10}")
+            continue
+        change = r["relative"] / base["relative"] - 1
+        best_change = r.get("min", r["relative"]) / base.get("min", base["relative"]) - 1
+        allowed = threshold + max(base.get("spread", 0.0), r.get("spread", 0.0))
+        flag = ""
+        if change > allowed and best_change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<34}{base['relative']:>12.4f}{r['relative']:>12.4f}{change:>+10.1%}{allowed:>10.0%}{flag}")
+    for name in baseline["results"]:
+        if name not in current["results"] and name not in _filtered_out:
+            print(f"{name:<34}{'':>12}{'missing':>12}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("run", "save", "compare"))
+    parser.add_argument("--filter", help="regex on benchmark names")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timeit runs per round; the best is kept")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="passes over the suite; the median is compared")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed slowdown for compare (0.20 = 20%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    current = run(args.filter, args.repeat, args.rounds)
+    if args.command == "run":
+        print_run(current)
+    elif args.command == "save":
+        if args.filter:
+            parser.error("save records the whole suite; drop --filter")
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print_run(current)
+        print(f"baseline written to {args.baseline}")
+    else:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if args.filter:
+            _filtered_out.update(name for name in baseline["results"] if not re.search(args.filter, name))
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
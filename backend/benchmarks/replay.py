@@ -0,0 +1,376 @@
+"""
+Record/replay benchmark over real chat transcripts.
+
+1. export  - dump stored chat threads (either ``db.chats`` layout) into a replay corpus
+             (JSONL, one thread per line: {"thread_id", "turns": [{"user", "assistant"}]}).
+2. record  - replay the corpus once against the real providers (Gemini via the
+             agents SDK, Groq for the RAG tool) and save every agent turn's LLM
+             calls and tool calls, plus every Groq prompt/answer, to a cassette.
+3. replay  - push the corpus through POST /students/chat/{thread_id} (so
+             ``chat_endpoint``, ``try_auto_add_student_from_text`` and the agent
+             tools all run) with the cassette standing in for the providers, and
+             report per-stage timing from the chat traces.
+
+Record and replay run against the in-memory Mongo from ``benchmarks.standins``,
+so each run starts from the same empty database and is deterministic. Agent
+turns are keyed by a hash of the messages sent to the agent; tools are executed
+for real with the recorded arguments, and LLM calls sleep for their recorded
+duration times ``--speed`` (0 measures our own code only).
+
+Run from ``backend/``:
+    python -m benchmarks.replay export --out corpus.jsonl --threads 200
+    python -m benchmarks.replay record --corpus corpus.jsonl --cassette cassette.json
+    python -m benchmarks.replay replay --corpus corpus.jsonl --cassette cassette.json --speed 0
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+from types import SimpleNamespace
+
+CASSETTE_VERSION = 1
+
+_steps: ContextVar["list | None"] = ContextVar("replay_steps", default=None)
+
+
+def turn_key(messages: list[dict]) -> str:
+    payload = json.dumps([[m.get("role"), m.get("content")] for m in messages], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def prompt_key(prompt) -> str:
+    return hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()[:32]
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    from benchmarks.loadtest import percentile
+    return percentile(sorted_values, q)
+
+
+# ---------- Corpus ----------
+def export_corpus(db, out_path: str, threads: int, since: datetime | None, min_turns: int) -> int:
+    """Write up to `threads` threads (in thread_id order) as replay corpus lines."""
+    from db.chats import get_chat_store
+
+    query: dict = {"role": {"$in": ["user", "assistant"]}}
+    if since:
+        query["timestamp"] = {"$gte": since}
+    cursor = get_chat_store(db).aggregate([
+        {"$match": query},
+        {"$sort": {"thread_id": 1, "timestamp": 1}},
+        {"$project": {"_id": 0, "thread_id": 1, "role": 1, "content": 1}},
+    ])
+
+    written = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        def flush(thread_id, turns):
+            nonlocal written
+            if thread_id is not None and len(turns) >= min_turns and written < threads:
+                out.write(json.dumps({"thread_id": thread_id, "turns": turns}, ensure_ascii=False) + "\n")
+                written += 1
+
+        current, turns = None, []
+        for doc in cursor:
+            if doc["thread_id"] != current:
+                flush(current, turns)
+                if written >= threads:
+                    break
+                current, turns = doc["thread_id"], []
+            if doc["role"] == "user":
+                turns.append({"user": doc["content"], "assistant": None})
+            elif turns and turns[-1]["assistant"] is None:
+                turns[-1]["assistant"] = doc["content"]
+        else:
+            flush(current, turns)
+    return written
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ---------- Cassettes ----------
+class Cassette:
+    """Agent turns keyed by `turn_key` and Groq calls keyed by `prompt_key`."""
+
+    def __init__(self, turns: dict | None = None, groq: dict | None = None):
+        self.turns = turns or {}
+        self.groq = groq or {}
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise SystemExit(f"{path}: unsupported cassette version {data.get('version')}")
+        return cls(data["turns"], data["groq"])
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": CASSETTE_VERSION, "turns": self.turns, "groq": self.groq}, f, ensure_ascii=False)
+
+
+def _append_step(step: dict) -> None:
+    steps = _steps.get()
+    if steps is not None:
+        steps.append(step)
+
+
+def attach_recorder(cassette: Cassette, student_routes) -> None:
+    """Wrap the real Runner, agent model, agent tools and Groq client."""
+    agent = student_routes.agent
+    real_runner = student_routes.Runner
+
+    model = agent.model
+    get_response = model.get_response
+
+    async def recorded_get_response(*args, **kwargs):
+        start = time.perf_counter()
+        response = await get_response(*args, **kwargs)
+        usage = getattr(response, "usage", None)
+        _append_step({
+            "kind": "llm",
+            "provider": "gemini",
+            "model": str(getattr(model, "model", "")),
+            "duration_ms": _elapsed_ms(start),
+            "prompt_tokens": getattr(usage, "input_tokens", None),
+            "completion_tokens": getattr(usage, "output_tokens", None),
+        })
+        return response
+
+    model.get_response = recorded_get_response
+
+    for tool in agent.tools:
+        def recorded_invoke(invoke, name):
+            async def on_invoke_tool(ctx, tool_input):
+                start = time.perf_counter()
+                try:
+                    return await invoke(ctx, tool_input)
+                finally:
+                    _append_step({"kind": "tool", "name": name, "input": tool_input, "duration_ms": _elapsed_ms(start)})
+            return on_invoke_tool
+
+        tool.on_invoke_tool = recorded_invoke(tool.on_invoke_tool, tool.name)
+
+    class RecordingRunner:
+        async def run(self, agent, messages):
+            token = _steps.set([])
+            try:
+                result = await real_runner.run(agent, messages)
+                cassette.turns[turn_key(messages)] = {
+                    "final_output": str(getattr(result, "final_output", "")),
+                    "steps": _steps.get(),
+                }
+                return result
+            finally:
+                _steps.reset(token)
+
+    student_routes.Runner = RecordingRunner
+
+    try:
+        from tools import campus_faq
+    except Exception:
+        return
+    groq = campus_faq.groq_llm
+
+    class RecordingChatModel:
+        model_name = groq.model_name
+
+        def invoke(self, prompt):
+            start = time.perf_counter()
+            response = groq.invoke(prompt)
+            cassette.groq[prompt_key(prompt)] = {
+                "content": response.content,
+                "usage_metadata": dict(getattr(response, "usage_metadata", None) or {}),
+                "duration_ms": _elapsed_ms(start),
+            }
+            return response
+
+    campus_faq.groq_llm = RecordingChatModel()
+
+
+def attach_player(cassette: Cassette, student_routes, speed: float) -> None:
+    """Replace the Runner and Groq client with cassette playback."""
+    from utils.tracing import TOOL_FUNCTIONS, record_usage, span
+
+    class CassetteRunner:
+        async def run(self, agent, messages):
+            entry = cassette.turns.get(turn_key(messages))
+            if entry is None:
+                cassette.misses += 1
+                return SimpleNamespace(final_output="(no cassette entry for this turn)")
+            for step in entry["steps"]:
+                seconds = step["duration_ms"] / 1000 * speed
+                if step["kind"] == "llm":
+                    with span(step["provider"], "llm", model=step.get("model", ""), replayed=True) as s:
+                        record_usage(s, step.get("prompt_tokens"), step.get("completion_tokens"))
+                        await asyncio.sleep(seconds)
+                elif step["name"] in TOOL_FUNCTIONS:
+                    arguments = json.loads(step["input"] or "{}")
+                    await asyncio.to_thread(TOOL_FUNCTIONS[step["name"]], **arguments)
+                else:
+                    # Tool stack not importable here: keep its recorded cost
+                    with span(step["name"], "tool", replayed=True):
+                        await asyncio.sleep(seconds)
+            return SimpleNamespace(final_output=entry["final_output"])
+
+    student_routes.Runner = CassetteRunner
+    student_routes.agent = student_routes.agent or object()
+    student_routes.AGENT_AVAILABLE = True
+
+    class CassetteChatModel:
+        model_name = "cassette"
+
+        def invoke(self, prompt):
+            entry = cassette.groq.get(prompt_key(prompt))
+            if entry is None:
+                cassette.misses += 1
+                return SimpleNamespace(content="(no cassette entry for this prompt)", usage_metadata={})
+            time.sleep(entry["duration_ms"] / 1000 * speed)
+            return SimpleNamespace(content=entry["content"], usage_metadata=entry["usage_metadata"])
+
+    try:
+        from tools import campus_faq
+        campus_faq.groq_llm = CassetteChatModel()
+    except Exception:
+        pass
+
+
+# ---------- Driving the corpus ----------
+async def drive(app, corpus: list[dict], concurrency: int) -> float:
+    """Threads run concurrently; turns within a thread run in order."""
+    import httpx
+
+    pending = iter(corpus)
+
+    async def worker(client):
+        for thread in pending:
+            for turn in thread["turns"]:
+                response = await client.post(f"/students/chat/{thread['thread_id']}", json={"user_input": turn["user"]})
+                response.raise_for_status()
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay", timeout=None) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def stage_report(db) -> dict:
+    """Per-stage latency from the chat traces written during the run."""
+    stages: dict[tuple, list[float]] = defaultdict(list)
+    turns: list[float] = []
+    handled_by: dict[str, int] = defaultdict(int)
+    for trace in db["chat_traces"].find({}, {"_id": 0, "duration_ms": 1, "handled_by": 1, "spans": 1}):
+        turns.append(trace["duration_ms"])
+        handled_by[trace.get("handled_by", "-")] += 1
+        for s in trace["spans"]:
+            stages[(s["kind"], s["name"])].append(s["duration_ms"])
+
+    def summary(values: list[float]) -> dict:
+        values.sort()
+        return {
+            "count": len(values),
+            "total_ms": round(sum(values), 3),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "max_ms": values[-1] if values else 0.0,
+        }
+
+    return {
+        "turns": summary(turns),
+        "handled_by": dict(handled_by),
+        "stages": {f"{kind}:{name}": summary(values) for (kind, name), values in sorted(stages.items())},
+    }
+
+
+def print_report(report: dict, elapsed: float, misses: int) -> None:
+    turns = report["turns"]
+    print(f"{turns['count']} turns in {elapsed:.2f}s  p50={turns['p50_ms']:.2f}ms p95={turns['p95_ms']:.2f}ms  "
+          f"handled_by={report['handled_by']}  cassette_misses={misses}")
+    print(f"  {'stage':<32}{'count':>7}{'total ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, s in sorted(report["stages"].items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"  {name:<32}{s['count']:>7}{s['total_ms']:>12.1f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['max_ms']:>10.2f}")
+
+
+# ---------- Commands ----------
+def cmd_export(args) -> None:
+    from db.db import get_db
+
+    since = datetime.fromisoformat(args.since) if args.since else None
+    written = export_corpus(get_db(), args.out, args.threads, since, args.min_turns)
+    print(f"{written} threads written to {args.out}")
+
+
+def cmd_record(args) -> None:
+    from benchmarks.standins import install
+
+    env = install(fake_llm=False)
+    from routes import student_routes
+
+    if not student_routes.AGENT_AVAILABLE:
+        raise SystemExit("recording needs the agents SDK and provider keys (GEMINI_API_KEY, GROQ_API_KEY)")
+    cassette = Cassette()
+    attach_recorder(cassette, student_routes)
+    elapsed = asyncio.run(drive(env.app, load_corpus(args.corpus), args.concurrency))
+    cassette.save(args.cassette)
+    print(f"recorded {len(cassette.turns)} agent turns and {len(cassette.groq)} Groq calls "
+          f"in {elapsed:.1f}s to {args.cassette}")
+
+
+def cmd_replay(args) -> None:
+    from benchmarks.standins import install
+
+    env = install()
+    from routes import student_routes
+
+    cassette = Cassette.load(args.cassette)
+    attach_player(cassette, student_routes, args.speed)
+    elapsed = asyncio.run(drive(env.app, load_corpus(args.corpus), args.concurrency))
+    report = stage_report(env.db)
+    print_report(report, elapsed, cassette.misses)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"elapsed_s": round(elapsed, 3), "cassette_misses": cassette.misses, **report}, f, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="dump chat threads into a replay corpus")
+    export.add_argument("--out", required=True)
+    export.add_argument("--threads", type=int, default=200)
+    export.add_argument("--since", help="ISO date; only messages from then on")
+    export.add_argument("--min-turns", type=int, default=1)
+    export.set_defaults(func=cmd_export)
+
+    record = commands.add_parser("record", help="run the corpus against real providers and save a cassette")
+    record.add_argument("--corpus", required=True)
+    record.add_argument("--cassette", required=True)
+    record.add_argument("--concurrency", type=int, default=1)
+    record.set_defaults(func=cmd_record)
+
+    replay = commands.add_parser("replay", help="run the corpus offline from a cassette")
+    replay.add_argument("--corpus", required=True)
+    replay.add_argument("--cassette", required=True)
+    replay.add_argument("--concurrency", type=int, default=1)
+    replay.add_argument("--speed", type=float, default=1.0, help="scale recorded provider latency (0 = none)")
+    replay.add_argument("--json", dest="json_path")
+    replay.set_defaults(func=cmd_replay)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
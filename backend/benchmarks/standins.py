@@ -0,0 +1,209 @@
+"""
+Local stand-ins for the services the API talks to, for offline benchmarks.
+
+- Mongo: an in-memory ``mongomock`` database patched in as ``db.db.get_db``,
+  with every collection call counted per (collection, operation).
+- LLM: ``FakeRunner`` replaces the agents ``Runner`` in the chat route and
+  ``FakeChatModel`` replaces the ``ChatGroq`` client of the RAG tool; both
+  sleep for a configurable, seeded latency.
+- SMTP: ``SmtpSink`` replaces ``smtplib.SMTP`` and keeps the sent messages.
+
+``install()`` must run before anything imports ``main`` or ``routes``, since
+those modules bind their database handle at import time. Needs the
+benchmark-only packages: ``pip install mongomock httpx``.
+"""
+import asyncio
+import os
+import random
+import smtplib
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+# Collection methods that reach the server with real pymongo
+COUNTED_OPERATIONS = (
+    "find", "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "find_one_and_update", "find_one_and_delete", "find_one_and_replace", "delete_one", "delete_many",
+    "aggregate", "count_documents", "estimated_document_count", "distinct", "bulk_write",
+)
+
+
+# ---------- Mongo ----------
+class OpCounter:
+    """Thread-safe (collection, operation) counts; nested calls count once."""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def snapshot(self) -> Counter:
+        with self._lock:
+            return Counter(self.counts)
+
+    def _wrap(self, name: str, method):
+        counter = self
+
+        def counted(collection, *args, **kwargs):
+            if getattr(counter._local, "depth", 0):
+                return method(collection, *args, **kwargs)
+            with counter._lock:
+                counter.counts[(collection.name, name)] += 1
+            counter._local.depth = 1
+            try:
+                return method(collection, *args, **kwargs)
+            finally:
+                counter._local.depth = 0
+
+        counted.__name__ = name
+        return counted
+
+
+def _patch_mongomock(counter: OpCounter) -> None:
+    from mongomock.collection import BulkOperationBuilder, Collection
+
+    for name in COUNTED_OPERATIONS:
+        setattr(Collection, name, counter._wrap(name, getattr(Collection, name)))
+
+    # pymongo >= 4.9 passes `sort=` to bulk update builders; mongomock predates it
+    add_update = BulkOperationBuilder.add_update
+
+    def add_update_compat(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    BulkOperationBuilder.add_update = add_update_compat
+
+
+# ---------- LLM ----------
+class Latency:
+    """Seeded latency distribution: `mean` seconds +/- `jitter` (uniform)."""
+
+    def __init__(self, mean: float, jitter: float = 0.0, seed: int = 0):
+        self.mean = mean
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            return max(0.0, self.mean + self._rng.uniform(-self.jitter, self.jitter))
+
+
+class FakeRunner:
+    """Stands in for ``agents.Runner``: waits, then answers from the last message."""
+
+    latency = Latency(0.0)
+    calls = 0
+
+    async def run(self, agent, messages):
+        FakeRunner.calls += 1
+        await asyncio.sleep(self.latency.sample())
+        last = messages[-1]["content"] if messages else ""
+        return SimpleNamespace(final_output=f"(fake agent) You asked: {last[:200]}")
+
+
+class FakeChatModel:
+    """Stands in for ``ChatGroq``: blocking ``invoke`` with token usage metadata."""
+
+    model_name = "fake-groq"
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        text = str(prompt)
+        return SimpleNamespace(
+            content="(fake groq) Based on the campus documents, here is what I found.",
+            usage_metadata={"input_tokens": len(text) // 4, "output_tokens": 16},
+        )
+
+
+# ---------- SMTP ----------
+class SmtpSink:
+    """Drop-in for ``smtplib.SMTP`` used as a context manager; keeps what was sent."""
+
+    sent: list[tuple[str, str, bytes]] = []
+    latency = Latency(0.0)
+    _lock = threading.Lock()
+
+    def __init__(self, host: str = "", port: int = 0, *args, **kwargs):
+        self.host = host
+        self.port = port
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def starttls(self, *args, **kwargs):
+        return (220, b"ready")
+
+    def login(self, user, password):
+        return (235, b"ok")
+
+    def sendmail(self, from_addr, to_addrs, msg, *args, **kwargs):
+        time.sleep(self.latency.sample())
+        with self._lock:
+            SmtpSink.sent.append((from_addr, to_addrs, msg))
+        return {}
+
+    def quit(self):
+        return (221, b"bye")
+
+
+# ---------- Installation ----------
+def install(llm_latency: float = 0.0, llm_jitter: float = 0.0, smtp_latency: float = 0.0,
+            seed: int = 0, quiet: bool = True, fake_llm: bool = True, database=None) -> SimpleNamespace:
+    """
+    Patch the stand-ins in, import the app and return
+    ``SimpleNamespace(app, db, ops, smtp, groq)``. With ``fake_llm=False`` the
+    real providers are kept (``groq`` is then None), e.g. to record cassettes.
+    Pass a pymongo ``database`` to run against a real mongod instead of the
+    in-memory store (``ops`` then stays empty).
+    """
+    import mongomock
+
+    # No real limits or noisy logs while generating load
+    os.environ.setdefault("RATE_LIMIT_LOGIN", "1000000000/1")
+    os.environ.setdefault("RATE_LIMIT_CHAT", "1000000000/1")
+    if quiet:
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    ops = OpCounter()
+    _patch_mongomock(ops)
+    if database is None:
+        database = mongomock.MongoClient()["hackathon_smit"]
+
+    import db.db
+    db.db.get_db = lambda: database
+
+    SmtpSink.latency = Latency(smtp_latency, seed=seed + 2)
+    smtplib.SMTP = SmtpSink
+
+    import main
+    from routes import student_routes
+
+    if not fake_llm:
+        db.db.ensure_indexes(database)
+        return SimpleNamespace(app=main.app, db=database, ops=ops, smtp=SmtpSink, groq=None)
+
+    FakeRunner.latency = Latency(llm_latency, llm_jitter, seed=seed)
+    student_routes.Runner = FakeRunner
+    student_routes.agent = student_routes.agent or object()
+    student_routes.AGENT_AVAILABLE = True
+
+    groq = FakeChatModel(Latency(llm_latency, llm_jitter, seed=seed + 1))
+    try:
+        from tools import campus_faq
+        campus_faq.groq_llm = groq
+    except Exception:
+        # RAG stack (langchain / GROQ_API_KEY) not available here; agent runs are faked anyway
+        pass
+
+    db.db.ensure_indexes(database)
+    return SimpleNamespace(app=main.app, db=database, ops=ops, smtp=SmtpSink, groq=groq)
@@ -0,0 +1,193 @@
+"""
+Seeded synthetic data for ``students``, ``chats`` and ``signup``.
+
+Documents have the shapes the app writes (``tools/student_tool.py``, the chat
+route and the user routes), so analytics, ``read_students`` and chat history
+queries see realistic data. The same seed always yields the same documents.
+Chat messages are stored in the layout CHAT_STORAGE selects (``db.chats``).
+Derived collections (``student_counters``, ``daily_trends``, ``threads``) are
+rebuilt after loading; every thread belongs to SYNTHETIC_OWNER.
+
+Load a local mongod (the target database is dropped first):
+    python -m benchmarks.synthetic --uri mongodb://localhost:27017 --db synthetic \\
+        --students 100000 --chats 1000000 --signups 10000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import groupby, islice
+
+FIRST_NAMES = ["Ali", "Sara", "Ahmed", "Fatima", "Usman", "Ayesha", "Bilal", "Zainab", "Hamza", "Maryam",
+               "John", "Emma", "Omar", "Hina", "Daniyal", "Noor", "Imran", "Sana", "Kamran", "Iqra"]
+LAST_NAMES = ["Khan", "Ahmed", "Malik", "Hussain", "Raza", "Sheikh", "Butt", "Chaudhry", "Iqbal", "Smith"]
+# (department, weight); None stands for records saved without a department
+DEPARTMENTS = [("Computer Science", 30), ("Software Engineering", 20), ("Mathematics", 10), ("Physics", 8),
+               ("Business Administration", 15), ("English", 7), ("Chemistry", 5), (None, 5)]
+USER_MESSAGES = [
+    "How many students are in {dept}?",
+    "Show me student id {n}",
+    "What are the cafeteria timings?",
+    "List the students who joined this week",
+    "add student name: {name}, id {n}, age 20, department {dept}, email {email}",
+    "Update the department of student {n} to {dept}",
+    "What is the library timing on Friday?",
+]
+ASSISTANT_MESSAGES = [
+    "There are {n} students in {dept}.",
+    "Student {n}: {name}, {dept}.",
+    "The cafeteria is open from 8 AM to 8 PM.",
+    "Here are the students who joined this week.",
+    "Student added successfully with id={n}. Department: {dept}.",
+    "The department has been updated.",
+    "The library is open from 9 AM to 5 PM on Fridays.",
+]
+MESSAGES_PER_THREAD = 12
+# user_id owning every synthetic thread, for listing them with a bearer token
+SYNTHETIC_OWNER = "synthetic-user"
+BATCH_SIZE = 5000
+
+
+def _department(rng: random.Random) -> str | None:
+    return rng.choices([d for d, _ in DEPARTMENTS], weights=[w for _, w in DEPARTMENTS])[0]
+
+
+def _name(rng: random.Random) -> tuple[str, str]:
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def students(count: int, seed: int = 0, now: datetime | None = None, days: int = 365):
+    """`count` student documents with ids 1..count, created over the last `days` days."""
+    rng = random.Random(f"students:{seed}")
+    now = now or datetime.utcnow()
+    for i in range(1, count + 1):
+        first, last = _name(rng)
+        created = now - timedelta(seconds=rng.randrange(days * 86400))
+        yield {
+            "id": i,
+            "name": f"{first} {last}",
+            "age": rng.randrange(17, 31),
+            "email": f"{first}.{last}{i}@example.edu".lower(),
+            "department": _department(rng),
+            "created_at": created,
+            # Most students stay active for a while after admission
+            "last_active": min(now, created + timedelta(seconds=rng.randrange(60 * 86400))),
+        }
+
+
+def chats(count: int, seed: int = 0, now: datetime | None = None, days: int = 90, students_count: int = 1000):
+    """`count` chat messages in threads of MESSAGES_PER_THREAD alternating user/assistant turns."""
+    rng = random.Random(f"chats:{seed}")
+    now = now or datetime.utcnow()
+    produced = 0
+    thread = 0
+    while produced < count:
+        thread += 1
+        thread_id = f"thread-{seed}-{thread}"
+        when = now - timedelta(seconds=rng.randrange(days * 86400))
+        for turn in range(MESSAGES_PER_THREAD):
+            if produced >= count:
+                return
+            first, last = _name(rng)
+            values = {
+                "dept": _department(rng) or "Computer Science",
+                "n": rng.randrange(1, max(students_count, 2)),
+                "name": f"{first} {last}",
+                "email": f"{first}.{last}@example.edu".lower(),
+            }
+            role = "user" if turn % 2 == 0 else "assistant"
+            template = rng.choice(USER_MESSAGES if role == "user" else ASSISTANT_MESSAGES)
+            when += timedelta(seconds=rng.randrange(2, 90))
+            yield {"thread_id": thread_id, "role": role, "content": template.format(**values), "timestamp": when}
+            produced += 1
+
+
+def signups(count: int, seed: int = 0, password_hash: str | None = None):
+    """`count` accounts sharing one password hash (hashing each would dominate load time)."""
+    if password_hash is None:
+        from utils.auth_utils import hash_password
+        password_hash = hash_password("synthetic-password")
+    rng = random.Random(f"signups:{seed}")
+    for i in range(count):
+        first, last = _name(rng)
+        yield {"name": f"{first} {last}", "email": f"user{i}.{first}@example.com".lower(), "password": password_hash}
+
+
+def _insert(collection, docs, batch_size: int) -> int:
+    inserted = 0
+    docs = iter(docs)
+    while True:
+        batch = list(islice(docs, batch_size))
+        if not batch:
+            return inserted
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+
+
+def populate(db, students_count: int = 0, chats_count: int = 0, signups_count: int = 0, seed: int = 0,
+             batch_size: int = BATCH_SIZE, password_hash: str | None = None) -> dict:
+    """
+    Replace `students`, `chats` and `signup` with synthetic data, rebuild the
+    derived collections and recreate the indexes. Returns load timings.
+    """
+    from db.chats import BUCKETS_COLLECTION, MESSAGES_COLLECTION, get_chat_store
+    from db.counters import COUNTERS_COLLECTION, reconcile_counters
+    from db.db import ensure_indexes
+    from db.threads import THREADS_COLLECTION, rebuild_threads
+    from db.trends import TRENDS_COLLECTION, backfill_trends
+
+    now = datetime.utcnow()
+    timings = {}
+    for name in ("students", MESSAGES_COLLECTION, BUCKETS_COLLECTION, "signup", COUNTERS_COLLECTION,
+                 TRENDS_COLLECTION, THREADS_COLLECTION, "chat_traces"):
+        db.drop_collection(name)
+    ensure_indexes(db)
+
+    start = time.perf_counter()
+    _insert(db["students"], students(students_count, seed, now), batch_size)
+    timings["students_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    messages = chats(chats_count, seed, now, students_count=students_count)
+    threads = ((thread_id, list(thread)) for thread_id, thread in groupby(messages, key=lambda m: m["thread_id"]))
+    get_chat_store(db).bulk_load(threads, batch_size)
+    timings["chats_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if signups_count:
+        _insert(db["signup"], signups(signups_count, seed, password_hash), batch_size)
+    timings["signup_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reconcile_counters(db)
+    backfill_trends(db, recount_archived_days=True)
+    rebuild_threads(db)
+    db[THREADS_COLLECTION].update_many({}, {"$set": {"owner": SYNTHETIC_OWNER}})
+    timings["derived_s"] = time.perf_counter() - start
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="synthetic", help="database to (re)create; never the app database")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--chats", type=int, default=100000)
+    parser.add_argument("--signups", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    if args.db == "hackathon_smit":
+        parser.error("refusing to overwrite the application database")
+
+    from pymongo import MongoClient
+
+    db = MongoClient(args.uri)[args.db]
+    timings = populate(db, args.students, args.chats, args.signups, args.seed, args.batch_size)
+    print(f"{args.db}: {args.students} students, {args.chats} chat messages, {args.signups} signups")
+    for name, seconds in timings.items():
+        print(f"  {name:<12}{seconds:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Chat retention: idle threads move to compressed cold storage.
+
+Threads without a message for CHAT_ARCHIVE_AFTER_DAYS leave the hot chat store
+(either `db.chats` layout) and become one compressed BSON blob each (zstd when
+`zstandard` is installed, else gzip):
+
+    collection  (default) `chat_archive`:
+                {"_id": thread_id, "codec", "blob", "messages", "first_ts",
+                 "last_ts", "archived_at"}
+    files       CHAT_ARCHIVE_DIR/<thread>.bson.<codec>
+
+Archives are purged CHAT_ARCHIVE_RETENTION_DAYS after archiving (TTL index; the
+archiver deletes old files), 0 keeps them. When an archived thread is reopened
+the chat route rehydrates it into the hot store first, so history reads are
+unchanged.
+
+The app runs a pass every CHAT_ARCHIVE_INTERVAL_SECONDS (0 disables); with
+several workers a lease lets one of them do it. Run one by hand with:
+    python -m db.chat_archive --dry-run
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+import bson
+from pymongo.errors import DuplicateKeyError
+
+from db.chats import get_chat_store
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "chat_archive"
+LEASES_COLLECTION = "leases"
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "30"))
+CHAT_ARCHIVE_RETENTION_DAYS = int(os.getenv("CHAT_ARCHIVE_RETENTION_DAYS", "365"))
+CHAT_ARCHIVE_BACKEND = os.getenv("CHAT_ARCHIVE_BACKEND", "collection")
+CHAT_ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", os.path.join("archive", "chats"))
+CHAT_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("CHAT_ARCHIVE_INTERVAL_SECONDS", "3600"))
+# Threads archived per pass; the next pass picks up the rest
+CHAT_ARCHIVE_BATCH = int(os.getenv("CHAT_ARCHIVE_BATCH", "1000"))
+
+
+# ---------- Encoding ----------
+def encode_thread(thread_id: str, messages: list[dict]) -> tuple[str, bytes, int]:
+    """(codec, compressed blob, uncompressed size)."""
+    raw = bson.encode({"thread_id": thread_id, "messages": messages})
+    if zstandard is not None:
+        return "zst", zstandard.ZstdCompressor(level=10).compress(raw), len(raw)
+    return "gz", gzip.compress(raw, compresslevel=9, mtime=0), len(raw)
+
+
+def decode_thread(codec: str, blob: bytes) -> list[dict]:
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("archive is zstd-compressed; install zstandard to read it")
+        raw = zstandard.ZstdDecompressor().decompress(blob)
+    else:
+        raw = gzip.decompress(blob)
+    return bson.decode(raw)["messages"]
+
+
+# ---------- Backends ----------
+class CollectionArchive:
+    def __init__(self, db):
+        self.collection = db[ARCHIVE_COLLECTION]
+
+    def ensure_indexes(self) -> None:
+        if CHAT_ARCHIVE_RETENTION_DAYS > 0:
+            self.collection.create_index(
+                "archived_at", name="archived_at_ttl", expireAfterSeconds=CHAT_ARCHIVE_RETENTION_DAYS * 86400
+            )
+
+    def put(self, thread_id: str, codec: str, blob: bytes, meta: dict) -> None:
+        self.collection.replace_one(
+            {"_id": thread_id}, {"codec": codec, "blob": blob, **meta, "archived_at": datetime.utcnow()}, upsert=True
+        )
+
+    def get(self, thread_id: str) -> tuple[str, bytes] | None:
+        doc = self.collection.find_one({"_id": thread_id}, {"codec": 1, "blob": 1})
+        return (doc["codec"], bytes(doc["blob"])) if doc else None
+
+    def contains(self, thread_id: str) -> bool:
+        return self.collection.find_one({"_id": thread_id}, {"_id": 1}) is not None
+
+    def delete(self, thread_id: str) -> None:
+        self.collection.delete_one({"_id": thread_id})
+
+    def purge(self) -> int:
+        return 0  # the TTL index does it
+
+
+class FileArchive:
+    def __init__(self, directory: str = CHAT_ARCHIVE_DIR):
+        self.directory = directory
+
+    def ensure_indexes(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, thread_id: str, codec: str) -> str:
+        # Fixed length whatever the thread id (file names are capped at 255 bytes)
+        name = hashlib.sha256(thread_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.bson.{codec}")
+
+    def put(self, thread_id: str, codec: str, blob: bytes, meta: dict) -> None:
+        path = self._path(thread_id, codec)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+
+    def get(self, thread_id: str) -> tuple[str, bytes] | None:
+        for codec in ("zst", "gz"):
+            try:
+                with open(self._path(thread_id, codec), "rb") as f:
+                    return codec, f.read()
+            except FileNotFoundError:
+                continue
+        return None
+
+    def contains(self, thread_id: str) -> bool:
+        return any(os.path.exists(self._path(thread_id, codec)) for codec in ("zst", "gz"))
+
+    def delete(self, thread_id: str) -> None:
+        for codec in ("zst", "gz"):
+            try:
+                os.remove(self._path(thread_id, codec))
+            except FileNotFoundError:
+                pass
+
+    def purge(self) -> int:
+        if CHAT_ARCHIVE_RETENTION_DAYS <= 0 or not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - CHAT_ARCHIVE_RETENTION_DAYS * 86400
+        removed = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+        return removed
+
+
+def get_archive(db, backend: str | None = None):
+    backend = backend or CHAT_ARCHIVE_BACKEND
+    if backend == "files":
+        return FileArchive()
+    if backend == "collection":
+        return CollectionArchive(db)
+    raise ValueError(f"CHAT_ARCHIVE_BACKEND must be collection or files, not {backend!r}")
+
+
+# ---------- Archive / rehydrate ----------
+def _thread_messages(store, archive, thread_id: str) -> list[dict]:
+    """The thread's hot messages merged with any archived ones, oldest first."""
+    merged = {}
+    stored = archive.get(thread_id)
+    if stored is not None:
+        merged = {m["id"]: m for m in decode_thread(*stored)}
+    for m in store.history(thread_id):
+        merged[m["id"]] = m
+    return sorted(merged.values(), key=lambda m: (m["timestamp"], m["id"]))
+
+
+def archive_idle_threads(store, archive, idle_days: int = CHAT_ARCHIVE_AFTER_DAYS, limit: int = CHAT_ARCHIVE_BATCH,
+                         dry_run: bool = False) -> dict:
+    """
+    Move up to `limit` threads idle for `idle_days` into `archive`. The thread
+    stays hot until its messages are archived and deleted, so a request never
+    rehydrates a half-archived thread; one that receives a message mid-pass is
+    rehydrated right away instead of counted. A thread that cannot be
+    archived (e.g. over the 16 MB document limit) is logged and left hot.
+    """
+    before = datetime.utcnow() - timedelta(days=idle_days)
+    report = {"threads": 0, "messages": 0, "raw_bytes": 0, "stored_bytes": 0, "failed": 0}
+    for thread_id, _ in store.idle_threads(before, limit):
+        try:
+            _archive_thread(store, archive, thread_id, report, dry_run)
+        except Exception:
+            logger.exception("Could not archive chat thread %s", thread_id)
+            report["failed"] += 1
+    return report
+
+
+def _archive_thread(store, archive, thread_id: str, report: dict, dry_run: bool) -> None:
+    messages = _thread_messages(store, archive, thread_id)
+    codec, blob, raw_size = encode_thread(thread_id, messages)
+    if not dry_run:
+        last_ts = messages[-1]["timestamp"]
+        archive.put(thread_id, codec, blob, {
+            "messages": len(messages),
+            "first_ts": messages[0]["timestamp"],
+            "last_ts": last_ts,
+        })
+        if not store.delete_thread(thread_id, last_ts):
+            # A message saved mid-pass found the thread still hot, so its request
+            # did not rehydrate; bring the archived history back here instead
+            rehydrate(store, archive, thread_id)
+            return
+    report["threads"] += 1
+    report["messages"] += len(messages)
+    report["raw_bytes"] += raw_size
+    report["stored_bytes"] += len(blob)
+
+
+def rehydrate(store, archive, thread_id: str) -> int:
+    """
+    Move an archived thread back into the hot store; returns the messages
+    restored (0 if not archived). Only archived messages missing from the
+    store are inserted, so messages saved meanwhile are kept.
+    """
+    stored = archive.get(thread_id)
+    if stored is None:
+        return 0
+    restored = store.restore(thread_id, decode_thread(*stored))
+    archive.delete(thread_id)
+    return restored
+
+
+# ---------- Background archiver ----------
+def _acquire_lease(db, name: str, seconds: float) -> bool:
+    """True if this process may run `name` for the next `seconds` (one worker wins)."""
+    now = datetime.utcnow()
+    try:
+        db[LEASES_COLLECTION].update_one(
+            {"_id": name, "until": {"$lt": now}},
+            {"$set": {"until": now + timedelta(seconds=seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False  # an unexpired lease exists, so the upsert collided with it
+    return True
+
+
+async def run_archiver(db, interval: float = CHAT_ARCHIVE_INTERVAL_SECONDS) -> None:
+    """Archive and purge every `interval` seconds; started from the app lifespan."""
+    store, archive = get_chat_store(db), get_archive(db)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await asyncio.to_thread(_acquire_lease, db, "chat_archiver", interval * 0.9):
+                continue
+            report = await asyncio.to_thread(archive_idle_threads, store, archive)
+            report["purged"] = await asyncio.to_thread(archive.purge)
+            if report["threads"] or report["purged"]:
+                logger.info("Archived idle chat threads", extra=report)
+        except Exception:
+            logger.exception("Chat archive pass failed")
+
+
+if __name__ == "__main__":
+    from db.db import get_db
+
+    parser = argparse.ArgumentParser(description="Archive idle chat threads")
+    parser.add_argument("--idle-days", type=int, default=CHAT_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--limit", type=int, default=CHAT_ARCHIVE_BATCH)
+    parser.add_argument("--dry-run", action="store_true", help="report what would be archived")
+    args = parser.parse_args()
+
+    db = get_db()
+    archive = get_archive(db)
+    archive.ensure_indexes()
+    report = archive_idle_threads(get_chat_store(db), archive, args.idle_days, args.limit, args.dry_run)
+    purged = 0 if args.dry_run else archive.purge()
+    ratio = report["stored_bytes"] / report["raw_bytes"] if report["raw_bytes"] else 0
+    print(f"{'would archive' if args.dry_run else 'archived'} {report['threads']} threads, "
+          f"{report['messages']} messages, {report['raw_bytes']:,} -> {report['stored_bytes']:,} bytes ({ratio:.1%})")
+    if purged:
+        print(f"purged {purged} expired archive files")
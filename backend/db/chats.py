@@ -0,0 +1,351 @@
+"""
+Chat message storage.
+
+Two layouts behind one repository, picked with CHAT_STORAGE:
+
+    messages  (default) one document per message in `chats`:
+              {"thread_id", "role", "content", "timestamp"}
+    bucketed  up to CHAT_BUCKET_SIZE messages per document in `chat_buckets`:
+              {"thread_id", "count", "first_ts", "last_ts", "open": true,
+               "messages": [{"id", "role", "content", "timestamp"}]}
+
+With buckets a thread costs one index entry per CHAT_BUCKET_SIZE messages, and
+its recent history is one or two document reads. Each thread has at most one
+`open` bucket (partial unique index); appends go there and close it once full.
+
+Both layouts find idle threads (for `db.chat_archive`) from the per-thread
+summaries `db.threads` keeps: summaries of threads with hot messages carry
+`hot: true`, and a partial index on (hot, last_activity) makes the lookup a
+bounded range read instead of a $group over every stored message.
+
+Copy existing messages into the other layout (per thread, safe to re-run; the
+source is kept unless --drop-source):
+    python -m db.chats migrate --to bucketed
+"""
+import abc
+import argparse
+import os
+from itertools import groupby
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+MESSAGES_COLLECTION = "chats"
+BUCKETS_COLLECTION = "chat_buckets"
+# Per-thread summaries, maintained by db.threads
+THREADS_COLLECTION = "threads"
+CHAT_STORAGE = os.getenv("CHAT_STORAGE", "messages")
+CHAT_BUCKET_SIZE = int(os.getenv("CHAT_BUCKET_SIZE", "50"))
+
+# Flattens buckets into the per-message shape, so one pipeline reads either layout
+_UNWIND_BUCKETS = [
+    {"$unwind": "$messages"},
+    {"$project": {
+        "_id": "$messages.id",
+        "thread_id": 1,
+        "role": "$messages.role",
+        "content": "$messages.content",
+        "timestamp": "$messages.timestamp",
+    }},
+]
+
+
+def _message_id(message: dict) -> ObjectId:
+    return ObjectId(message["id"]) if message.get("id") else ObjectId()
+
+
+def _message(doc: dict, thread_id: str, id_field: str) -> dict:
+    return {
+        "id": str(doc[id_field]),
+        "thread_id": thread_id,
+        "role": doc["role"],
+        "content": doc["content"],
+        "timestamp": doc["timestamp"],
+    }
+
+
+class _ChatStore(abc.ABC):
+    collection = None
+    summaries = None
+
+    @abc.abstractmethod
+    def _documents(self, thread_id: str, messages: list[dict]) -> list[dict]:
+        """Stored documents holding `messages` of one thread."""
+
+    @abc.abstractmethod
+    def save(self, thread_id: str, role: str, content: str, timestamp) -> str:
+        """Append a message; returns its id."""
+
+    @abc.abstractmethod
+    def recent(self, thread_id: str, limit: int) -> list[dict]:
+        """Last `limit` messages of the thread, oldest first."""
+
+    @abc.abstractmethod
+    def history(self, thread_id: str) -> list[dict]:
+        """Every message of the thread, oldest first."""
+
+    @abc.abstractmethod
+    def idle_threads(self, before, limit: int):
+        """(thread_id, last message time) of up to `limit` threads with no message since `before`."""
+
+    @abc.abstractmethod
+    def delete_thread(self, thread_id: str, up_to) -> bool:
+        """
+        Drop the thread's messages stamped at or before `up_to`; False when a
+        message arrived since, which leaves the thread hot.
+        """
+
+    def _idle_summaries(self, before, limit: int):
+        cursor = self.summaries.find(
+            {"hot": True, "last_activity": {"$lt": before}}, {"last_activity": 1}
+        ).sort("last_activity", 1).limit(limit)
+        for doc in cursor:
+            yield doc["_id"], doc["last_activity"]
+
+    def _mark_cold(self, thread_id: str, up_to) -> bool:
+        # Unless a message arrived since, the thread has nothing hot left
+        result = self.summaries.update_one(
+            {"_id": thread_id, "last_activity": {"$lte": up_to}}, {"$unset": {"hot": ""}}
+        )
+        return result.matched_count > 0
+
+    def load_thread(self, thread_id: str, messages: list[dict]) -> None:
+        """Replace a thread's stored messages (migrations; safe to repeat)."""
+        self.collection.delete_many({"thread_id": thread_id})
+        if messages:
+            self.collection.insert_many(self._documents(thread_id, messages))
+
+    def restore(self, thread_id: str, messages: list[dict]) -> int:
+        """
+        Add those of `messages` the thread does not hold yet (by id), leaving
+        stored ones and concurrent appends alone; returns the number added.
+        """
+        stored = {m["id"] for m in self.history(thread_id)}
+        missing = [m for m in messages if m["id"] not in stored]
+        if not missing:
+            return 0
+        documents = self._documents(thread_id, missing)
+        for doc in documents:
+            doc.pop("open", None)  # appends keep going to the thread's own open bucket
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Restored concurrently by another request; anything else is a real failure
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+        return len(missing)
+
+    def bulk_load(self, threads, batch_size: int = 5000) -> int:
+        """Insert (thread_id, messages) pairs into an empty store in batches; returns messages loaded."""
+        batch, loaded = [], 0
+        for thread_id, messages in threads:
+            batch.extend(self._documents(thread_id, messages))
+            loaded += len(messages)
+            if len(batch) >= batch_size:
+                self.collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            self.collection.insert_many(batch, ordered=False)
+        return loaded
+
+
+class MessageChatStore(_ChatStore):
+    """One document per message in `chats`."""
+
+    collection_name = MESSAGES_COLLECTION
+
+    def __init__(self, db):
+        self.collection = db[MESSAGES_COLLECTION]
+        self.summaries = db[THREADS_COLLECTION]
+
+    def ensure_indexes(self) -> None:
+        # _id breaks timestamp ties (millisecond precision) in insertion order
+        self.collection.create_index([("thread_id", 1), ("timestamp", 1), ("_id", 1)], name="thread_timestamp")
+
+    def save(self, thread_id: str, role: str, content: str, timestamp) -> str:
+        result = self.collection.insert_one(
+            {"thread_id": thread_id, "role": role, "content": content, "timestamp": timestamp}
+        )
+        return str(result.inserted_id)
+
+    def recent(self, thread_id: str, limit: int) -> list[dict]:
+        """Last `limit` messages of the thread, oldest first."""
+        if not limit:
+            return []  # limit(0) would mean no limit
+        cursor = self.collection.find({"thread_id": thread_id}).sort([("timestamp", -1), ("_id", -1)]).limit(limit)
+        return [_message(doc, thread_id, "_id") for doc in cursor][::-1]
+
+    def history(self, thread_id: str) -> list[dict]:
+        cursor = self.collection.find({"thread_id": thread_id}).sort([("timestamp", 1), ("_id", 1)])
+        return [_message(doc, thread_id, "_id") for doc in cursor]
+
+    def aggregate(self, pipeline: list[dict]):
+        """Run `pipeline` over messages shaped {_id, thread_id, role, content, timestamp}."""
+        return self.collection.aggregate(pipeline)
+
+    def threads(self):
+        """(thread_id, messages oldest first) for every thread, in thread_id order."""
+        cursor = self.collection.find({}).sort([("thread_id", 1), ("timestamp", 1), ("_id", 1)])
+        for thread_id, docs in groupby(cursor, key=lambda doc: doc["thread_id"]):
+            yield thread_id, [_message(doc, thread_id, "_id") for doc in docs]
+
+    def idle_threads(self, before, limit: int):
+        return self._idle_summaries(before, limit)
+
+    def delete_thread(self, thread_id: str, up_to) -> bool:
+        self.collection.delete_many({"thread_id": thread_id, "timestamp": {"$lte": up_to}})
+        return self._mark_cold(thread_id, up_to)
+
+    def _documents(self, thread_id: str, messages: list[dict]) -> list[dict]:
+        return [
+            {"_id": _message_id(m), "thread_id": thread_id, "role": m["role"], "content": m["content"],
+             "timestamp": m["timestamp"]}
+            for m in messages
+        ]
+
+
+class BucketedChatStore(_ChatStore):
+    """Messages packed `bucket_size` to a document in `chat_buckets`."""
+
+    collection_name = BUCKETS_COLLECTION
+
+    def __init__(self, db, bucket_size: int = CHAT_BUCKET_SIZE):
+        self.collection = db[BUCKETS_COLLECTION]
+        self.summaries = db[THREADS_COLLECTION]
+        self.bucket_size = bucket_size
+
+    def ensure_indexes(self) -> None:
+        self.collection.create_index([("thread_id", 1), ("first_ts", -1)], name="thread_first_ts")
+        self.collection.create_index(
+            "thread_id", name="open_bucket_unique", unique=True, partialFilterExpression={"open": True}
+        )
+
+    def save(self, thread_id: str, role: str, content: str, timestamp) -> str:
+        message_id = ObjectId()
+        message = {"id": message_id, "role": role, "content": content, "timestamp": timestamp}
+        update = {
+            "$push": {"messages": message},
+            "$inc": {"count": 1},
+            "$min": {"first_ts": timestamp},
+            "$max": {"last_ts": timestamp},
+        }
+        try:
+            bucket = self._append(thread_id, update)
+        except DuplicateKeyError:
+            # A concurrent append opened the bucket first; add to that one
+            bucket = self._append(thread_id, update)
+        if bucket["count"] >= self.bucket_size:
+            self.collection.update_one({"_id": bucket["_id"]}, {"$unset": {"open": ""}})
+        return str(message_id)
+
+    def _append(self, thread_id: str, update: dict) -> dict:
+        return self.collection.find_one_and_update(
+            {"thread_id": thread_id, "open": True},
+            update,
+            projection={"count": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def recent(self, thread_id: str, limit: int) -> list[dict]:
+        """Last `limit` messages of the thread, oldest first; reads only the newest buckets."""
+        cursor = self.collection.find({"thread_id": thread_id}, {"messages": 1, "count": 1}).sort("first_ts", -1)
+        buckets = []
+        collected = 0
+        for bucket in cursor.batch_size(2):
+            buckets.append(bucket)
+            collected += bucket["count"]
+            if collected >= limit:
+                break
+        cursor.close()
+        messages = [m for bucket in reversed(buckets) for m in bucket["messages"]]
+        return [_message(m, thread_id, "id") for m in messages[-limit:]] if limit else []
+
+    def history(self, thread_id: str) -> list[dict]:
+        cursor = self.collection.find({"thread_id": thread_id}, {"messages": 1}).sort("first_ts", 1)
+        return [_message(m, thread_id, "id") for bucket in cursor for m in bucket["messages"]]
+
+    def aggregate(self, pipeline: list[dict]):
+        """Run `pipeline` over messages shaped {_id, thread_id, role, content, timestamp}."""
+        return self.collection.aggregate(_UNWIND_BUCKETS + pipeline)
+
+    def threads(self):
+        """(thread_id, messages oldest first) for every thread, in thread_id order."""
+        cursor = self.collection.find({}).sort([("thread_id", 1), ("first_ts", 1)])
+        for thread_id, buckets in groupby(cursor, key=lambda doc: doc["thread_id"]):
+            yield thread_id, [_message(m, thread_id, "id") for bucket in buckets for m in bucket["messages"]]
+
+    def idle_threads(self, before, limit: int):
+        return self._idle_summaries(before, limit)
+
+    def delete_thread(self, thread_id: str, up_to) -> bool:
+        """Drop the thread's buckets whose messages are all stamped at or before `up_to`."""
+        self.collection.delete_many({"thread_id": thread_id, "last_ts": {"$lte": up_to}})
+        return self._mark_cold(thread_id, up_to)
+
+    def _documents(self, thread_id: str, messages: list[dict]) -> list[dict]:
+        buckets = []
+        for start in range(0, len(messages), self.bucket_size):
+            chunk = messages[start:start + self.bucket_size]
+            bucket = {
+                "thread_id": thread_id,
+                "count": len(chunk),
+                "first_ts": min(m["timestamp"] for m in chunk),
+                "last_ts": max(m["timestamp"] for m in chunk),
+                "messages": [
+                    {"id": _message_id(m), "role": m["role"], "content": m["content"], "timestamp": m["timestamp"]}
+                    for m in chunk
+                ],
+            }
+            if len(chunk) < self.bucket_size:
+                bucket["open"] = True
+            buckets.append(bucket)
+        return buckets
+
+
+STORES = {"messages": MessageChatStore, "bucketed": BucketedChatStore}
+
+
+def get_chat_store(db, storage: str | None = None):
+    """The chat repository for CHAT_STORAGE (or `storage`)."""
+    storage = storage or CHAT_STORAGE
+    if storage not in STORES:
+        raise ValueError(f"CHAT_STORAGE must be one of {', '.join(STORES)}, not {storage!r}")
+    return STORES[storage](db)
+
+
+def migrate(db, target: str, drop_source: bool = False) -> dict:
+    """
+    Copy every thread into the `target` layout. Threads already in the target
+    are replaced, so an interrupted run can simply be repeated. Pause chat
+    writes (or switch CHAT_STORAGE first) so no message lands mid-copy.
+    """
+    source_name = "bucketed" if target == "messages" else "messages"
+    source, destination = get_chat_store(db, source_name), get_chat_store(db, target)
+    destination.ensure_indexes()
+    threads = messages = 0
+    for thread_id, thread_messages in source.threads():
+        destination.load_thread(thread_id, thread_messages)
+        threads += 1
+        messages += len(thread_messages)
+    if drop_source:
+        db.drop_collection(source.collection_name)
+    return {"threads": threads, "messages": messages, "source": source.collection_name,
+            "target": destination.collection_name}
+
+
+if __name__ == "__main__":
+    from db.db import get_db
+
+    parser = argparse.ArgumentParser(description="Move chat messages between storage layouts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = sub.add_parser("migrate")
+    migrate_parser.add_argument("--to", choices=tuple(STORES), required=True)
+    migrate_parser.add_argument("--drop-source", action="store_true", help="drop the old collection afterwards")
+    args = parser.parse_args()
+
+    report = migrate(get_db(), args.to, args.drop_source)
+    print(f"{report['threads']} threads, {report['messages']} messages: {report['source']} -> {report['target']}")
+    if args.to != CHAT_STORAGE:
+        print(f"set CHAT_STORAGE={args.to} for the app to read the new layout")
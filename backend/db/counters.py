@@ -0,0 +1,132 @@
+"""
+Materialized student counters.
+
+`student_counters` holds one document per department plus a grand total, kept
+in step with `students` by `$inc` from every write path. Analytics reads these
+few small documents instead of scanning `students`.
+
+Rebuild the counters from scratch and print the drift with:
+    python -m db.counters
+"""
+from datetime import datetime
+
+from pymongo import DeleteOne, UpdateOne
+
+COUNTERS_COLLECTION = "student_counters"
+TOTAL_ID = "total"
+UNKNOWN_DEPARTMENT = "Unknown"
+
+
+def _department_name(department: str | None) -> str:
+    # Same bucketing as {"$ifNull": ["$department", "Unknown"]}: only a missing
+    # or null department is "Unknown"; "" stays its own bucket
+    return UNKNOWN_DEPARTMENT if department is None else department
+
+
+def _department_id(department: str | None) -> str:
+    return "dept:" + _department_name(department)
+
+
+def _inc(department: str | None, delta: int) -> UpdateOne:
+    return UpdateOne(
+        {"_id": _department_id(department)},
+        {"$inc": {"count": delta}, "$set": {"department": _department_name(department)}},
+        upsert=True,
+    )
+
+
+def record_students_added(db, departments: list[str | None]) -> None:
+    """Count newly inserted students (one entry per student, bulk imports included)."""
+    if not departments:
+        return
+    per_department: dict[str, int] = {}
+    for department in departments:
+        name = _department_name(department)
+        per_department[name] = per_department.get(name, 0) + 1
+    ops = [_inc(department, n) for department, n in per_department.items()]
+    ops.append(UpdateOne({"_id": TOTAL_ID}, {"$inc": {"count": len(departments)}}, upsert=True))
+    db[COUNTERS_COLLECTION].bulk_write(ops, ordered=False)
+
+
+def record_student_removed(db, department: str | None) -> None:
+    db[COUNTERS_COLLECTION].bulk_write(
+        [_inc(department, -1), UpdateOne({"_id": TOTAL_ID}, {"$inc": {"count": -1}}, upsert=True)],
+        ordered=False,
+    )
+
+
+def record_department_changed(db, old: str | None, new: str | None) -> None:
+    if _department_name(old) == _department_name(new):
+        return
+    db[COUNTERS_COLLECTION].bulk_write([_inc(old, -1), _inc(new, 1)], ordered=False)
+
+
+def read_total(db) -> int | None:
+    """Total student count, or None when the counters were never built."""
+    doc = db[COUNTERS_COLLECTION].find_one({"_id": TOTAL_ID}, {"count": 1})
+    return doc["count"] if doc else None
+
+
+def read_counters(db) -> tuple[int | None, list[dict]]:
+    """
+    (total, [{"department", "count"}]) from one read of the counters
+    collection, departments sorted like the old $group pipeline. The total is
+    None when the counters were never built.
+    """
+    total, departments = None, []
+    for doc in db[COUNTERS_COLLECTION].find({}, {"department": 1, "count": 1}):
+        if doc["_id"] == TOTAL_ID:
+            total = doc.get("count", 0)
+        elif doc.get("count", 0) > 0 and "department" in doc:
+            departments.append({"department": doc["department"], "count": doc["count"]})
+    return total, sorted(departments, key=lambda d: (-d["count"], d["department"]))
+
+
+def reconcile_counters(db) -> dict:
+    """
+    Recount `students` and overwrite the counters, returning the drift found.
+    Writes that land while this runs may be counted twice or not at all; run it
+    off-peak or run it again.
+    """
+    pipeline = [
+        {"$group": {"_id": {"$ifNull": ["$department", UNKNOWN_DEPARTMENT]}, "count": {"$sum": 1}}},
+    ]
+    actual = {doc["_id"]: doc["count"] for doc in db["students"].aggregate(pipeline)}
+    counters = db[COUNTERS_COLLECTION]
+    stored = {
+        doc["department"]: doc.get("count", 0)
+        for doc in counters.find({"_id": {"$regex": "^dept:"}}, {"department": 1, "count": 1})
+    }
+    stored_total = read_total(db)
+    actual_total = sum(actual.values())
+
+    drift = [
+        {"department": dept, "counter": stored.get(dept, 0), "actual": actual.get(dept, 0)}
+        for dept in sorted(set(stored) | set(actual))
+        if stored.get(dept, 0) != actual.get(dept, 0)
+    ]
+
+    ops = [
+        UpdateOne({"_id": _department_id(dept)}, {"$set": {"department": dept, "count": n}}, upsert=True)
+        for dept, n in actual.items()
+    ]
+    ops += [DeleteOne({"_id": _department_id(dept)}) for dept in stored if dept not in actual]
+    ops.append(UpdateOne({"_id": TOTAL_ID}, {"$set": {"count": actual_total}}, upsert=True))
+    counters.bulk_write(ops, ordered=False)
+
+    return {
+        "drift": drift,
+        "total": {"counter": stored_total, "actual": actual_total},
+        "reconciled_at": datetime.utcnow(),
+    }
+
+
+if __name__ == "__main__":
+    from db.db import get_db
+
+    report = reconcile_counters(get_db())
+    total = report["total"]
+    print(f"total: counter={total['counter']} actual={total['actual']}")
+    for row in report["drift"]:
+        print(f"  {row['department']}: counter={row['counter']} actual={row['actual']}")
+    print("no drift" if not report["drift"] and total["counter"] == total["actual"] else "counters rebuilt")
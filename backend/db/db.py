@@ -1,16 +1,155 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+from pymongo.collation import Collation
 from dotenv import load_dotenv
+from db.chat_archive import get_archive
+from db.chats import get_chat_store
+from db.threads import ensure_thread_indexes
+from utils.circuit_breaker import MONGO_BREAKER
+from utils.metrics import MONGO_COMMAND_DURATION
+import logging
 import os
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records every command's server round-trip time by collection and command name."""
+
+    def __init__(self):
+        self._collections: dict[int, str] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        self._collections[event.request_id] = target if isinstance(target, str) else "-"
+
+    def succeeded(self, event):
+        self._record(event, "success")
+
+    def failed(self, event):
+        self._record(event, "failure")
+
+    def _record(self, event, outcome):
+        collection = self._collections.pop(event.request_id, "-")
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, collection, event.command_name, outcome)
+        # Server-side errors (duplicate key, validation) come back as the reply
+        # document; only driver-side errors (network, timeouts) carry "errtype"
+        MONGO_BREAKER.record(outcome == "failure" and "errtype" in event.failure)
+
+
+class MongoHeartbeatBreaker(monitoring.ServerHeartbeatListener):
+    """
+    Feeds server heartbeats to the Mongo circuit breaker, so an unreachable
+    server trips it even when no command gets as far as the wire.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_BREAKER.record(False)
+
+    def failed(self, event):
+        MONGO_BREAKER.record(True)
+
+
+# One client (and connection pool) per process; MongoClient is thread-safe
+_client = None
+
 def get_db():
+    global _client
     try:    
-        print("Connecting to MongoDB...")
-        print("MONGODB_URI:", os.getenv("db_url"))
-        client = MongoClient(os.getenv("db_url"))
-        db=client['hackathon_smit']  # <-- specify your database name here
+        if _client is None:
+            logger.info("Connecting to MongoDB")
+            _client = MongoClient(os.getenv("db_url"), event_listeners=[MongoCommandMetrics(), MongoHeartbeatBreaker()])
+        db=_client['hackathon_smit']  # <-- specify your database name here
         return db
 
-    except Exception as e:
-        print("Error connecting to MongoDB:", e)
+    except Exception:
+        logger.exception("Error connecting to MongoDB")
         return None
+
+
+# Case-insensitive comparison for emails, so legacy mixed-case accounts still
+# match the normalized (lowercased) addresses we store and look up now.
+EMAIL_COLLATION = Collation(locale="en", strength=2)
+
+# Chat turn traces are diagnostic data; Mongo's TTL monitor drops them after this
+TRACE_RETENTION_DAYS = int(os.getenv("TRACE_RETENTION_DAYS", "7"))
+
+# Stored responses for Idempotency-Key retries (middleware/idempotency.py)
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+
+
+def require_mongo():
+    """Route dependency failing fast (503 via CircuitOpenError) while Mongo's breaker is open."""
+    MONGO_BREAKER.check()
+
+
+# False until the unique email index is known to exist; registration then
+# checks for an existing account itself instead of relying on the index
+_email_index_ready = False
+
+
+def email_index_ready() -> bool:
+    return _email_index_ready
+
+
+def ensure_indexes(db) -> list[str]:
+    """
+    Create the indexes the routes rely on; safe to call on every startup.
+    Each index is attempted on its own, so one that cannot be built (e.g. the
+    unique email index over legacy duplicates) does not skip the rest.
+    Returns the names of the indexes that failed.
+    """
+    global _email_index_ready
+    indexes = [
+        ("signup.email_unique", lambda: db["signup"].create_index(
+            "email", unique=True, name="email_unique", collation=EMAIL_COLLATION
+        )),
+        # Newest-first listings in analytics (recent onboardings, active students)
+        ("students.created_at_desc", lambda: db["students"].create_index(
+            [("created_at", -1), ("_id", -1)], name="created_at_desc"
+        )),
+        ("students.last_active_desc", lambda: db["students"].create_index(
+            [("last_active", -1), ("_id", -1)], name="last_active_desc"
+        )),
+        ("chat_traces.thread_started_at", lambda: db["chat_traces"].create_index(
+            [("thread_id", 1), ("started_at", -1)], name="thread_started_at"
+        )),
+        ("chat_traces.started_at_ttl", lambda: db["chat_traces"].create_index(
+            "started_at", name="started_at_ttl", expireAfterSeconds=TRACE_RETENTION_DAYS * 86400
+        )),
+        ("chat store", lambda: get_chat_store(db).ensure_indexes()),
+        ("chat archive", lambda: get_archive(db).ensure_indexes()),
+        ("threads", lambda: ensure_thread_indexes(db)),
+        (f"{IDEMPOTENCY_COLLECTION}.created_at_ttl", lambda: db[IDEMPOTENCY_COLLECTION].create_index(
+            "created_at", name="created_at_ttl", expireAfterSeconds=IDEMPOTENCY_TTL_HOURS * 3600
+        )),
+    ]
+    failed = []
+    for name, create in indexes:
+        try:
+            create()
+        except Exception:
+            logger.exception("Error creating index %s", name)
+            failed.append(name)
+    _email_index_ready = "signup.email_unique" not in failed
+    if not _email_index_ready:
+        logger.error("Unique email index is missing; registration falls back to a lookup before each insert")
+    return failed
+
+
+def backfill_student_timestamps(db):
+    """
+    Give students inserted before `created_at` was stamped a creation time
+    taken from their ObjectId, so the recent-onboardings sort covers them.
+    """
+    try:
+        db["students"].update_many(
+            {"created_at": {"$exists": False}},
+            [{"$set": {"created_at": {"$toDate": "$_id"}}}],
+        )
+    except Exception:
+        logger.exception("Error backfilling student timestamps")
@@ -0,0 +1,123 @@
+"""
+Per-thread conversation summaries.
+
+`threads` holds one document per chat thread:
+    {"_id": thread_id, "message_count": n, "last_activity": <datetime>,
+     "last_role": "user" | "assistant", "preview": <start of the last message>,
+     "created_at": <first message>, "hot": true, "owner": <user_id>}
+save_message keeps it current with one upsert, so listing a user's
+conversations is a range read on the (owner, last_activity, _id) index
+instead of a $group over every stored message. `owner` is the user whose
+bearer token came with the thread's first message; threads started
+anonymously have none and are not listed. `hot` marks threads with messages in the chat store; the
+archiver clears it (`db.chats`) and reads idle threads off its partial index.
+
+Rebuild the summaries from the chat store (also sets `hot` on summaries
+written before it existed) with:
+    python -m db.threads
+"""
+from datetime import datetime
+
+from pymongo import ReturnDocument, UpdateOne
+
+from db.chats import THREADS_COLLECTION, get_chat_store
+
+PREVIEW_CHARS = 120
+
+
+def _preview(content: str) -> str:
+    return content if len(content) <= PREVIEW_CHARS else content[:PREVIEW_CHARS - 1] + "…"
+
+
+def ensure_thread_indexes(db) -> None:
+    db[THREADS_COLLECTION].create_index(
+        [("owner", 1), ("last_activity", -1), ("_id", -1)], name="owner_last_activity_desc"
+    )
+    db[THREADS_COLLECTION].create_index(
+        [("hot", 1), ("last_activity", 1)], name="hot_last_activity", partialFilterExpression={"hot": True}
+    )
+
+
+def record_message(db, thread_id: str, role: str, content: str, timestamp: datetime,
+                   owner: str | None = None) -> bool:
+    """
+    Count a new message in the thread's summary; a new thread belongs to
+    `owner`. Returns True when the thread was archived (its summary had no hot
+    messages), so the caller rehydrates it.
+    """
+    on_insert = {"created_at": timestamp}
+    if owner:
+        on_insert["owner"] = owner
+    previous = db[THREADS_COLLECTION].find_one_and_update(
+        {"_id": thread_id},
+        {
+            "$inc": {"message_count": 1},
+            "$set": {"last_activity": timestamp, "last_role": role, "preview": _preview(content), "hot": True},
+            "$setOnInsert": on_insert,
+        },
+        projection={"hot": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+    return previous is not None and not previous.get("hot")
+
+
+def read_threads(db, owner: str, limit: int, after: tuple[datetime, str] | None = None) -> list[dict]:
+    """
+    Up to `limit` of `owner`'s summaries, most recently active first, starting
+    after the (last_activity, thread_id) pair `after`. Each page is one index
+    range read.
+    """
+    query: dict = {"owner": owner}
+    if after is not None:
+        last_activity, thread_id = after
+        query["$or"] = [
+            {"last_activity": {"$lt": last_activity}},
+            {"last_activity": last_activity, "_id": {"$lt": thread_id}},
+        ]
+    cursor = db[THREADS_COLLECTION].find(query).sort([("last_activity", -1), ("_id", -1)]).limit(limit)
+    return list(cursor)
+
+
+def rebuild_threads(db) -> int:
+    """
+    Recompute summaries of every thread in the hot chat store and overwrite
+    them (owners are kept). Summaries of archived threads (`db.chat_archive`)
+    are left as they are. Returns the number of threads written.
+    """
+    rows = get_chat_store(db).aggregate([
+        {"$sort": {"thread_id": 1, "timestamp": 1}},
+        {"$group": {
+            "_id": "$thread_id",
+            "message_count": {"$sum": 1},
+            "created_at": {"$first": "$timestamp"},
+            "last_activity": {"$last": "$timestamp"},
+            "last_role": {"$last": "$role"},
+            "last_content": {"$last": "$content"},
+        }},
+    ])
+    ops = []
+    written = 0
+    for row in rows:
+        ops.append(UpdateOne({"_id": row["_id"]}, {"$set": {
+            "message_count": row["message_count"],
+            "created_at": row["created_at"],
+            "last_activity": row["last_activity"],
+            "last_role": row["last_role"],
+            "preview": _preview(row["last_content"]),
+            "hot": True,
+        }}, upsert=True))
+        if len(ops) >= 1000:
+            db[THREADS_COLLECTION].bulk_write(ops, ordered=False)
+            written += len(ops)
+            ops = []
+    if ops:
+        db[THREADS_COLLECTION].bulk_write(ops, ordered=False)
+        written += len(ops)
+    return written
+
+
+if __name__ == "__main__":
+    from db.db import get_db
+
+    print(f"{rebuild_threads(get_db())} thread summaries written")
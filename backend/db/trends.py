@@ -0,0 +1,168 @@
+"""
+Pre-aggregated daily trend buckets.
+
+`daily_trends` holds one document per UTC day:
+    {"_id": "2025-01-31", "day": <midnight UTC>, "admissions": n,
+     "admissions_by_department": {dept: n}, "chat_turns": n}
+Write paths bump the current day with `$inc`, so any date range is a single
+`_id` range read and the buckets are current without a periodic roll-up job
+scanning `students` and the chat store. Rebuild buckets from students and chat
+messages with:
+    python -m db.trends --since 2025-01-01
+The backfill is idempotent and can be scheduled to repair drift. Messages of
+archived threads (`db.chat_archive`) are no longer in the chat store, so chat
+turns of days older than CHAT_ARCHIVE_AFTER_DAYS are left as recorded.
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+from pymongo import UpdateOne
+
+from db.chat_archive import CHAT_ARCHIVE_AFTER_DAYS
+from db.chats import get_chat_store
+
+TRENDS_COLLECTION = "daily_trends"
+UNKNOWN_DEPARTMENT = "Unknown"
+
+
+def _day_id(day: date) -> str:
+    return day.isoformat()
+
+
+def _department_key(department: str | None) -> str:
+    # Field names cannot contain "." or start with "$"
+    return (department or UNKNOWN_DEPARTMENT).replace(".", "_").lstrip("$") or UNKNOWN_DEPARTMENT
+
+
+def _bucket_filter(when: datetime) -> tuple[dict, dict]:
+    day = when.date()
+    return {"_id": _day_id(day)}, {"day": datetime(day.year, day.month, day.day)}
+
+
+def record_admissions(db, departments: list[str | None], when: datetime | None = None) -> None:
+    """Count newly admitted students in today's bucket (one entry per student)."""
+    if not departments:
+        return
+    inc: dict[str, int] = {"admissions": len(departments)}
+    for department in departments:
+        key = "admissions_by_department." + _department_key(department)
+        inc[key] = inc.get(key, 0) + 1
+    query, on_insert = _bucket_filter(when or datetime.utcnow())
+    db[TRENDS_COLLECTION].update_one(query, {"$inc": inc, "$setOnInsert": on_insert}, upsert=True)
+
+
+def record_chat_turn(db, when: datetime | None = None) -> None:
+    query, on_insert = _bucket_filter(when or datetime.utcnow())
+    db[TRENDS_COLLECTION].update_one(
+        query, {"$inc": {"chat_turns": 1}, "$setOnInsert": on_insert}, upsert=True
+    )
+
+
+def read_daily_buckets(db, start: date, end: date) -> list[dict]:
+    """One indexed read (`_id` range) for every bucket in [start, end]."""
+    cursor = db[TRENDS_COLLECTION].find(
+        {"_id": {"$gte": _day_id(start), "$lte": _day_id(end)}},
+    ).sort("_id", 1)
+    return list(cursor)
+
+
+def backfill_trends(db, since: date | None = None, recount_archived_days: bool = False) -> int:
+    """
+    Recompute buckets from `students.created_at` and the stored user messages
+    and overwrite them, from `since` on (all history without it). Days in
+    that range that no longer have any data are zeroed.
+
+    Threads idle for CHAT_ARCHIVE_AFTER_DAYS leave the chat store, so older
+    days cannot be recounted from it: their `chat_turns` are kept unless
+    `recount_archived_days` (for a store that was never archived). Returns the
+    number of day buckets written.
+    """
+    start = datetime(since.year, since.month, since.day) if since else None
+    chat_start = start
+    if not recount_archived_days and CHAT_ARCHIVE_AFTER_DAYS > 0:
+        horizon = datetime.utcnow().date() - timedelta(days=CHAT_ARCHIVE_AFTER_DAYS)
+        horizon = datetime(horizon.year, horizon.month, horizon.day)
+        chat_start = max(start, horizon) if start else horizon
+
+    match_students: dict = {"created_at": {"$type": "date"}}
+    match_chats: dict = {"role": "user", "timestamp": {"$type": "date"}}
+    if start:
+        match_students["created_at"]["$gte"] = start
+    if chat_start:
+        match_chats["timestamp"]["$gte"] = chat_start
+
+    day_format = {"format": "%Y-%m-%d"}
+    buckets: dict[str, dict] = {}
+
+    def bucket(day_id: str) -> dict:
+        return buckets.setdefault(day_id, {})
+
+    admissions = db["students"].aggregate([
+        {"$match": match_students},
+        {
+            "$group": {
+                "_id": {
+                    "day": {"$dateToString": {**day_format, "date": "$created_at"}},
+                    "department": {"$ifNull": ["$department", UNKNOWN_DEPARTMENT]},
+                },
+                "count": {"$sum": 1},
+            }
+        },
+    ])
+    for row in admissions:
+        b = bucket(row["_id"]["day"])
+        b["admissions"] = b.get("admissions", 0) + row["count"]
+        by_department = b.setdefault("admissions_by_department", {})
+        key = _department_key(row["_id"]["department"])
+        by_department[key] = by_department.get(key, 0) + row["count"]
+
+    turns = get_chat_store(db).aggregate([
+        {"$match": match_chats},
+        {"$group": {"_id": {"$dateToString": {**day_format, "date": "$timestamp"}}, "count": {"$sum": 1}}},
+    ])
+    for row in turns:
+        bucket(row["_id"])["chat_turns"] = row["count"]
+
+    # Buckets in range whose days lost their data are zeroed, field by field
+    chat_start_id = _day_id(chat_start.date()) if chat_start else ""
+    existing = db[TRENDS_COLLECTION].find({"_id": {"$gte": _day_id(since)}} if since else {}, {"_id": 1})
+    for doc in existing:
+        b = bucket(doc["_id"])
+        if "admissions" not in b:
+            b.update(admissions=0, admissions_by_department={})
+        if "chat_turns" not in b and doc["_id"] >= chat_start_id:
+            b["chat_turns"] = 0
+
+    ops = []
+    for day_id, values in buckets.items():
+        if not values:
+            continue
+        day = date.fromisoformat(day_id)
+        ops.append(UpdateOne(
+            {"_id": day_id},
+            {"$set": {**values, "day": datetime(day.year, day.month, day.day)}},
+            upsert=True,
+        ))
+    if ops:
+        db[TRENDS_COLLECTION].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def empty_bucket(day: date) -> dict:
+    return {"_id": _day_id(day), "admissions": 0, "admissions_by_department": {}, "chat_turns": 0}
+
+
+def days_between(start: date, end: date):
+    for offset in range((end - start).days + 1):
+        yield start + timedelta(days=offset)
+
+
+if __name__ == "__main__":
+    from db.db import get_db
+
+    parser = argparse.ArgumentParser(description="Rebuild daily trend buckets")
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="YYYY-MM-DD (default: all history)")
+    parser.add_argument("--recount-archived-days", action="store_true",
+                        help="also recount chat turns older than CHAT_ARCHIVE_AFTER_DAYS (only if nothing was archived)")
+    args = parser.parse_args()
+    print(f"{backfill_trends(get_db(), args.since, args.recount_archived_days)} day buckets written")
@@ -0,0 +1,282 @@
+# ------------ WELCOME EMAIL TEMPLATES (precompiled, per-department cache) ------------
+import base64
+import html
+import uuid
+from email.header import Header
+from email.utils import formataddr
+
+# Sentinel swapped in for the student name while a department's fragments are
+# built; it can never come out of the template text or html.escape().
+_NAME_SLOT = "\x00name\x00"
+
+# One boundary per process is enough: base64 bodies never contain "--".
+_BOUNDARY = "===============" + uuid.uuid4().hex + "=="
+_CRLF = b"\r\n"
+
+WELCOME_HTML_TEMPLATE = """
+<!doctype html>
+<html>
+  <head>
+    <meta charset="UTF-8" />
+    <meta name="viewport" content="width=device-width,initial-scale=1" />
+    <title>GCUF — Admission Confirmation</title>
+  </head>
+  <body style="margin:0;padding:0;background:#f4f5f7;font-family:Arial,Helvetica,sans-serif;color:#222;">
+    <!-- Container -->
+    <div style="max-width:640px;margin:0 auto;background:#ffffff;border-radius:10px;overflow:hidden;box-shadow:0 2px 10px rgba(0,0,0,0.05);">
+      
+      <!-- Header -->
+      <table role="presentation" width="100%" style="border-collapse:collapse;background:#0d6efd;">
+        <tr>
+          <td style="padding:18px 22px;">
+            <h1 style="margin:0;color:#ffffff;font-size:22px;letter-spacing:0.3px;">GCUF Admissions</h1>
+            <p style="margin:6px 0 0;color:#dbe8ff;font-size:13px;">Congratulations — Your Admission Is Confirmed 🎉</p>
+          </td>
+        </tr>
+      </table>
+
+      <!-- Intro / Congrats -->
+      <table role="presentation" width="100%" style="border-collapse:collapse;">
+        <tr>
+          <td style="padding:24px 22px;">
+            <p style="margin:0 0 10px;font-size:15px;">Hi {name},</p>
+            <p style="margin:0 0 10px;font-size:15px;">
+              We’re excited to inform you that your <b>admission is confirmed</b> at <b>GCUF</b>. 
+              You’ve been placed in the <b>{department}</b> department. Welcome aboard!
+            </p>
+          </td>
+        </tr>
+      </table>
+
+      <!-- What this means / Quick facts -->
+      <table role="presentation" width="100%" style="border-collapse:collapse;">
+        <tr>
+          <td style="padding:0 22px 8px;">
+            <h3 style="margin:0 0 6px;font-size:18px;">What’s next for you:</h3>
+          </td>
+        </tr>
+      </table>
+
+      <!-- Grid (helpful blocks) -->
+      <table role="presentation" width="100%" style="border-collapse:collapse;padding:0 18px 6px;">
+        <tr>
+          <td style="width:50%;padding:10px;">
+            <div style="background:#f8fafc;border:1px solid #e8eef5;border-radius:8px;padding:12px;">
+              <div style="font-size:22px;line-height:1;">📅</div>
+              <div style="font-weight:bold;margin-top:6px;">Orientation & Schedule</div>
+              <div style="font-size:13px;color:#444;margin-top:4px;">Check the portal for your timetable and the orientation date.</div>
+            </div>
+          </td>
+          <td style="width:50%;padding:10px;">
+            <div style="background:#f8fafc;border:1px solid #e8eef5;border-radius:8px;padding:12px;">
+              <div style="font-size:22px;line-height:1;">🧾</div>
+              <div style="font-weight:bold;margin-top:6px;">Documents & ID</div>
+              <div style="font-size:13px;color:#444;margin-top:4px;">Bring required documents and get your student ID issued.</div>
+            </div>
+          </td>
+        </tr>
+        <tr>
+          <td style="width:50%;padding:10px;">
+            <div style="background:#f8fafc;border:1px solid #e8eef5;border-radius:8px;padding:12px;">
+              <div style="font-size:22px;line-height:1;">💻</div>
+              <div style="font-weight:bold;margin-top:6px;">Student Portal</div>
+              <div style="font-size:13px;color:#444;margin-top:4px;">Access courses, announcements, and resources online.</div>
+            </div>
+          </td>
+          <td style="width:50%;padding:10px;">
+            <div style="background:#f8fafc;border:1px solid #e8eef5;border-radius:8px;padding:12px;">
+              <div style="font-size:22px;line-height:1;">📣</div>
+              <div style="font-weight:bold;margin-top:6px;">Department Updates</div>
+              <div style="font-size:13px;color:#444;margin-top:4px;">Watch for emails from {department} about labs and sections.</div>
+            </div>
+          </td>
+        </tr>
+      </table>
+
+      <!-- Detailed steps -->
+      <table role="presentation" width="100%" style="border-collapse:collapse;">
+        <tr>
+          <td style="padding:8px 22px 6px;">
+            <div style="background:#f8fafc;border:1px solid #e8eef5;border-radius:8px;padding:12px;">
+              <div style="font-weight:bold;margin-bottom:6px;">Next Steps</div>
+              <ol style="margin:6px 0 0 18px;padding:0;font-size:14px;line-height:1.6;color:#333;">
+                <li>Log in to the student portal to view your schedule and course materials.</li>
+                <li>Attend the <b>{department}</b> orientation session (date/time will be shared on the portal).</li>
+                <li>Complete any pending verifications or fee submissions, if applicable.</li>
+                <li>Reach out to the department advisor for academic planning.</li>
+              </ol>
+            </div>
+          </td>
+        </tr>
+      </table>
+
+      <!-- CTA -->
+      <table role="presentation" width="100%" style="border-collapse:collapse;">
+        <tr>
+          <td style="padding:8px 22px 16px;">
+            <p style="margin:0 0 16px;font-size:15px;">
+              If you have any questions, simply reply to this email — we’re here to help.
+            </p>
+            <div style="text-align:center;margin:16px 0 8px;">
+              <a href="{site_url}"
+                 style="display:inline-block;background:#0d6efd;color:#ffffff;text-decoration:none;
+                        padding:14px 22px;border-radius:8px;font-weight:bold;">
+                 🔐 Open Student Portal
+              </a>
+            </div>
+          </td>
+        </tr>
+      </table>
+
+      <!-- Footer -->
+      <table role="presentation" width="100%" style="border-collapse:collapse;background:#f6f7f9;">
+        <tr>
+          <td style="padding:16px 22px;font-size:12px;color:#555;">
+            <div style="margin-bottom:6px;"><b>GCUF Admissions</b></div>
+            <div>Website: <a href="{site_url}" style="color:#0d6efd;text-decoration:none;">{site_url}</a></div>
+            <div>Phone: {phone}</div>
+            <div style="margin-top:8px;color:#888;">You received this email because your admission at GCUF has been confirmed.</div>
+          </td>
+        </tr>
+      </table>
+
+    </div>
+    <!-- /Container -->
+  </body>
+</html>
+"""
+
+WELCOME_TEXT_TEMPLATE = (
+    "Hi {name},\n\n"
+    "{dept_line}"
+    "Next steps:\n"
+    "• Check your student portal for schedule and materials\n"
+    "• Attend orientation (you will receive details)\n"
+    "• Reply to this email if you have questions\n\n"
+    "Regards,\n{from_name}\n{phone}\n{site_url}\n"
+)
+
+
+def _single_line(value: str) -> str:
+    """Collapse whitespace so user values cannot inject extra header lines."""
+    return " ".join(value.split())
+
+
+def _encode_header(value: str) -> str:
+    value = _single_line(value)
+    try:
+        value.encode("ascii")
+        return value
+    except UnicodeEncodeError:
+        return Header(value, "utf-8").encode()
+
+
+def _encode_address(value: str) -> str:
+    """`Name <addr>` with only the display name RFC 2047-encoded; the address must stay as-is."""
+    value = _single_line(value)
+    name, sep, address = value.rpartition("<")
+    if not sep or not address.endswith(">"):
+        return value
+    name = name.strip().strip('"')
+    return formataddr((_encode_header(name), address[:-1].strip())) if name else address[:-1].strip()
+
+
+def _base64_part(content_type: str, body: str) -> bytes:
+    encoded = base64.encodebytes(body.encode("utf-8")).replace(b"\n", _CRLF)
+    return (
+        f'--{_BOUNDARY}\r\n'
+        f'Content-Type: {content_type}; charset="utf-8"\r\n'
+        "MIME-Version: 1.0\r\n"
+        "Content-Transfer-Encoding: base64\r\n\r\n"
+    ).encode("ascii") + encoded
+
+
+class _WelcomeParts:
+    """Static fragments for one department; only the name is spliced in per message."""
+
+    __slots__ = ("html", "text", "subject")
+
+    def __init__(self, html_parts: list[str], text_parts: list[str], subject: str):
+        self.html = html_parts
+        self.text = text_parts
+        self.subject = subject
+
+
+class WelcomeTemplate:
+    """
+    Welcome email renderer.
+
+    The HTML and text bodies are formatted once per department and split around
+    the name slot, so each message costs a ``str.join`` plus base64 encoding of
+    the bodies instead of re-formatting the whole document and building a MIME
+    tree. Names and departments are HTML-escaped before they reach the markup.
+    """
+
+    def __init__(self, from_name: str, site_url: str, phone: str, max_departments: int = 256):
+        self.from_name = from_name
+        self.site_url = site_url
+        self.phone = phone
+        self.max_departments = max_departments
+        self._parts: dict[str | None, _WelcomeParts] = {}
+
+    def _compile(self, department: str | None) -> _WelcomeParts:
+        html_body = WELCOME_HTML_TEMPLATE.format(
+            name=_NAME_SLOT,
+            department=html.escape(str(department)),
+            site_url=self.site_url,
+            phone=self.phone,
+        )
+        dept_line = (
+            f"You are added in the {department} department.\n"
+            if department else "Your enrollment has been created.\n"
+        )
+        text_body = WELCOME_TEXT_TEMPLATE.format(
+            name=_NAME_SLOT,
+            dept_line=dept_line,
+            from_name=self.from_name,
+            phone=self.phone,
+            site_url=self.site_url,
+        )
+        subject = f"Welcome! You are added in {department}" if department else "Welcome to Admissions"
+        return _WelcomeParts(
+            html_body.split(_NAME_SLOT),
+            text_body.split(_NAME_SLOT),
+            _encode_header(subject),
+        )
+
+    def parts(self, department: str | None) -> _WelcomeParts:
+        parts = self._parts.get(department)
+        if parts is None:
+            if len(self._parts) >= self.max_departments:
+                # Free-text departments from chat could grow this without bound
+                self._parts.clear()
+            parts = self._parts[department] = self._compile(department)
+        return parts
+
+    def render_html(self, name: str | None, department: str | None) -> str:
+        return html.escape(name or "Student").join(self.parts(department).html)
+
+    def render_text(self, name: str | None, department: str | None) -> str:
+        return (name or "Student").join(self.parts(department).text)
+
+    def build_message(self, sender: str, to_email: str, name: str | None, department: str | None) -> bytes:
+        """Return the full multipart/alternative message as CRLF-terminated bytes."""
+        if "\r" in to_email or "\n" in to_email:
+            raise ValueError("Invalid recipient address")
+        parts = self.parts(department)
+        text_body = (name or "Student").join(parts.text)
+        html_body = html.escape(name or "Student").join(parts.html)
+        headers = (
+            f'Content-Type: multipart/alternative; boundary="{_BOUNDARY}"\r\n'
+            "MIME-Version: 1.0\r\n"
+            f"From: {_encode_address(sender)}\r\n"
+            f"To: {to_email}\r\n"
+            f"Subject: {parts.subject}\r\n\r\n"
+        ).encode("utf-8")
+        return b"".join((
+            headers,
+            _base64_part("text/plain", text_body),
+            _base64_part("text/html", html_body),
+            f"--{_BOUNDARY}--\r\n".encode("ascii"),
+        ))
+# ------------ END WELCOME EMAIL TEMPLATES ---------------------------------------------
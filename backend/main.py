@@ -1,20 +1,90 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from routes import student_routes
 load_dotenv()
 
+# Before the route imports, which connect to Mongo and may log
+from utils.log import setup_logging
+setup_logging()
+
+from routes import student_routes
+
 from routes import user_routes
 from routes import analytics
+from routes import metrics
+from routes import profiling
+from db.chat_archive import CHAT_ARCHIVE_INTERVAL_SECONDS, run_archiver, zstandard
+from db.db import backfill_student_timestamps, ensure_indexes, get_db, require_mongo
+from utils.auth_utils import shutdown_password_pool
+from middleware.rate_limit import RateLimitMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.profiling import ProfilingMiddleware
+from middleware.request_id import RequestIdMiddleware
+from middleware.compression import CompressionMiddleware, brotli
+from middleware.idempotency import IdempotencyMiddleware
+from utils.circuit_breaker import CircuitOpenError, retry_after_header
+from utils.json_response import FastJSONResponse, orjson
+from utils.profiler import PROFILE_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# Declared dependencies the code can run without; say so when one is missing
+_OPTIONAL_MODULES = {
+    "orjson": (orjson, "responses use the stdlib json encoder"),
+    "brotli": (brotli, "responses are only gzip-compressed"),
+    "zstandard": (zstandard, "chat archives are gzip-compressed and zstd archives cannot be read"),
+}
+
+
+def log_missing_optional_modules() -> list[str]:
+    missing = [name for name, (module, _) in _OPTIONAL_MODULES.items() if module is None]
+    for name in missing:
+        logger.warning("%s is not installed; %s", name, _OPTIONAL_MODULES[name][1])
+    return missing
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_missing_optional_modules()
+    db = get_db()
+    ensure_indexes(db)
+    backfill_student_timestamps(db)
+    archiver = asyncio.create_task(run_archiver(db)) if CHAT_ARCHIVE_INTERVAL_SECONDS > 0 else None
+    yield
+    if archiver is not None:
+        archiver.cancel()
+    shutdown_password_pool()
+
 
 app = FastAPI(
     title="Login and Agent Management API",
     description="API for managing user logins and agent information",
     version="1.0.0",
     docs_url="/docs",          
-    redoc_url="/redoc"         
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    # A dependency is failing; tell the client when to retry instead of timing out
+    return FastJSONResponse(
+        {"detail": f"{exc.name} is temporarily unavailable, please retry shortly"},
+        status_code=503,
+        headers={"Retry-After": retry_after_header(exc)},
+    )
+
+# Innermost, so a replayed Idempotency-Key response is still rate limited and
+# stored uncompressed
+app.add_middleware(IdempotencyMiddleware)
+
+# Added before CORS so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -28,10 +98,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for large single-chunk bodies (chat history, student lists)
+app.add_middleware(CompressionMiddleware)
+
+
+# Outermost, so 429s and CORS preflights are timed too
+app.add_middleware(MetricsMiddleware)
+
+# Admin-only per-request profiling; nothing is installed unless PROFILE_TOKEN is set
+if PROFILE_TOKEN:
+    app.add_middleware(ProfilingMiddleware, token=PROFILE_TOKEN)
+
+# Outermost of all, so every log line of a request carries its id
+app.add_middleware(RequestIdMiddleware)
 
 app.include_router(student_routes.student_router, prefix="/students", tags=["Student"])
-app.include_router(user_routes.user_router, prefix="/users", tags=["User"])
-app.include_router(analytics.analytics_router, prefix="/analytics", tags=["Analytics"])
+# Both need Mongo on every request; fail fast while its breaker is open
+app.include_router(user_routes.user_router, prefix="/users", tags=["User"], dependencies=[Depends(require_mongo)])
+app.include_router(
+    analytics.analytics_router, prefix="/analytics", tags=["Analytics"], dependencies=[Depends(require_mongo)]
+)
+app.include_router(metrics.metrics_router)
+if PROFILE_TOKEN:
+    app.include_router(profiling.profiles_router)
 
 
 if __name__ == "__main__":
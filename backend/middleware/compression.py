@@ -0,0 +1,123 @@
+# ------------ RESPONSE COMPRESSION (gzip / brotli) ------------
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Already compressed or streamed; compressing these costs CPU for nothing
+_SKIP_TYPES = (b"text/event-stream", b"image/", b"video/", b"audio/", b"application/zip", b"application/gzip")
+
+
+def negotiate(accept_encoding: str, brotli_available: bool = brotli is not None) -> str | None:
+    """Pick "br" or "gzip" from an Accept-Encoding header (q-values honoured), else None."""
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+
+    wildcard = weights.get("*", 0.0)
+    candidates = (("br", brotli_available), ("gzip", True))
+    best, best_q = None, 0.0
+    for coding, available in candidates:
+        q = weights.get(coding, wildcard)
+        if available and q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing single-chunk responses of at least
+    `minimum_size` bytes with the client's preferred supported encoding.
+
+    Streaming responses (more than one body chunk, e.g. the SSE dashboard
+    feed), already-encoded bodies and binary media pass through untouched.
+    A strong ETag becomes weak on compressed responses, since the bytes differ
+    per encoding; If-None-Match uses weak comparison, so 304s keep working.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        coding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                coding = negotiate(value.decode("latin-1"))
+                break
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = list(start.get("headers", []))
+            if message.get("more_body", False) or not self._compressible(headers, len(body)):
+                # Streaming or not worth it: forward as-is from here on
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, coding)
+            out = []
+            for name, value in headers:
+                if name == b"content-length":
+                    continue
+                if name == b"etag" and not value.startswith(b"W/"):
+                    value = b"W/" + value
+                out.append((name, value))
+            out += [
+                (b"content-encoding", coding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": out})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, headers: list, size: int) -> bool:
+        if size < self.minimum_size:
+            return False
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type" and value.startswith(_SKIP_TYPES):
+                return False
+        return True
+# ------------ END RESPONSE COMPRESSION ------------------------------------------------
@@ -0,0 +1,309 @@
+# ------------ IDEMPOTENCY KEYS ------------
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from fastapi.concurrency import run_in_threadpool
+from pymongo.errors import DuplicateKeyError
+
+from db.db import IDEMPOTENCY_COLLECTION, IDEMPOTENCY_TTL_HOURS, get_db
+from utils.circuit_breaker import MONGO_BREAKER, OPEN
+
+logger = logging.getLogger(__name__)
+
+# How long a duplicate waits for the first execution before giving up with 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+# A claim older than this is treated as abandoned (its worker died mid-request)
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "120"))
+# Completed responses kept in process memory, so most replays skip Mongo
+IDEMPOTENCY_MEMORY_ENTRIES = int(os.getenv("IDEMPOTENCY_MEMORY_ENTRIES", "1000"))
+
+MAX_KEY_LENGTH = 255
+_POLL_INTERVAL = 0.05
+# Per-request headers that must not be replayed
+_SKIP_HEADERS = {b"date", b"server", b"x-request-id", b"x-profile-id"}
+
+
+class IdempotentRoute(NamedTuple):
+    method: str
+    path: str              # exact path, or a prefix when it ends with "/"
+
+
+DEFAULT_ROUTES = [
+    IdempotentRoute("POST", "/students/chat/"),
+    IdempotentRoute("POST", "/users/register"),
+    IdempotentRoute("POST", "/users/reset-password"),
+]
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+    def to_doc(self) -> dict:
+        return {
+            "status_code": self.status,
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in self.headers],
+            "body": self.body,
+        }
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "StoredResponse":
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in doc["headers"]]
+        return cls(doc["status_code"], headers, bytes(doc["body"]))
+
+
+def _fingerprint(method: str, path: str, body: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (method.encode(), path.encode(), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware honouring an `Idempotency-Key` header on mutating routes.
+
+    The first request with a key runs normally and its response is stored in
+    the TTL-indexed `idempotency_keys` collection (and in process memory);
+    retries with the same key get that response back, marked with
+    `Idempotent-Replayed: true`, without running the handler again. A
+    duplicate arriving while the first is still running waits for it: on an
+    in-process future when both hit the same worker, otherwise by polling the
+    claim document. Reusing a key for a different request body is a 422.
+
+    5xx responses and handler errors release the key so the client may retry.
+    Requests without the header are untouched. While Mongo is unreachable or
+    its circuit breaker is open, keys are only deduplicated within this process.
+    """
+
+    def __init__(self, app, routes: list[IdempotentRoute] | None = None, collection=None):
+        self.app = app
+        self.routes = DEFAULT_ROUTES if routes is None else routes
+        self._collection = collection
+        self._inflight: dict[str, asyncio.Future] = {}
+        # key -> (fingerprint, expires_at, response); insertion-ordered for eviction
+        self._done: dict[str, tuple[str, float, StoredResponse]] = {}
+
+    @property
+    def collection(self):
+        """The Mongo store, or None (in-process only) while Mongo's breaker is open."""
+        if MONGO_BREAKER.state == OPEN:
+            return None
+        if self._collection is None:
+            db = get_db()
+            if db is not None:
+                self._collection = db[IDEMPOTENCY_COLLECTION]
+        return self._collection
+
+    def _matches(self, method: str, path: str) -> bool:
+        for route in self.routes:
+            if route.method == method and (path == route.path or route.path.endswith("/") and path.startswith(route.path)):
+                return True
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._matches(scope["method"], scope["path"]):
+            return await self.app(scope, receive, send)
+
+        raw_key = None
+        for name, value in scope["headers"]:
+            if name == b"idempotency-key":
+                raw_key = value.decode("latin-1").strip()
+                break
+        if raw_key is None:
+            return await self.app(scope, receive, send)
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            return await _send_error(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+        # The body is part of the fingerprint, so read it up front and replay it to the app
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        key = f"{scope['method']} {scope['path']} {raw_key}"
+        fingerprint = _fingerprint(scope["method"], scope["path"], body)
+
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            stored = self._remembered(key)
+            if stored is not None:
+                if stored[0] != fingerprint:
+                    return await _send_mismatch(send)
+                return await _replay(send, stored[1])
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                # Same worker: wait for the first execution, then look again
+                try:
+                    await asyncio.wait_for(asyncio.shield(inflight), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    return await _send_in_progress(send)
+                continue
+
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            try:
+                state, doc = await self._claim(key, fingerprint)
+                if state == "claimed":
+                    return await self._execute(scope, receive, send, body, key, fingerprint)
+            finally:
+                del self._inflight[key]
+                future.set_result(None)
+
+            if doc["fingerprint"] != fingerprint:
+                return await _send_mismatch(send)
+            if state == "done":
+                response = StoredResponse.from_doc(doc)
+                self._remember(key, fingerprint, response)
+                return await _replay(send, response)
+            # Another worker holds the key: poll until it finishes or is released
+            if time.monotonic() >= deadline:
+                return await _send_in_progress(send)
+            await asyncio.sleep(_POLL_INTERVAL)
+
+    # ---------- in-process store ----------
+    def _remembered(self, key: str) -> tuple[str, StoredResponse] | None:
+        entry = self._done.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._done[key]
+            return None
+        return entry[0], entry[2]
+
+    def _remember(self, key: str, fingerprint: str, response: StoredResponse) -> None:
+        self._done.pop(key, None)
+        while len(self._done) >= IDEMPOTENCY_MEMORY_ENTRIES:
+            del self._done[next(iter(self._done))]
+        self._done[key] = (fingerprint, time.monotonic() + IDEMPOTENCY_TTL_HOURS * 3600, response)
+
+    # ---------- Mongo store ----------
+    async def _claim(self, key: str, fingerprint: str) -> tuple[str, dict | None]:
+        """Returns ("claimed", None), ("pending", doc) or ("done", doc)."""
+        collection = self.collection
+        if collection is None:
+            return "claimed", None
+        try:
+            return await run_in_threadpool(self._claim_sync, collection, key, fingerprint)
+        except Exception:
+            logger.exception("Idempotency store unavailable; deduplicating in process only")
+            return "claimed", None
+
+    @staticmethod
+    def _claim_sync(collection, key: str, fingerprint: str) -> tuple[str, dict | None]:
+        now = datetime.utcnow()
+        try:
+            collection.insert_one({"_id": key, "fingerprint": fingerprint, "state": "pending", "created_at": now})
+            return "claimed", None
+        except DuplicateKeyError:
+            pass
+        # Take over a claim abandoned by a crashed worker
+        taken = collection.find_one_and_update(
+            {"_id": key, "state": "pending", "created_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}},
+            {"$set": {"fingerprint": fingerprint, "created_at": now}},
+        )
+        if taken is not None:
+            return "claimed", None
+        doc = collection.find_one({"_id": key})
+        if doc is None:
+            # Released between our insert and read; go round again
+            return "pending", {"fingerprint": fingerprint}
+        return doc["state"], doc
+
+    async def _execute(self, scope, receive, send, body: bytes, key: str, fingerprint: str):
+        sent_body = False
+
+        async def receive_replay():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status = 500
+        headers: list = []
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(n, v) for n, v in message.get("headers", []) if n not in _SKIP_HEADERS]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_replay, send_wrapper)
+        except BaseException:
+            await self._release(key)
+            raise
+        if status >= 500:
+            await self._release(key)
+            return
+
+        response = StoredResponse(status, headers, b"".join(chunks))
+        self._remember(key, fingerprint, response)
+        collection = self.collection
+        if collection is not None:
+            try:
+                await run_in_threadpool(
+                    collection.update_one, {"_id": key}, {"$set": {"state": "done", **response.to_doc()}}
+                )
+            except Exception:
+                logger.exception("Could not store the response for an idempotency key")
+
+    async def _release(self, key: str) -> None:
+        collection = self.collection
+        if collection is None:
+            return
+        try:
+            await run_in_threadpool(collection.delete_one, {"_id": key, "state": "pending"})
+        except Exception:
+            logger.exception("Could not release an idempotency key")
+
+
+async def _replay(send, response: StoredResponse) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": response.status,
+        "headers": [*response.headers, (b"idempotent-replayed", b"true")],
+    })
+    await send({"type": "http.response.body", "body": response.body})
+
+
+async def _send_error(send, status: int, detail: str, headers: list | None = None) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            *(headers or []),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_mismatch(send) -> None:
+    await _send_error(send, 422, "Idempotency-Key was already used with a different request")
+
+
+async def _send_in_progress(send) -> None:
+    await _send_error(send, 409, "A request with this Idempotency-Key is still in progress",
+                      [(b"retry-after", b"1")])
+# ------------ END IDEMPOTENCY KEYS ------------------------------------------------------
@@ -0,0 +1,38 @@
+# ------------ REQUEST METRICS ------------
+import time
+
+from utils.metrics import HTTP_REQUEST_DURATION
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency by method, route template and
+    status. The route template (e.g. /students/chat/{thread_id}) keeps label
+    cardinality bounded; requests that match no route are labelled "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, scope["method"], template, str(status)
+            )
+# ------------ END REQUEST METRICS ------------------------------------------------------
@@ -0,0 +1,89 @@
+# ------------ PER-REQUEST PROFILING ------------
+import hmac
+import threading
+import time
+from urllib.parse import parse_qs
+
+from utils.profiler import PROFILE_INTERVAL_MS, SamplingProfiler, profile_store
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling a single request on demand.
+
+    A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` or
+    `?profile=<PROFILE_TOKEN>`; the response then has an `X-Profile-Id` header
+    and the folded stacks can be fetched from GET /profiles/{id}. One profile
+    runs at a time; a second flagged request is served unprofiled with
+    `X-Profile-Id: busy`. Unflagged requests only pay a header scan, and the
+    middleware is not installed at all unless PROFILE_TOKEN is set.
+
+    The response is held back until the profile is stored, so do not flag
+    streaming endpoints such as /analytics/analytics/live.
+    """
+
+    def __init__(self, app, token: str):
+        self.app = app
+        self.token = token.encode()
+        self._busy = threading.Lock()
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return hmac.compare_digest(value, self.token)
+        query = scope.get("query_string", b"")
+        if b"profile=" in query:
+            values = parse_qs(query.decode("latin-1")).get("profile", [])
+            return any(hmac.compare_digest(v.encode(), self.token) for v in values)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            return await self.app(scope, receive, send)
+
+        if not self._busy.acquire(blocking=False):
+            return await self.app(scope, receive, _with_header(send, b"busy"))
+
+        profiler = SamplingProfiler(PROFILE_INTERVAL_MS / 1000)
+        profile_id = None
+        start = time.perf_counter()
+        profiler.start(threading.get_ident())
+        try:
+            # The id is only known once the profile is stored, so buffer the
+            # response start until the handler is done producing the body
+            started = None
+            body = []
+
+            async def send_wrapper(message):
+                nonlocal started
+                if message["type"] == "http.response.start":
+                    started = message
+                elif message["type"] == "http.response.body":
+                    body.append(message)
+                else:
+                    await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.stop()
+                profile_id = profile_store.add(
+                    scope["method"], scope["path"], round((time.perf_counter() - start) * 1000, 3), profiler
+                )
+        finally:
+            self._busy.release()
+
+        if started is not None:
+            started = {**started, "headers": [*started.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(started)
+        for message in body:
+            await send(message)
+
+
+def _with_header(send, value: bytes):
+    async def send_wrapper(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", value)]}
+        await send(message)
+    return send_wrapper
+# ------------ END PER-REQUEST PROFILING ------------------------------------------------
@@ -0,0 +1,171 @@
+# ------------ RATE LIMITING (in-process token buckets) ------------
+import json
+import math
+import os
+import time
+from typing import NamedTuple
+
+from utils.auth_utils import verify_access_token
+
+
+class RateLimitRule(NamedTuple):
+    """
+    Token bucket for one route. `burst` requests are allowed at once and the
+    bucket refills at `rate` tokens per second. Buckets are kept per client IP
+    and, when the request carries a valid bearer token, per user as well.
+    """
+    method: str
+    path: str              # exact path, or a prefix when it ends with "/"
+    burst: float
+    rate: float
+
+
+def parse_limit(value: str) -> tuple[float, float]:
+    """Parse "N/S" (N requests per S seconds) into (burst, rate); N and S must be positive."""
+    count, _, seconds = value.partition("/")
+    try:
+        burst, period = float(count), float(seconds or 1)
+    except ValueError:
+        raise ValueError(f"Rate limit must look like N/S (N requests per S seconds), not {value!r}") from None
+    if not 1 <= burst < math.inf or not 0 < period < math.inf:
+        # A zero rate would never refill (and divide by zero computing Retry-After)
+        raise ValueError(f"Rate limit {value!r} needs at least 1 request per a positive number of seconds")
+    return burst, burst / period
+
+
+def default_rules() -> list[RateLimitRule]:
+    login_burst, login_rate = parse_limit(os.getenv("RATE_LIMIT_LOGIN", "10/60"))
+    chat_burst, chat_rate = parse_limit(os.getenv("RATE_LIMIT_CHAT", "20/60"))
+    return [
+        RateLimitRule("POST", "/users/login", login_burst, login_rate),
+        RateLimitRule("POST", "/students/chat/", chat_burst, chat_rate),
+    ]
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware answering 429 + Retry-After once a bucket is empty.
+
+    Buckets live in one dict keyed by (rule index, kind, subject) with a
+    two-item [tokens, last_refill] list as value, so a check is a dict lookup
+    and a little arithmetic. Buckets that have refilled completely are equal
+    to a fresh one and are swept every `sweep_interval` seconds.
+    """
+
+    def __init__(self, app, rules: list[RateLimitRule] | None = None, sweep_interval: float = 60.0,
+                 trust_forwarded: bool | None = None):
+        self.app = app
+        self.rules = default_rules() if rules is None else rules
+        for rule in self.rules:
+            if not rule.burst >= 1 or not rule.rate > 0:
+                raise ValueError(f"Rate limit for {rule.method} {rule.path} needs burst >= 1 and rate > 0")
+        self.sweep_interval = sweep_interval
+        if trust_forwarded is None:
+            trust_forwarded = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+        self.trust_forwarded = trust_forwarded
+        self._exact = {(r.method, r.path): i for i, r in enumerate(self.rules) if not r.path.endswith("/")}
+        self._prefixes = [(r.method, r.path, i) for i, r in enumerate(self.rules) if r.path.endswith("/")]
+        self._buckets: dict[tuple, list[float]] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _match(self, method: str, path: str) -> int | None:
+        index = self._exact.get((method, path))
+        if index is not None:
+            return index
+        for rule_method, prefix, i in self._prefixes:
+            if rule_method == method and path.startswith(prefix):
+                return i
+        return None
+
+    def _refill(self, key: tuple, rule: RateLimitRule, now: float) -> list[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [rule.burst, now]
+            return bucket
+        tokens = bucket[0] + (now - bucket[1]) * rule.rate
+        bucket[0] = tokens if tokens < rule.burst else rule.burst
+        bucket[1] = now
+        return bucket
+
+    def take(self, key: tuple, rule: RateLimitRule, now: float) -> float:
+        """Consume one token; returns 0 when allowed, else seconds until one is available."""
+        return self.take_all((key,), rule, now)
+
+    def take_all(self, keys, rule: RateLimitRule, now: float) -> float:
+        """
+        Consume one token from each bucket in `keys` when every one has a
+        token; returns 0 then. Otherwise nothing is consumed, so a throttled
+        IP does not drain its user's bucket (or the reverse), and the result
+        is the seconds until all of them have one.
+        """
+        buckets = [self._refill(key, rule, now) for key in keys]
+        wait = 0.0
+        for tokens, _ in buckets:
+            if tokens < 1:
+                wait = max(wait, (1 - tokens) / rule.rate)
+        if wait:
+            return wait
+        for bucket in buckets:
+            bucket[0] -= 1
+        return 0.0
+
+    def sweep(self, now: float) -> None:
+        rules = self.rules
+        full = [
+            key for key, (tokens, stamp) in self._buckets.items()
+            if tokens + (now - stamp) * rules[key[0]].rate >= rules[key[0]].burst
+        ]
+        for key in full:
+            del self._buckets[key]
+        self._next_sweep = now + self.sweep_interval
+
+    def _client_ip(self, scope) -> str:
+        if self.trust_forwarded:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    def _user_id(scope) -> str | None:
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    claims = verify_access_token(token)
+                    return claims.get("user_id") if claims else None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        index = self._match(scope["method"], scope["path"])
+        if index is None:
+            return await self.app(scope, receive, send)
+
+        rule = self.rules[index]
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        keys = [(index, "ip", self._client_ip(scope))]
+        user_id = self._user_id(scope)
+        if user_id is not None:
+            keys.append((index, "user", user_id))
+        wait = self.take_all(keys, rule, now)
+        if not wait:
+            return await self.app(scope, receive, send)
+
+        body = json.dumps({"detail": "Too many requests, please retry later"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(math.ceil(wait)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+# ------------ END RATE LIMITING ------------------------------------------------------
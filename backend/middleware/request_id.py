@@ -0,0 +1,44 @@
+# ------------ REQUEST CORRELATION IDS ------------
+import re
+import uuid
+
+from utils.log import request_id_var
+
+# Accept a caller-supplied id only if it is short and log-safe
+_VALID_ID = re.compile(rb"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving every request a correlation id: the incoming
+    X-Request-ID when it looks sane, otherwise a fresh one. It is stored in
+    `request_id_var` for log records and echoed back as X-Request-ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                if _VALID_ID.match(value):
+                    request_id = value
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex.encode()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id)]}
+            await send(message)
+
+        token = request_id_var.set(request_id.decode())
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+# ------------ END REQUEST CORRELATION IDS ----------------------------------------------
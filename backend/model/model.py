@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 import email
 from email import message
 from pydantic import BaseModel,Field,AfterValidator
@@ -10,8 +10,15 @@ from typing_extensions import Annotated
 
 
 
+def normalize_email(value: str) -> str:
+    return value.strip().lower()
+
+
+NormalizedEmail = Annotated[str, AfterValidator(normalize_email)]
+
+
 class LoginUser(BaseModel):
-    email: str
+    email: NormalizedEmail
     password: str
 
 
@@ -24,7 +31,7 @@ def is_even(value: int) -> int:
 
 class UserCreate(BaseModel):
     name: Annotated[str, Field(min_length=3,max_length=50)]
-    email: Annotated[str, Field(pattern=r'^\S+@\S+$')]
+    email: Annotated[str, Field(pattern=r'^\S+@\S+$'), AfterValidator(normalize_email)]
     password: Annotated[str, Field(min_length=6)]
     
     
@@ -37,7 +44,7 @@ class ChatRequest(BaseModel):
 # Password Reset Request Model
 
 class ResetPasswordRequest(BaseModel):
-    email: str
+    email: NormalizedEmail
     new_password: str
 
 
@@ -54,3 +61,28 @@ class StudentsByDeptResponse(BaseModel):
 class TotalStudentsResponse(BaseModel):
     total_students: int
     as_of: datetime
+
+class TrendPoint(BaseModel):
+    period: date                 # first day of the day/week bucket
+    admissions: int
+    admissions_by_department: dict[str, int]
+    chat_turns: int
+
+class TrendsResponse(BaseModel):
+    granularity: str
+    start: date
+    end: date
+    points: list[TrendPoint]
+    as_of: datetime
+
+class RecentStudents(BaseModel):
+    count: int
+    students: list[dict]
+
+class DashboardResponse(BaseModel):
+    total_students: int
+    total_departments: int
+    departments: list[DepartmentCount]
+    recent: RecentStudents
+    active_last_7_days: int
+    as_of: datetime
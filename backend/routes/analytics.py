@@ -1,100 +1,393 @@
 # analytics_routes.py
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List
-from datetime import datetime, timedelta
-from model.model import TotalStudentsResponse, StudentsByDeptResponse, DepartmentCount
+from datetime import date, datetime, timedelta
+from bson import ObjectId
+import asyncio
+import base64
+import json
+from model.model import (
+    DashboardResponse,
+    DepartmentCount,
+    RecentStudents,
+    StudentsByDeptResponse,
+    TotalStudentsResponse,
+    TrendPoint,
+    TrendsResponse,
+)
+from utils.events import on_student_write
+from utils.response_cache import ResponseCache
+from utils.live_analytics import LiveAnalyticsPublisher
 
 # --- DB setup ---
 from db.db import get_db
+from db.counters import read_counters, read_total, reconcile_counters
+from db.trends import days_between, empty_bucket, read_daily_buckets
 db = get_db()
 students_col = db["students"]
 
 # ---------- Core helper functions ----------
+def get_counters() -> tuple[int, List[dict]]:
+    """
+    (total, department counts) from one read of `student_counters`. On the
+    first run against an existing database the counters are built once.
+    """
+    total, departments = read_counters(db)
+    if total is None:
+        reconcile_counters(db)
+        total, departments = read_counters(db)
+    return total or 0, departments
+
 def get_total_students() -> int:
     """
     Return total number of students in the campus.
+    Served from the materialized counters in `student_counters`.
     """
-    return students_col.count_documents({})
+    total = read_total(db)
+    if total is None:
+        # First run against an existing database: build the counters once
+        total = reconcile_counters(db)["total"]["actual"]
+    return total
 
 def get_students_by_department() -> List[dict]:
     """
     Return counts of students grouped by department.
     If department is null/missing, bucket as 'Unknown'.
+    Served from the materialized counters in `student_counters`.
+    """
+    return get_counters()[1]
+
+# Fields the dashboard's "recent students" table renders
+RECENT_STUDENT_FIELDS = {"_id": 0, "id": 1, "name": 1, "department": 1, "email": 1, "created_at": 1}
+
+def get_dashboard_snapshot(recent_limit: int) -> dict:
+    """
+    Every dashboard figure from reads whose cost does not grow with the
+    collection: totals and the department breakdown come from the
+    materialized counters (the same source as the live feed), recent
+    students from the (created_at, _id) index, projected to the columns the
+    table displays, and the 7-day active count from the (last_active, _id)
+    index.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=7)
+    total, by_department = get_counters()
+    recent = list(
+        students_col.find({}, RECENT_STUDENT_FIELDS)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(recent_limit)
+    )
+    active = students_col.count_documents({"last_active": {"$gte": cutoff}})
+    return {
+        "total": total,
+        "by_department": by_department,
+        "recent": recent,
+        "active": active,
+    }
+
+
+# ---------- Student list helpers (projection + keyset pagination) ----------
+STUDENT_FIELDS = {"id", "name", "email", "department", "age", "created_at", "last_active"}
+
+def _projection(fields: str | None, sort_field: str) -> tuple[dict | None, set[str] | None]:
+    """
+    (Mongo projection, requested field set) for `fields`. The sort key and _id
+    are always fetched because the cursor is built from them.
+    """
+    if not fields:
+        return None, None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - STUDENT_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {sorted(unknown)}. Allowed: {sorted(STUDENT_FIELDS)}",
+        )
+    return {field: 1 for field in requested | {sort_field, "_id"}}, requested
+
+def _sortable(sort_field: str) -> dict:
+    """
+    Only datetimes and missing/null values of the sort key are listed. Legacy
+    values of other types sort in their own BSON type bracket, which the
+    cursor's $lt cannot page through.
+    """
+    return {"$or": [{sort_field: {"$type": "date"}}, {sort_field: None}]}
+
+def _encode_cursor(doc: dict, sort_field: str) -> str:
+    value = doc.get(sort_field)
+    raw = json.dumps({"v": value.isoformat() if isinstance(value, datetime) else None, "id": str(doc["_id"])})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _after_cursor(sort_field: str, cursor: str) -> dict:
+    """Filter for documents after `cursor` in (sort_field desc, _id desc) order."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        value = datetime.fromisoformat(raw["v"]) if raw["v"] else None
+        last_id = ObjectId(raw["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if value is None:
+        # Documents without the field sort last; page through them by _id
+        return {sort_field: None, "_id": {"$lt": last_id}}
+    return {
+        "$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "_id": {"$lt": last_id}},
+            {sort_field: None},
+        ]
+    }
+
+def _find_page(query: dict, sort_field: str, fields: str | None, limit: int | None, cursor: str | None):
     """
-    pipeline = [
-        {
-            "$group": {
-                "_id": {"$ifNull": ["$department", "Unknown"]},
-                "count": {"$sum": 1},
-            }
-        },
-        {"$project": {"_id": 0, "department": "$_id", "count": 1}},
-        {"$sort": {"count": -1, "department": 1}},
-    ]
-    return list(students_col.aggregate(pipeline))
+    Return (students, next_cursor) for one page sorted newest first; with
+    `limit` None every matching student is returned and there is no cursor.
+    """
+    projection, requested = _projection(fields, sort_field)
+    conditions = [c for c in (query, _sortable(sort_field), _after_cursor(sort_field, cursor) if cursor else None) if c]
+    find = students_col.find({"$and": conditions}, projection).sort([(sort_field, -1), ("_id", -1)])
+    docs = list(find if limit is None else find.limit(limit + 1))
+    next_cursor = None
+    if limit is not None and len(docs) > limit:
+        next_cursor = _encode_cursor(docs[limit - 1], sort_field)
+        docs = docs[:limit]
+    students = []
+    for doc in docs:
+        doc.pop("_id", None)
+        students.append(doc if requested is None else {k: v for k, v in doc.items() if k in requested})
+    return students, next_cursor
+
+
+def get_trend_points(start: date, end: date, granularity: str) -> list[dict]:
+    """Daily (or ISO-week) points for [start, end], zero-filled, from one range read."""
+    stored = {doc["_id"]: doc for doc in read_daily_buckets(db, start, end)}
+    points: dict[date, dict] = {}
+    for day in days_between(start, end):
+        bucket = stored.get(day.isoformat()) or empty_bucket(day)
+        period = day - timedelta(days=day.weekday()) if granularity == "week" else day
+        point = points.setdefault(period, {
+            "period": period, "admissions": 0, "admissions_by_department": {}, "chat_turns": 0,
+        })
+        point["admissions"] += bucket.get("admissions", 0)
+        point["chat_turns"] += bucket.get("chat_turns", 0)
+        by_dept = point["admissions_by_department"]
+        for dept, n in bucket.get("admissions_by_department", {}).items():
+            by_dept[dept] = by_dept.get(dept, 0) + n
+    return list(points.values())
+
+
+# ---------- Response cache ----------
+# Per-endpoint TTLs (seconds); any student write invalidates every entry
+TOTAL_STUDENTS_TTL = 30
+BY_DEPARTMENT_TTL = 30
+RECENT_STUDENTS_TTL = 15
+ACTIVE_STUDENTS_TTL = 60
+DASHBOARD_TTL = 15
+TRENDS_TTL = 60
+MAX_TREND_DAYS = 366
+
+analytics_cache = ResponseCache()
+on_student_write(analytics_cache.invalidate)
+
+
+# ---------- Live push ----------
+LIVE_HEARTBEAT_SECONDS = 15
+
+def _live_state() -> dict:
+    total, departments = get_counters()
+    return {
+        "total_students": total,
+        "departments": {item["department"]: item["count"] for item in departments},
+    }
+
+live_publisher = LiveAnalyticsPublisher(_live_state)
+on_student_write(live_publisher.notify)
 
 
 # ---------- Router ----------
 analytics_router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+@analytics_router.get("/dashboard", response_model=DashboardResponse)
+def dashboard_endpoint(request: Request, recent_limit: int = Query(5, ge=1, le=50)):
+    """
+    Everything the dashboard renders (totals, department breakdown, recent
+    students and 7-day active count) in one request: one counters read plus
+    two indexed queries.
+    """
+    def build():
+        try:
+            snapshot = get_dashboard_snapshot(recent_limit)
+            return DashboardResponse(
+                total_students=snapshot["total"],
+                total_departments=len(snapshot["by_department"]),
+                departments=[DepartmentCount(**item) for item in snapshot["by_department"]],
+                recent=RecentStudents(count=len(snapshot["recent"]), students=snapshot["recent"]),
+                active_last_7_days=snapshot["active"],
+                as_of=datetime.utcnow(),
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to build dashboard: {str(e)}")
+
+    return analytics_cache.respond(request, ("dashboard", recent_limit), DASHBOARD_TTL, build)
+
+@analytics_router.get("/live")
+async def live_analytics_endpoint():
+    """
+    Server-sent events for the dashboard: one `snapshot` on connect, then
+    coalesced `delta` events (new total + changed department counts) after
+    student writes. A `: ping` comment is sent when idle.
+    """
+    subscriber = await live_publisher.subscribe()
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    event, payload = await asyncio.wait_for(subscriber.queue.get(), LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            live_publisher.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@analytics_router.get("/live/subscribers")
+def live_subscribers_endpoint():
+    """Connected live dashboards with queue depth and dropped-event (backpressure) counts."""
+    return live_publisher.stats()
+
+@analytics_router.get("/trends", response_model=TrendsResponse)
+def trends_endpoint(
+    request: Request,
+    start: date | None = Query(None, description="First day (UTC), default: 30 days ago"),
+    end: date | None = Query(None, description="Last day (UTC), default: today"),
+    granularity: str = Query("day", pattern="^(day|week)$"),
+):
+    """
+    Admissions (total and per department) and chat turns per day or week,
+    served from the pre-aggregated `daily_trends` buckets.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+    if (end - start).days >= MAX_TREND_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_TREND_DAYS} days")
+
+    def build():
+        try:
+            points = get_trend_points(start, end, granularity)
+            return TrendsResponse(
+                granularity=granularity,
+                start=start,
+                end=end,
+                points=[TrendPoint(**point) for point in points],
+                as_of=datetime.utcnow(),
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch trends: {str(e)}")
+
+    return analytics_cache.respond(request, ("trends", start, end, granularity), TRENDS_TTL, build)
+
 @analytics_router.get("/total-students", response_model=TotalStudentsResponse)
-def total_students_endpoint():
+def total_students_endpoint(request: Request):
     """
     Get the total number of students enrolled on campus.
     """
-    try:
-        total = get_total_students()
-        return TotalStudentsResponse(
-            total_students=total,
-            as_of=datetime.utcnow(),
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch total students: {str(e)}")
+    def build():
+        try:
+            total = get_total_students()
+            return TotalStudentsResponse(
+                total_students=total,
+                as_of=datetime.utcnow(),
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch total students: {str(e)}")
+
+    return analytics_cache.respond(request, "total-students", TOTAL_STUDENTS_TTL, build)
 
 @analytics_router.get("/students-by-department", response_model=StudentsByDeptResponse)
-def students_by_department_endpoint():
+def students_by_department_endpoint(request: Request):
     """
     Get number of students per department.
     """
-    try:
-        grouped = get_students_by_department()
-        total_students = sum(item["count"] for item in grouped)
-        return StudentsByDeptResponse(
-            results=[DepartmentCount(**item) for item in grouped],
-            total_departments=len(grouped),
-            total_students=total_students,
-            as_of=datetime.utcnow(),
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch students by department: {str(e)}")
+    def build():
+        try:
+            grouped = get_students_by_department()
+            total_students = sum(item["count"] for item in grouped)
+            return StudentsByDeptResponse(
+                results=[DepartmentCount(**item) for item in grouped],
+                total_departments=len(grouped),
+                total_students=total_students,
+                as_of=datetime.utcnow(),
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch students by department: {str(e)}")
+
+    return analytics_cache.respond(request, "students-by-department", BY_DEPARTMENT_TTL, build)
 
 
 @analytics_router.get("/students/recent")
-def get_recent_onboarded_students(limit: int = Query(5, ge=1, le=50)):
+def get_recent_onboarded_students(
+    request: Request,
+    limit: int = Query(5, ge=1, le=50),
+    count_only: bool = Query(False, description="Return only the count, no documents"),
+    fields: str | None = Query(None, description="Comma-separated student fields to return"),
+    cursor: str | None = Query(None, description="`next_cursor` from the previous page"),
+):
     """
-    Get the most recent onboarded students (default: 5).
+    Get the most recent onboarded students (default: 5), newest first.
+    Served by the (created_at, _id) index.
     """
-    recent_cursor = (
-            students_col.find({}, {"_id": 0})
-        .sort("created_at", -1)
-        .limit(limit)
-    )
-    recent_students = list(recent_cursor)
+    def build():
+        if count_only:
+            conditions = [_sortable("created_at"), *([_after_cursor("created_at", cursor)] if cursor else [])]
+            return {"count": students_col.count_documents({"$and": conditions}, limit=limit), "students": []}
 
-    return {
-        "count": len(recent_students),   # count from list length
-        "students": recent_students
-    }
+        recent_students, next_cursor = _find_page({}, "created_at", fields, limit, cursor)
+        return {
+            "count": len(recent_students),   # count from list length
+            "students": recent_students,
+            "next_cursor": next_cursor,
+        }
+
+    key = ("students/recent", limit, count_only, fields, cursor)
+    return analytics_cache.respond(request, key, RECENT_STUDENTS_TTL, build)
 
 
 @analytics_router.get("/students/active_last_7_days")
-def get_active_students_last_7_days():
-    cutoff = datetime.utcnow() - timedelta(days=7)
-    active_cursor = students_col.find({"last_active": {"$gte": cutoff}}, {"_id": 0})
-    active_students = list(active_cursor)
+def get_active_students_last_7_days(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=500, description="Page size; omit to get every active student"),
+    count_only: bool = Query(False, description="Return only the count, no documents"),
+    fields: str | None = Query(None, description="Comma-separated student fields to return"),
+    cursor: str | None = Query(None, description="`next_cursor` from the previous page"),
+):
+    """
+    Students active in the last 7 days, most recently active first. `count` is
+    always the full number of active students. Without `limit` the list is
+    complete, as it always was; pass `limit` (and then `cursor`) to page it.
+    Served by the (last_active, _id) index.
+    """
+    def build():
+        cutoff = datetime.utcnow() - timedelta(days=7)
+        query = {"last_active": {"$gte": cutoff}}
+        count = students_col.count_documents(query)
+        if count_only:
+            return {"count": count, "students": []}
 
-    return {
-        "count": len(active_students),   # instead of active.count(True)
-        "students": active_students
-    }
+        active_students, next_cursor = _find_page(query, "last_active", fields, limit, cursor)
+        return {
+            "count": count,
+            "students": active_students,
+            "next_cursor": next_cursor,
+        }
+
+    key = ("students/active_last_7_days", limit, count_only, fields, cursor)
+    return analytics_cache.respond(request, key, ACTIVE_STUDENTS_TTL, build)
@@ -0,0 +1,33 @@
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from utils.profiler import PROFILE_TOKEN, profile_store
+
+profiles_router = APIRouter()
+
+
+def _require_admin(token: str | None) -> None:
+    if not token or not hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+
+@profiles_router.get("/profiles", include_in_schema=False)
+def list_profiles(x_profile: str | None = Header(None)):
+    """Recently captured request profiles, newest first (without the stacks)."""
+    _require_admin(x_profile)
+    return profile_store.list()
+
+
+@profiles_router.get("/profiles/{profile_id}", response_class=PlainTextResponse, include_in_schema=False)
+def download_profile(profile_id: str, x_profile: str | None = Header(None)):
+    """Folded stacks for one request; feed to flamegraph.pl or drop into speedscope."""
+    _require_admin(x_profile)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    return PlainTextResponse(
+        profile["folded"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
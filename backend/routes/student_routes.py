@@ -1,9 +1,12 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Body
-from typing import Dict
+from fastapi import FastAPI, APIRouter, HTTPException, Body, Depends, Query, Response
+from typing import Dict, List
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pymongo import MongoClient
+import base64
+import json
+import logging
 import os
 import re
 
@@ -13,9 +16,22 @@ load_dotenv()
 # --------- MongoDB Setup ----------
 from db.db import get_db
 db = get_db()  # get_db returns the 'hackathon_smit' Database instance
-chats_collection = db["chats"]
 students_collection = db["students"]
+from db.chats import get_chat_store
+from db.chat_archive import get_archive, rehydrate
+chat_store = get_chat_store(db)  # per-message or bucketed, see CHAT_STORAGE
+chat_archive = get_archive(db)
 from email_utils.email import _send_welcome_email
+from db.counters import record_students_added
+from db.threads import read_threads, record_message
+from db.trends import record_admissions, record_chat_turn
+from utils.circuit_breaker import GEMINI_BREAKER, MONGO_BREAKER, OPEN, CircuitOpenError, breaker_model_calls
+from utils.auth_utils import optional_token, verify_token
+from utils.events import student_written
+from utils.json_response import FastJSONResponse
+from utils.log import thread_id_var
+from utils.tracing import TRACES_COLLECTION, finish_trace, span, start_trace, trace_model_calls
+traces_collection = db[TRACES_COLLECTION]
 # --------- OpenAI + Agents ----------
 AGENT_AVAILABLE = False
 agent = None
@@ -56,9 +72,15 @@ If the user asks for information about students, use the read_students or read_s
 If the user wants to add, update, or delete a student, use the respective tool and confirm the action with the user.
 For general campus-related questions, use the rag_query tool to provide accurate information based on the campus FAQ documents.
                 """,
-                model=OpenAIChatCompletionsModel(
-                    model="gemini-2.5-flash",
-                    openai_client=openai_client,
+                model=trace_model_calls(
+                    breaker_model_calls(
+                        OpenAIChatCompletionsModel(
+                            model="gemini-2.5-flash",
+                            openai_client=openai_client,
+                        ),
+                        GEMINI_BREAKER,
+                    ),
+                    "gemini",
                 ),
                 tools=[
                     read_students,
@@ -76,6 +98,8 @@ For general campus-related questions, use the rag_query tool to provide accurate
         AGENT_AVAILABLE = False
 
 
+logger = logging.getLogger(__name__)
+
 student_router = APIRouter()
 
 # --------- Request Model ----------
@@ -83,15 +107,20 @@ class ChatRequest(BaseModel):
     user_input: str | None = None
 
 # ---------  Save message ----------
-def save_message(thread_id: str, role: str, content: str):
+def save_message(thread_id: str, role: str, content: str, owner: str | None = None):
     chat_doc = {
         "thread_id": thread_id,
         "role": role,
         "content": content,
         "timestamp": datetime.utcnow()
     }
-    result = chats_collection.insert_one(chat_doc)
-    chat_doc["id"] = str(result.inserted_id)
+    chat_doc["id"] = chat_store.save(thread_id, role, content, chat_doc["timestamp"])
+    if record_message(db, thread_id, role, content, chat_doc["timestamp"], owner):
+        # A reopened idle thread comes back from the archive before anything reads it
+        with span("rehydrate", "db") as s:
+            s.attrs["messages"] = rehydrate(chat_store, chat_archive, thread_id)
+    if role == "user":
+        record_chat_turn(db, chat_doc["timestamp"])
     return chat_doc
 
 # --------- Simple NLP: Extract student info & auto-insert ----------
@@ -163,16 +192,22 @@ def try_auto_add_student_from_text(text: str) -> str | None:
     if students_collection.find_one({"id": sid}):
         return f"A student with id={sid} already exists. Please use a different id or update the existing record."
 
+    now = datetime.utcnow()
     doc = {
         "id": sid,
         "name": name,
         "email": email,
         "department": dept,
+        "created_at": now,
+        "last_active": now,
     }
     if age is not None:
         doc["age"] = age
 
     result = students_collection.insert_one(doc)
+    record_students_added(db, [dept])
+    record_admissions(db, [dept], now)
+    student_written("added", [dept])
     # try sending email but don't fail if it errors
     email_status = "not sent"
     try:
@@ -190,18 +225,37 @@ def try_auto_add_student_from_text(text: str) -> str | None:
 
 # --------- Chat Endpoint ----------
 @student_router.post("/chat/{thread_id}")
-async def chat_endpoint(thread_id: str, request: ChatRequest = Body(...)) -> Dict:
+async def chat_endpoint(
+    thread_id: str, request: ChatRequest = Body(...), claims: dict | None = Depends(optional_token)
+) -> Response:
+    # Every turn is traced (LLM calls, tools, DB steps) and persisted per thread
+    trace = start_trace(thread_id)
+    # Every log line of the turn names its thread
+    log_token = thread_id_var.set(thread_id)
+    try:
+        # Returned as a Response so the full history skips jsonable_encoder
+        owner = claims.get("user_id") if claims else None
+        return FastJSONResponse(await _chat_turn(thread_id, request, trace, owner))
+    finally:
+        # While Mongo's breaker is open the insert would only wait out a timeout
+        if MONGO_BREAKER.state != OPEN:
+            finish_trace(trace, db)
+        thread_id_var.reset(log_token)
+
+
+async def _chat_turn(thread_id: str, request: ChatRequest, trace, owner: str | None = None) -> Dict:
     try:
         user_text = request.user_input.strip() if request.user_input else None
         if not user_text:
             raise HTTPException(status_code=400, detail="User input cannot be empty.")
 
-       
-        save_message(thread_id, "user", user_text)
+        # Mongo unreachable: answer now instead of waiting out server selection
+        MONGO_BREAKER.check()
+        save_message(thread_id, "user", user_text, owner)
 
         # Fetch last 10 messages as context
-        history_cursor = chats_collection.find({"thread_id": thread_id}).sort("timestamp", -1).limit(10)
-        history = list(history_cursor)[::-1]  # reverse to oldest→newest
+        with span("load_context", "db"):
+            history = chat_store.recent(thread_id, 10)  # oldest→newest
 
         messages = [{"role": doc["role"], "content": doc["content"]} for doc in history]
 
@@ -211,44 +265,46 @@ async def chat_endpoint(thread_id: str, request: ChatRequest = Body(...)) -> Dic
         assistant_reply: str
 
         # First try lightweight auto-add intent without heavy agent stack
-        auto_add_reply = try_auto_add_student_from_text(user_text)
+        with span("auto_add", "step"):
+            auto_add_reply = try_auto_add_student_from_text(user_text)
         if auto_add_reply:
+            trace.attrs["handled_by"] = "auto_add"
             assistant_reply = auto_add_reply
         else:
             if AGENT_AVAILABLE and agent is not None and Runner is not None:
                 try:
                     # Instantiate runner and run agent
                     runner = Runner()
-                    result = await runner.run(agent, messages)
+                    trace.attrs["handled_by"] = "agent"
+                    with span("agent_run", "agent", input_messages=len(messages)):
+                        result = await runner.run(agent, messages)
                     assistant_reply = str(getattr(result, "final_output", "")) or "(no response)"
-                except Exception:
+                except Exception as e:
+                    # Gemini's breaker is open: the first model call failed fast
+                    if isinstance(e, CircuitOpenError):
+                        trace.attrs["circuit_open"] = e.name
                     # Fallback if agent execution fails
+                    trace.attrs["handled_by"] = "fallback"
                     assistant_reply = (
                         f'I received your message: "{user_text}". The AI agent is initializing. '
                         "You can ask about student records, departments, campus info, or simple analytics."
                     )
             else:
                 # No agent stack available; return a safe, deterministic reply
+                trace.attrs["handled_by"] = "fallback"
                 assistant_reply = (
                     f'I received your message: "{user_text}". The AI agent is initializing. '
                     "You can ask about student records, departments, campus info, or simple analytics."
                 )
 
         # Save assistant reply
-        save_message(thread_id, "assistant", assistant_reply)
+        with span("save_reply", "db"):
+            save_message(thread_id, "assistant", assistant_reply, owner)
 
         # Fetch full thread history for response
-        full_history_cursor = chats_collection.find({"thread_id": thread_id}).sort("timestamp", 1)
-        full_history = [
-            {
-                "id": str(doc["_id"]),
-                "thread_id": doc["thread_id"],
-                "role": doc["role"],
-                "content": doc["content"],
-                "timestamp": doc["timestamp"]
-            }
-            for doc in full_history_cursor
-        ]
+        with span("load_history", "db") as s:
+            full_history = chat_store.history(thread_id)
+            s.attrs["messages"] = len(full_history)
 
         return {
             "thread_id": thread_id,
@@ -260,14 +316,83 @@ async def chat_endpoint(thread_id: str, request: ChatRequest = Body(...)) -> Dic
         # pass through FastAPI HTTP exceptions as-is
         raise
     except Exception as e:
+        logger.exception("Chat turn failed")
         # On unexpected errors, return a friendly message instead of a 500 that breaks the UI
-        try:
-            # Try to at least persist the error as an assistant note for traceability
-            save_message(thread_id, "assistant", f"An error occurred, but your message was received: {str(e)}")
-        except Exception:
-            pass
+        if isinstance(e, CircuitOpenError):
+            # Nothing to persist into while Mongo is down
+            trace.attrs["circuit_open"] = e.name
+        else:
+            try:
+                # Try to at least persist the error as an assistant note for traceability
+                save_message(
+                    thread_id, "assistant", f"An error occurred, but your message was received: {str(e)}", owner
+                )
+            except Exception:
+                pass
         return {
             "thread_id": thread_id,
             "response": "Something went wrong, but your message was received. Please try again shortly.",
             "history": [],
         }
+
+
+# --------- Thread Listing ----------
+def _encode_thread_cursor(doc: dict) -> str:
+    raw = json.dumps({"v": doc["last_activity"].isoformat(), "id": doc["_id"]})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_thread_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(raw["v"]), str(raw["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@student_router.get("/chats")
+def list_threads(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="`next_cursor` from the previous page"),
+    claims: dict = Depends(verify_token),
+) -> Dict:
+    """
+    The caller's conversations, most recently active first, from the
+    per-thread summaries; a page costs the same however many messages are
+    stored.
+    """
+    owner = claims.get("user_id")
+    if not owner:
+        raise HTTPException(status_code=401, detail="Token has no user", headers={"WWW-Authenticate": "Bearer"})
+    after = _decode_thread_cursor(cursor) if cursor else None
+    docs = read_threads(db, owner, limit + 1, after)
+    next_cursor = _encode_thread_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return {
+        "threads": [
+            {
+                "thread_id": doc["_id"],
+                "message_count": doc["message_count"],
+                "last_activity": doc["last_activity"],
+                "last_role": doc.get("last_role"),
+                "preview": doc.get("preview", ""),
+            }
+            for doc in docs[:limit]
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+# --------- Chat Traces ----------
+@student_router.get("/traces/slowest")
+def slowest_traces(hours: int = Query(24, ge=1, le=24 * 30), limit: int = Query(20, ge=1, le=200)) -> List[Dict]:
+    """Slowest chat turns in the window, with their per-step breakdown."""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    cursor = traces_collection.find({"started_at": {"$gte": since}}, {"_id": 0}).sort("duration_ms", -1).limit(limit)
+    return list(cursor)
+
+
+@student_router.get("/traces/{thread_id}")
+def thread_traces(thread_id: str, limit: int = Query(20, ge=1, le=200)) -> List[Dict]:
+    """Most recent traced turns of one thread, newest first."""
+    cursor = traces_collection.find({"thread_id": thread_id}, {"_id": 0}).sort("started_at", -1).limit(limit)
+    return list(cursor)
@@ -1,48 +1,78 @@
-﻿from fastapi import APIRouter, Depends
+﻿from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pymongo.collection import Collection
-from db.db import get_db
-from utils.auth_utils import create_access_token, hash_password, verify_password
+from pymongo.errors import DuplicateKeyError
+from db.db import EMAIL_COLLATION, email_index_ready, get_db
+from utils.auth_utils import (
+    PasswordPoolBusy,
+    create_access_token,
+    hash_password_async,
+    verify_password_async,
+)
 from model.model import LoginUser, UserCreate, ResetPasswordRequest
-from bson import ObjectId
 
 user_router = APIRouter()
 
 
+def _password_pool_busy() -> HTTPException:
+    # Shed the request instead of queueing behind a login spike
+    return HTTPException(
+        status_code=503,
+        detail="Too many password operations in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @user_router.post("/register")
-def create_user(user: UserCreate, db=Depends(get_db)):
+async def create_user(user: UserCreate, db=Depends(get_db)):
     try:
         users_collection: Collection = db["signup"]
 
-        if users_collection.find_one({"email": user.email}):
-            return {
-                "message": "Email already registered",
-                "status": "error",
-                "data": None,
-            }
-
-        user_hash_password = hash_password(user.password)
+        # Without the unique index (not built yet, or blocked by legacy
+        # duplicates) nothing else stops a second account for the address
+        if not email_index_ready():
+            existing = await run_in_threadpool(
+                users_collection.find_one, {"email": user.email}, {"_id": 1}, collation=EMAIL_COLLATION
+            )
+            if existing:
+                return {
+                    "message": "Email already registered",
+                    "status": "error",
+                    "data": None,
+                }
+
+        user_hash_password = await hash_password_async(user.password)
         user_doc = {
             "name": user.name,
             "email": user.email,
             "password": user_hash_password,
         }
 
-        result = users_collection.insert_one(user_doc)
-        db_user = users_collection.find_one({"_id": result.inserted_id})
+        # The unique email index rejects duplicates; insert_one also fills in _id
+        try:
+            await run_in_threadpool(users_collection.insert_one, user_doc)
+        except DuplicateKeyError:
+            return {
+                "message": "Email already registered",
+                "status": "error",
+                "data": None,
+            }
 
         token = create_access_token(
             data={
-                "email": db_user["email"],
-                "name": db_user["name"],
-                "user_id": str(db_user["_id"]),
+                "email": user_doc["email"],
+                "name": user_doc["name"],
+                "user_id": str(user_doc["_id"]),
             }
         )
 
         return {
-            "data": {"name": db_user["name"], "email": db_user["email"], "token": token},
+            "data": {"name": user_doc["name"], "email": user_doc["email"], "token": token},
             "message": "User registered successfully",
             "status": "success",
         }
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
     except Exception as e:
         return {
             "message": f"Registration failed: {str(e)}",
@@ -52,11 +82,13 @@ def create_user(user: UserCreate, db=Depends(get_db)):
 
 
 @user_router.post("/login")
-def login_user(user: LoginUser, db=Depends(get_db)):
+async def login_user(user: LoginUser, db=Depends(get_db)):
     try:
         users_collection: Collection = db["signup"]
 
-        db_user = users_collection.find_one({"email": user.email})
+        db_user = await run_in_threadpool(
+            users_collection.find_one, {"email": user.email}, collation=EMAIL_COLLATION
+        )
         if not db_user:
             return {
                 "message": "Email not found",
@@ -64,7 +96,7 @@ def login_user(user: LoginUser, db=Depends(get_db)):
                 "data": None,
             }
 
-        is_valid_password = verify_password(user.password, db_user["password"])
+        is_valid_password = await verify_password_async(user.password, db_user["password"])
         if not is_valid_password:
             return {
                 "message": "Invalid password",
@@ -85,6 +117,8 @@ def login_user(user: LoginUser, db=Depends(get_db)):
             "message": "User logged in successfully",
             "status": "success",
         }
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
     except Exception as e:
         return {
             "message": f"Login failed: {str(e)}",
@@ -94,40 +128,22 @@ def login_user(user: LoginUser, db=Depends(get_db)):
 
 
 @user_router.post("/reset-password")
-def reset_password(request: ResetPasswordRequest, db=Depends(get_db)):
+async def reset_password(request: ResetPasswordRequest, db=Depends(get_db)):
     try:
         users_collection: Collection = db["signup"]
 
-        email = request.email.strip().lower()
-        user = users_collection.find_one({"email": email})
-        if not user:
-            return {
-                "message": "Email not found",
-                "status": "error",
-            }
-
-        hashed_pw = hash_password(request.new_password)
-        user_id = user.get("_id")
-        if not isinstance(user_id, ObjectId):
-            try:
-                user_id = ObjectId(user_id)
-            except Exception:
-                user_id = None
-
-        if user_id is None:
-            return {
-                "message": "Invalid user id",
-                "status": "error",
-            }
-
-        result = users_collection.update_one(
-            {"_id": user_id},
+        email = request.email
+        hashed_pw = await hash_password_async(request.new_password)
+        user = await run_in_threadpool(
+            users_collection.find_one_and_update,
+            {"email": email},
             {"$set": {"password": hashed_pw}},
+            projection={"_id": 1},
+            collation=EMAIL_COLLATION,
         )
-
-        if result.modified_count == 0:
+        if not user:
             return {
-                "message": "Password update failed",
+                "message": "Email not found",
                 "status": "error",
             }
 
@@ -135,6 +151,8 @@ def reset_password(request: ResetPasswordRequest, db=Depends(get_db)):
             "message": f"Password has been reset for {email}",
             "status": "success",
         }
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
     except Exception as e:
         return {
             "message": f"Password reset failed: {str(e)}",
@@ -0,0 +1,33 @@
+"""
+Shared fixtures. Tests that need the app run it in-process against the
+stand-ins from benchmarks/standins.py (in-memory mongomock, fake LLM and SMTP),
+so they need the dev packages: ``pip install pytest mongomock httpx``.
+"""
+import os
+
+import pytest
+
+# Cheapest bcrypt cost, so password tests don't spend seconds hashing
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+
+@pytest.fixture(scope="session")
+def env():
+    from benchmarks import standins
+
+    return standins.install()
+
+
+@pytest.fixture
+def db(env):
+    """The stand-in database, emptied before each test (indexes are kept)."""
+    for name in env.db.list_collection_names():
+        env.db[name].delete_many({})
+    return env.db
+
+
+@pytest.fixture
+def client(env, db):
+    from fastapi.testclient import TestClient
+
+    return TestClient(env.app)
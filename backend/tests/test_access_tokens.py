@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from utils import auth_utils
+from utils.auth_utils import ALGORITHM, SECRET_KEY, create_access_token, verify_access_token
+
+
+def test_token_round_trip():
+    token = create_access_token({"email": "ali@example.edu", "user_id": "u1"})
+    assert jwt.get_unverified_header(token)["alg"] == "HS256"
+    claims = verify_access_token(token)
+    assert claims["email"] == "ali@example.edu"
+    assert isinstance(claims["exp"], int)
+
+
+def test_tampered_and_foreign_tokens_are_rejected():
+    token = create_access_token({"user_id": "u1"})
+    assert verify_access_token(token[:-2] + ("AA" if not token.endswith("AA") else "BB")) is None
+    forged = jwt.encode({"user_id": "u1", "exp": int(time.time()) + 60}, "other-secret", algorithm=ALGORITHM)
+    assert verify_access_token(forged) is None
+    without_exp = jwt.encode({"user_id": "u1"}, SECRET_KEY, algorithm=ALGORITHM)
+    assert verify_access_token(without_exp) is None
+
+
+def test_expired_token_is_rejected():
+    token = create_access_token({"user_id": "u1"}, expires_delta=timedelta(seconds=-1))
+    assert verify_access_token(token) is None
+
+
+def test_cache_hit_rechecks_expiry_and_returns_a_copy(monkeypatch):
+    token = create_access_token({"user_id": "u1"}, expires_delta=timedelta(seconds=60))
+    first = verify_access_token(token)
+    first["user_id"] = "changed"
+    assert verify_access_token(token)["user_id"] == "u1"
+
+    monkeypatch.setattr(auth_utils.time, "time", lambda: first["exp"] + 1)
+    assert verify_access_token(token) is None
+
+
+def test_verify_token_dependency_raises_401():
+    with pytest.raises(HTTPException) as caught:
+        auth_utils.verify_token("not-a-token")
+    assert caught.value.status_code == 401
+    assert caught.value.headers == {"WWW-Authenticate": "Bearer"}
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import chat_archive
+from db.chat_archive import CollectionArchive, FileArchive, archive_idle_threads, rehydrate
+from db.chats import get_chat_store
+from db.threads import record_message
+
+OLD = datetime.utcnow() - timedelta(days=90)
+
+
+@pytest.fixture(params=["collection", "files"])
+def archive(request, db, tmp_path):
+    return CollectionArchive(db) if request.param == "collection" else FileArchive(str(tmp_path))
+
+
+def _save(db, store, thread_id, count, start=OLD):
+    for i in range(count):
+        when = start + timedelta(minutes=i)
+        store.save(thread_id, "user", f"{thread_id}-{i}", when)
+        record_message(db, thread_id, "user", f"{thread_id}-{i}", when)
+
+
+def test_archive_and_rehydrate_round_trip(db, archive):
+    store = get_chat_store(db)
+    _save(db, store, "idle", 3)
+    _save(db, store, "active", 2, start=datetime.utcnow())
+    original = store.history("idle")
+
+    report = archive_idle_threads(store, archive, idle_days=30)
+    assert (report["threads"], report["messages"], report["failed"]) == (1, 3, 0)
+    assert store.history("idle") == []
+    assert len(store.history("active")) == 2
+    assert db["threads"].find_one({"_id": "idle"}).get("hot") is None
+
+    assert rehydrate(store, archive, "idle") == 3
+    assert store.history("idle") == original
+    assert archive.get("idle") is None
+    assert rehydrate(store, archive, "idle") == 0
+
+
+def test_rehydrate_keeps_messages_saved_meanwhile(db, archive):
+    store = get_chat_store(db, "bucketed")
+    _save(db, store, "t", 2)
+    archive_idle_threads(store, archive, idle_days=30)
+
+    store.save("t", "user", "new", datetime.utcnow())
+    assert rehydrate(store, archive, "t") == 2
+    assert [m["content"] for m in store.history("t")] == ["t-0", "t-1", "new"]
+    store.save("t", "assistant", "reply", datetime.utcnow())
+    assert store.recent("t", 2)[-1]["content"] == "reply"
+
+
+def test_a_thread_that_fails_is_skipped(db, archive, monkeypatch, caplog):
+    store = get_chat_store(db)
+    _save(db, store, "huge", 1)
+    _save(db, store, "fine", 1, start=OLD + timedelta(hours=1))
+    encode = chat_archive.encode_thread
+
+    def encode_thread(thread_id, messages):
+        if thread_id == "huge":
+            raise ValueError("document too large")
+        return encode(thread_id, messages)
+
+    monkeypatch.setattr(chat_archive, "encode_thread", encode_thread)
+    report = archive_idle_threads(store, archive, idle_days=30)
+    assert (report["threads"], report["failed"]) == (1, 1)
+    assert "Could not archive chat thread huge" in caplog.text
+    assert len(store.history("huge")) == 1
+    assert archive.get("fine") is not None
+
+
+def test_file_names_stay_short_for_long_thread_ids(tmp_path):
+    archive = FileArchive(str(tmp_path))
+    thread_id = "é" * 300
+    archive.put(thread_id, "gz", b"blob", {})
+    assert archive.get(thread_id) == ("gz", b"blob")
+    assert all(len(name) < 100 for name in (p.name for p in tmp_path.iterdir()))
+
+
+def test_reopened_thread_is_rehydrated_by_the_chat_route(env, db, monkeypatch):
+    from routes import student_routes
+
+    _save(db, student_routes.chat_store, "reopened", 2)
+    archive_idle_threads(student_routes.chat_store, student_routes.chat_archive, idle_days=30)
+
+    before = env.ops.snapshot()
+    student_routes.save_message("reopened", "user", "back again")
+    assert any(name == "chat_archive" for name, _ in env.ops.snapshot() - before)
+    contents = [m["content"] for m in student_routes.chat_store.history("reopened")]
+    assert contents == ["reopened-0", "reopened-1", "back again"]
+
+    # Active threads cost no archive lookup
+    before = env.ops.snapshot()
+    student_routes.save_message("reopened", "assistant", "welcome back")
+    assert not any(name == "chat_archive" for name, _ in env.ops.snapshot() - before)
+
+
+@pytest.mark.parametrize("step", ["put", "delete_thread"])
+def test_message_saved_mid_pass_gets_the_archived_history_back(env, db, monkeypatch, step):
+    from routes import student_routes
+
+    store, archive = student_routes.chat_store, student_routes.chat_archive
+    _save(db, store, "busy", 2)
+    target = archive if step == "put" else store
+    original = getattr(target, step)
+
+    def interleaved(*args):
+        # The chat route saves right before the archiver's next write lands
+        student_routes.save_message("busy", "user", "still here")
+        return original(*args)
+
+    monkeypatch.setattr(target, step, interleaved)
+    report = archive_idle_threads(store, archive, idle_days=30)
+    assert (report["threads"], report["failed"]) == (0, 0)
+    assert [m["content"] for m in store.history("busy")] == ["busy-0", "busy-1", "still here"]
+    assert archive.get("busy") is None
+    assert db["threads"].find_one({"_id": "busy"})["hot"] is True
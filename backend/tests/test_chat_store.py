@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from db import chats
+from db.chats import BucketedChatStore, MessageChatStore, _ChatStore, get_chat_store, migrate
+from db.threads import record_message
+
+T0 = datetime(2026, 1, 1, 9, 0)
+
+
+@pytest.fixture(params=["messages", "bucketed"])
+def store(request, db):
+    store = get_chat_store(db, request.param)
+    if isinstance(store, BucketedChatStore):
+        store.bucket_size = 3
+    return store
+
+
+def _save(db, store, thread_id, count, start=T0):
+    for i in range(count):
+        when = start + timedelta(minutes=i)
+        store.save(thread_id, "user" if i % 2 == 0 else "assistant", f"m{i}", when)
+        record_message(db, thread_id, "user", f"m{i}", when)
+
+
+def test_chat_store_is_abstract():
+    with pytest.raises(TypeError):
+        _ChatStore()
+
+
+def test_save_recent_and_history(db, store):
+    _save(db, store, "t", 7)
+    _save(db, store, "other", 2)
+
+    assert [m["content"] for m in store.history("t")] == [f"m{i}" for i in range(7)]
+    assert [m["content"] for m in store.recent("t", 4)] == ["m3", "m4", "m5", "m6"]
+    assert store.recent("t", 0) == []
+    assert {m["thread_id"] for m in store.history("other")} == {"other"}
+    assert len({m["id"] for m in store.history("t")}) == 7
+
+
+def test_buckets_roll_over_when_full(db):
+    store = BucketedChatStore(db, bucket_size=3)
+    _save(db, store, "t", 7)
+    buckets = list(db[chats.BUCKETS_COLLECTION].find({"thread_id": "t"}).sort("first_ts", 1))
+    assert [b["count"] for b in buckets] == [3, 3, 1]
+    assert [b.get("open", False) for b in buckets] == [False, False, True]
+
+
+def test_append_retries_when_a_concurrent_save_opened_the_bucket(db, monkeypatch):
+    store = BucketedChatStore(db, bucket_size=3)
+    append = store._append
+    raced = []
+
+    def racing_append(thread_id, update):
+        if not raced:
+            raced.append(True)
+            raise DuplicateKeyError("open_bucket_unique")
+        return append(thread_id, update)
+
+    monkeypatch.setattr(store, "_append", racing_append)
+    store.save("t", "user", "hello", T0)
+    assert [m["content"] for m in store.history("t")] == ["hello"]
+
+
+def test_idle_threads_come_from_hot_summaries(env, db, store):
+    _save(db, store, "old", 2, start=T0)
+    _save(db, store, "older", 2, start=T0 - timedelta(days=1))
+    _save(db, store, "new", 2, start=T0 + timedelta(days=10))
+    before = T0 + timedelta(days=5)
+
+    ops = env.ops.snapshot()
+    assert [t for t, _ in store.idle_threads(before, 10)] == ["older", "old"]
+    assert [t for t, _ in store.idle_threads(before, 1)] == ["older"]
+    assert env.ops.snapshot() - ops == {("threads", "find"): 2}
+
+    store.delete_thread("older", T0)
+    assert store.history("older") == []
+    assert [t for t, _ in store.idle_threads(before, 10)] == ["old"]
+
+
+def test_delete_thread_keeps_later_messages_hot(db, store):
+    _save(db, store, "t", 4)
+    store.delete_thread("t", T0 + timedelta(minutes=1))
+    if isinstance(store, MessageChatStore):
+        assert [m["content"] for m in store.history("t")] == ["m2", "m3"]
+    # Summary is newer than the cut-off, so the thread is still a candidate later on
+    assert db["threads"].find_one({"_id": "t"})["hot"] is True
+
+
+def test_migrate_round_trips_between_layouts(db):
+    source = MessageChatStore(db)
+    _save(db, source, "a", 5)
+    _save(db, source, "b", 1)
+    expected = {t: source.history(t) for t in ("a", "b")}
+
+    report = migrate(db, "bucketed", drop_source=True)
+    assert report == {"threads": 2, "messages": 6, "source": "chats", "target": "chat_buckets"}
+    assert db[chats.MESSAGES_COLLECTION].count_documents({}) == 0
+    bucketed = BucketedChatStore(db)
+    assert {t: bucketed.history(t) for t in ("a", "b")} == expected
+
+    migrate(db, "messages")
+    migrate(db, "messages")  # re-running replaces instead of duplicating
+    assert {t: source.history(t) for t in ("a", "b")} == expected
@@ -0,0 +1,114 @@
+import types
+
+import pytest
+
+from utils import circuit_breaker
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, MONGO_BREAKER, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(monotonic=clock, perf_counter=clock))
+    return clock
+
+
+def _breaker(**overrides):
+    options = {"failure_rate": 0.5, "minimum_calls": 4, "window": 60, "open_seconds": 30}
+    return CircuitBreaker("test", **{**options, **overrides})
+
+
+def test_opens_once_failure_rate_is_reached_with_enough_calls(clock):
+    breaker = _breaker()
+    for failed in (True, True, True):
+        breaker.before_call()
+        breaker.record(failed)
+    assert breaker.state == CLOSED  # below minimum_calls
+    breaker.record(False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == 30
+
+
+def test_old_calls_leave_the_window(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record(True)
+    clock.now += 61
+    for _ in range(3):
+        breaker.record(False)
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(True)
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one probe at a time
+    breaker.record(True)
+    assert breaker.state == OPEN
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = _breaker(slow_call_seconds=2)
+    for _ in range(4):
+        with breaker.guard():
+            clock.now += 3
+    assert breaker.state == OPEN
+
+
+def test_guard_records_only_failures_it_is_told_about(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        with pytest.raises(KeyError):
+            with breaker.guard(is_failure=lambda exc: not isinstance(exc, KeyError)):
+                raise KeyError("client error")
+    assert breaker.state == CLOSED
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            with breaker.guard():
+                raise ConnectionError
+    assert breaker.state == OPEN
+
+
+def test_cancelled_probe_is_released(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(True)
+    clock.now += 30
+    with pytest.raises(KeyboardInterrupt):
+        with breaker.guard():
+            raise KeyboardInterrupt
+    breaker.before_call()  # the probe slot is free again
+
+
+def test_open_breaker_answers_503_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(MONGO_BREAKER, "_state", OPEN)
+    monkeypatch.setattr(MONGO_BREAKER, "_opened_at", circuit_breaker.time.monotonic())
+    monkeypatch.setattr(MONGO_BREAKER, "open_seconds", 12.5)
+
+    response = client.post("/users/login", json={"email": "a@example.com", "password": "x"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "13"
+    assert "mongodb" in response.json()["detail"]
@@ -0,0 +1,83 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from middleware.compression import CompressionMiddleware, negotiate
+from utils.response_cache import ResponseCache
+
+BODY = "x" * 2000
+
+
+@pytest.mark.parametrize("header, brotli_available, expected", [
+    ("gzip, br", True, "br"),
+    ("gzip, br", False, "gzip"),
+    ("br;q=0.5, gzip", True, "gzip"),
+    ("gzip;q=0", True, None),
+    ("br;q=0, gzip;q=0", True, None),
+    ("*", True, "br"),
+    ("*", False, "gzip"),
+    ("*;q=0, gzip", True, "gzip"),
+    ("identity", True, None),
+    ("gzip;q=oops", True, None),
+])
+def test_negotiate_honours_q_values(header, brotli_available, expected):
+    assert negotiate(header, brotli_available) == expected
+
+
+def _client():
+    app = FastAPI()
+    cache = ResponseCache()
+
+    @app.get("/text")
+    def text(size: int):
+        return PlainTextResponse("x" * size)
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter(["data: 1\n\n", "data: 2\n\n"]), media_type="text/event-stream")
+
+    @app.get("/chunks")
+    def chunks():
+        return StreamingResponse(iter([BODY, BODY]), media_type="text/plain")
+
+    @app.get("/cached")
+    def cached(request: Request):
+        return cache.respond(request, "cached", 60, lambda: {"body": BODY})
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_compresses_only_from_the_minimum_size():
+    client = _client()
+    small = client.get("/text", params={"size": 1023}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers and small.text == "x" * 1023
+
+    large = client.get("/text", params={"size": 1024}, headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip" and large.headers["vary"] == "Accept-Encoding"
+    assert large.text == "x" * 1024
+    assert int(large.headers["content-length"]) == len(gzip.compress(b"x" * 1024, compresslevel=6, mtime=0))
+
+
+def test_streams_pass_through_untouched():
+    client = _client()
+    events = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in events.headers and events.text == "data: 1\n\ndata: 2\n\n"
+    chunks = client.get("/chunks", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in chunks.headers and chunks.text == BODY * 2
+
+
+def test_compressed_etag_is_weak_and_still_revalidates():
+    client = _client()
+    plain = client.get("/cached", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    compressed = client.get("/cached", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == "W/" + plain.headers["etag"]
+
+    headers = {"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]}
+    revalidated = client.get("/cached", headers=headers)
+    assert revalidated.status_code == 304
@@ -0,0 +1,82 @@
+import pytest
+
+from db.counters import (
+    COUNTERS_COLLECTION,
+    read_counters,
+    reconcile_counters,
+    record_department_changed,
+    record_student_removed,
+    record_students_added,
+)
+
+GROUP_BY_DEPARTMENT = [
+    {"$group": {"_id": {"$ifNull": ["$department", "Unknown"]}, "count": {"$sum": 1}}},
+    {"$project": {"_id": 0, "department": "$_id", "count": 1}},
+    {"$sort": {"count": -1, "department": 1}},
+]
+
+
+@pytest.fixture
+def analytics(env):
+    from routes import analytics
+
+    analytics.analytics_cache.invalidate()
+    return analytics
+
+
+def _ops(env, collection):
+    return sum(n for (name, _), n in env.ops.snapshot().items() if name == collection)
+
+
+def test_writes_keep_counters_in_step(db):
+    record_students_added(db, ["CS", "CS", None, ""])
+    record_department_changed(db, "CS", "Math")
+    record_department_changed(db, None, None)
+    record_student_removed(db, "")
+
+    total, departments = read_counters(db)
+    assert total == 3
+    assert departments == [
+        {"department": "CS", "count": 1},
+        {"department": "Math", "count": 1},
+        {"department": "Unknown", "count": 1},
+    ]
+
+
+def test_empty_department_is_its_own_bucket_like_the_group_pipeline(db):
+    db["students"].insert_many([
+        {"id": 1, "department": "CS"}, {"id": 2, "department": ""}, {"id": 3, "department": None}, {"id": 4},
+    ])
+    record_students_added(db, [d.get("department") for d in db["students"].find()])
+    counted = read_counters(db)[1]
+    assert counted == list(db["students"].aggregate(GROUP_BY_DEPARTMENT))
+
+    report = reconcile_counters(db)
+    assert report["drift"] == [] and report["total"] == {"counter": 4, "actual": 4}
+
+
+def test_reconcile_reports_and_fixes_drift(db):
+    db["students"].insert_many([{"id": 1, "department": "CS"}, {"id": 2, "department": "CS"}])
+    record_students_added(db, ["CS", "Bio"])
+    report = reconcile_counters(db)
+    assert report["drift"] == [
+        {"department": "Bio", "counter": 1, "actual": 0},
+        {"department": "CS", "counter": 1, "actual": 2},
+    ]
+    assert read_counters(db) == (2, [{"department": "CS", "count": 2}])
+
+
+def test_total_is_one_read_once_built(env, db, analytics):
+    db["students"].insert_many([{"id": 1, "department": "CS"}, {"id": 2}])
+    assert analytics.get_total_students() == 2  # builds the counters
+    before = _ops(env, COUNTERS_COLLECTION)
+    assert analytics.get_total_students() == 2
+    assert _ops(env, COUNTERS_COLLECTION) - before == 1
+
+
+def test_counter_endpoints(client, db, analytics):
+    record_students_added(db, ["CS", "CS", "Math"])
+    assert client.get("/analytics/analytics/total-students").json()["total_students"] == 3
+    body = client.get("/analytics/analytics/students-by-department").json()
+    assert body["total_departments"] == 2
+    assert body["results"] == [{"department": "CS", "count": 2}, {"department": "Math", "count": 1}]
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.counters import record_students_added
+
+
+@pytest.fixture
+def analytics(env):
+    from routes import analytics
+
+    analytics.analytics_cache.invalidate()
+    return analytics
+
+
+def _add_students(db, rows):
+    db["students"].insert_many(rows)
+    record_students_added(db, [row.get("department") for row in rows])
+
+
+def test_dashboard_snapshot(client, db, analytics):
+    now = datetime.utcnow()
+    _add_students(db, [
+        {"id": i, "name": f"S{i}", "email": f"s{i}@example.edu", "department": "CS" if i % 3 else "Math",
+         "created_at": now - timedelta(days=i), "last_active": now - timedelta(days=2 * i), "age": 20}
+        for i in range(1, 7)
+    ])
+    body = client.get("/analytics/analytics/dashboard", params={"recent_limit": 2}).json()
+    assert body["total_students"] == 6
+    assert body["departments"] == [{"department": "CS", "count": 4}, {"department": "Math", "count": 2}]
+    assert body["total_departments"] == 2
+    assert [s["id"] for s in body["recent"]["students"]] == [1, 2]
+    assert set(body["recent"]["students"][0]) == {"id", "name", "department", "email", "created_at"}
+    assert body["active_last_7_days"] == 3
+
+
+def test_dashboard_reads_counters_not_a_collection_scan(env, db, analytics):
+    _add_students(db, [{"id": 1, "department": "CS", "created_at": datetime.utcnow()}])
+    analytics.get_counters()  # counters exist from here on
+    before = env.ops.snapshot()
+    analytics.get_dashboard_snapshot(5)
+    used = env.ops.snapshot() - before
+    assert used == {("student_counters", "find"): 1, ("students", "find"): 1, ("students", "count_documents"): 1}
+
+
+def test_dashboard_and_live_feed_agree(db, analytics):
+    _add_students(db, [{"id": 1, "department": "CS"}, {"id": 2, "department": None}])
+    snapshot = analytics.get_dashboard_snapshot(5)
+    live = analytics._live_state()
+    assert live["total_students"] == snapshot["total"]
+    assert live["departments"] == {d["department"]: d["count"] for d in snapshot["by_department"]}
@@ -0,0 +1,31 @@
+from email import message_from_bytes, policy
+
+from email_utils.templates import WelcomeTemplate, _encode_address
+
+template = WelcomeTemplate(from_name="Admissions Office", site_url="https://example.edu/", phone="+1 555 0100")
+
+
+def test_ascii_sender_is_unchanged():
+    assert _encode_address("Admissions Office <office@example.edu>") == "Admissions Office <office@example.edu>"
+
+
+def test_non_ascii_display_name_keeps_the_address_readable():
+    encoded = _encode_address("Bürö <office@example.edu>")
+    assert encoded.endswith(" <office@example.edu>")
+    assert encoded.startswith("=?utf-8?")
+
+
+def test_message_round_trips_through_the_email_parser():
+    raw = template.build_message("Bürö <office@example.edu>", "ali@example.edu", "Ali <b>", "Physics")
+    message = message_from_bytes(raw, policy=policy.default)
+    assert message["From"].addresses[0].addr_spec == "office@example.edu"
+    assert message["From"].addresses[0].display_name == "Bürö"
+    assert message["Subject"] == "Welcome! You are added in Physics"
+    text, html_part = [part.get_content() for part in message.iter_parts()]
+    assert "Ali <b>" in text
+    assert "Ali &lt;b&gt;" in html_part
+
+
+def test_header_values_cannot_inject_lines():
+    raw = template.build_message("Office\r\nBcc: x@evil <office@example.edu>", "ali@example.edu", "Ali", None)
+    assert b"\r\nBcc:" not in raw.split(b"\r\n\r\n", 1)[0]
@@ -0,0 +1,146 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from middleware.idempotency import IdempotencyMiddleware, IdempotentRoute
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+def _app(calls, collection):
+    app = FastAPI()
+
+    @app.post("/orders")
+    async def create(request: Request):
+        body = await request.json()
+        calls.append(body)
+        await asyncio.sleep(body.get("slow", 0))
+        if body.get("fail"):
+            return JSONResponse({"detail": "boom"}, status_code=503)
+        return JSONResponse({"order": len(calls)}, status_code=201)
+
+    app.add_middleware(IdempotencyMiddleware, routes=[IdempotentRoute("POST", "/orders")], collection=collection)
+    return app
+
+
+@pytest.fixture
+def make_client(db, calls):
+    def make(collection=True):
+        return TestClient(_app(calls, db["idempotency_keys"] if collection else None))
+    return make
+
+
+def _async_client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_retry_replays_the_stored_response(make_client, calls, db):
+    client = make_client()
+    first = client.post("/orders", json={"item": 1}, headers={"Idempotency-Key": "k1"})
+    again = client.post("/orders", json={"item": 1}, headers={"Idempotency-Key": "k1"})
+
+    assert first.status_code == again.status_code == 201
+    assert again.json() == first.json() == {"order": 1}
+    assert again.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert len(calls) == 1
+    assert db["idempotency_keys"].find_one()["state"] == "done"
+
+
+def test_stored_response_is_replayed_by_another_worker(make_client, calls):
+    make_client().post("/orders", json={"item": 1}, headers={"Idempotency-Key": "k1"})
+    replay = make_client().post("/orders", json={"item": 1}, headers={"Idempotency-Key": "k1"})
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+
+def test_key_reused_with_another_body_is_rejected(make_client, calls):
+    client = make_client()
+    client.post("/orders", json={"item": 1}, headers={"Idempotency-Key": "k1"})
+    response = client.post("/orders", json={"item": 2}, headers={"Idempotency-Key": "k1"})
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("key", ["", " ", "x" * 256])
+def test_invalid_key_is_rejected(make_client, calls, key):
+    response = make_client().post("/orders", json={"item": 1}, headers={"Idempotency-Key": key})
+    assert response.status_code == 400
+    assert calls == []
+
+
+def test_requests_without_key_always_run(make_client, calls):
+    client = make_client()
+    client.post("/orders", json={"item": 1})
+    client.post("/orders", json={"item": 1})
+    assert len(calls) == 2
+
+
+def test_server_error_releases_the_key(make_client, calls, db):
+    client = make_client()
+    assert client.post("/orders", json={"fail": True}, headers={"Idempotency-Key": "k1"}).status_code == 503
+    assert db["idempotency_keys"].count_documents({}) == 0
+    assert client.post("/orders", json={"fail": True}, headers={"Idempotency-Key": "k1"}).status_code == 503
+    assert len(calls) == 2
+
+
+def test_in_process_only_without_a_store(make_client, calls, monkeypatch):
+    # As while Mongo's breaker is open
+    monkeypatch.setattr(IdempotencyMiddleware, "collection", property(lambda self: None))
+    client = make_client(collection=False)
+    client.post("/orders", json={"item": 1}, headers={"Idempotency-Key": "k1"})
+    again = client.post("/orders", json={"item": 1}, headers={"Idempotency-Key": "k1"})
+    assert again.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+
+def test_concurrent_duplicates_wait_for_the_first_execution(db, calls):
+    app = _app(calls, db["idempotency_keys"])
+
+    async def scenario():
+        async with _async_client(app) as client:
+            return await asyncio.gather(*(
+                client.post("/orders", json={"slow": 0.2}, headers={"Idempotency-Key": "k1"}) for _ in range(3)
+            ))
+
+    responses = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [r.status_code for r in responses] == [201, 201, 201]
+    assert {r.json()["order"] for r in responses} == {1}
+    assert sorted(r.headers.get("idempotent-replayed", "") for r in responses) == ["", "true", "true"]
+
+
+def test_duplicate_on_another_worker_polls_until_the_first_finishes(db, calls, monkeypatch):
+    collection = db["idempotency_keys"]
+    first_worker, second_worker = _app(calls, collection), _app(calls, collection)
+    claims = []
+    claim_sync = IdempotencyMiddleware._claim_sync
+
+    def recording_claim(*args):
+        result = claim_sync(*args)
+        claims.append(result[0])
+        return result
+
+    monkeypatch.setattr(IdempotencyMiddleware, "_claim_sync", staticmethod(recording_claim))
+
+    async def scenario():
+        async with _async_client(first_worker) as first, _async_client(second_worker) as second:
+            original = asyncio.create_task(
+                first.post("/orders", json={"slow": 0.3}, headers={"Idempotency-Key": "k1"})
+            )
+            await asyncio.sleep(0.1)
+            duplicate = await second.post("/orders", json={"slow": 0.3}, headers={"Idempotency-Key": "k1"})
+            return await original, duplicate
+
+    original, duplicate = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert claims[0] == "claimed" and "pending" in claims and claims[-1] == "done"
+    assert duplicate.status_code == 201 and duplicate.headers["idempotent-replayed"] == "true"
+    assert duplicate.json() == original.json()
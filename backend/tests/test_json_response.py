@@ -0,0 +1,48 @@
+import importlib
+import json
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from utils import json_response
+
+PAYLOAD = {
+    "id": ObjectId("652f0c0a9b1e8a3d4c2b1a00"),
+    "at": datetime(2026, 1, 31, 12, 0, 0, 123456),
+    "aware": datetime(2026, 1, 31, 12, 0, tzinfo=timezone.utc),
+    "name": "Zaïnab",
+    "tags": ("a", "b"),
+    1: "non-string key",
+}
+
+
+@pytest.fixture
+def stdlib_dumps(monkeypatch):
+    """json_response.dumps as it is built when orjson is not installed."""
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    fallback = importlib.reload(json_response)
+    yield fallback.dumps
+    monkeypatch.undo()
+    importlib.reload(json_response)
+
+
+def test_payload_renders_the_same_without_orjson(stdlib_dumps):
+    rendered = stdlib_dumps(PAYLOAD)
+    assert json.loads(rendered) == {
+        "id": "652f0c0a9b1e8a3d4c2b1a00",
+        "at": "2026-01-31T12:00:00.123456",
+        "aware": "2026-01-31T12:00:00+00:00",
+        "name": "Zaïnab",
+        "tags": ["a", "b"],
+        "1": "non-string key",
+    }
+    if json_response.orjson is not None:
+        assert rendered == json_response.dumps(PAYLOAD)
+
+
+def test_fast_json_response_renders_bson_types():
+    response = json_response.FastJSONResponse({"id": ObjectId("652f0c0a9b1e8a3d4c2b1a00"), "at": PAYLOAD["at"]})
+    assert json.loads(response.body) == {"id": "652f0c0a9b1e8a3d4c2b1a00", "at": "2026-01-31T12:00:00.123456"}
+    assert response.headers["content-type"] == "application/json"
@@ -0,0 +1,86 @@
+import asyncio
+
+from utils.live_analytics import LiveAnalyticsPublisher
+
+
+class Counters:
+    def __init__(self):
+        self.state = {"total_students": 1, "departments": {"CS": 1}}
+
+    def add(self, department):
+        departments = dict(self.state["departments"])
+        departments[department] = departments.get(department, 0) + 1
+        self.state = {"total_students": self.state["total_students"] + 1, "departments": departments}
+
+    def __call__(self):
+        return self.state
+
+
+async def _drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+def test_snapshot_then_coalesced_delta():
+    async def scenario():
+        counters = Counters()
+        publisher = LiveAnalyticsPublisher(counters, coalesce_window=0.01)
+        subscriber = await publisher.subscribe()
+        for _ in range(3):
+            counters.add("Math")
+            publisher.notify()
+        await asyncio.sleep(0.05)
+        return publisher, await _drain(subscriber)
+
+    publisher, events = asyncio.run(scenario())
+    assert events == [
+        ("snapshot", {"version": 0, "total_students": 1, "departments": {"CS": 1}}),
+        ("delta", {"version": 1, "total_students": 4, "changed": {"Math": 3}}),
+    ]
+    assert publisher.writes_seen == 3 and publisher.flushes == 1
+
+
+def test_subscribing_during_a_pending_flush_keeps_existing_subscribers_delta():
+    async def scenario():
+        counters = Counters()
+        publisher = LiveAnalyticsPublisher(counters, coalesce_window=0.02)
+        first = await publisher.subscribe()
+        counters.add("Math")
+        publisher.notify()
+        second = await publisher.subscribe()  # before the flush fires
+        await asyncio.sleep(0.06)
+        return await _drain(first), await _drain(second)
+
+    first, second = asyncio.run(scenario())
+    assert first[-1] == ("delta", {"version": 1, "total_students": 2, "changed": {"Math": 1}})
+    # The newcomer's snapshot already had the write; the delta restates the same counts
+    assert second[0] == ("snapshot", {"version": 0, "total_students": 2, "departments": {"CS": 1, "Math": 1}})
+
+
+def test_slow_subscriber_gets_one_snapshot_instead_of_a_backlog():
+    async def scenario():
+        counters = Counters()
+        publisher = LiveAnalyticsPublisher(counters, coalesce_window=0.001, queue_size=2)
+        subscriber = await publisher.subscribe()
+        for department in ("A", "B", "C"):
+            counters.add(department)
+            publisher.notify()
+            await asyncio.sleep(0.01)
+        return publisher, subscriber, await _drain(subscriber)
+
+    publisher, subscriber, events = asyncio.run(scenario())
+    # Queue held the first snapshot and delta A; delta B collapsed both into a snapshot
+    assert [event for event, _ in events] == ["snapshot", "delta"]
+    assert events[0][1]["departments"] == {"CS": 1, "A": 1, "B": 1}
+    assert events[1][1]["changed"] == {"C": 1}
+    assert subscriber.dropped == 2
+    assert publisher.stats()["subscribers"][0]["dropped"] == 2
+
+
+def test_no_subscribers_means_no_work():
+    counters = Counters()
+    publisher = LiveAnalyticsPublisher(counters)
+    publisher.notify()
+    assert publisher.writes_seen == 0
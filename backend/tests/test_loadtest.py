@@ -0,0 +1,33 @@
+import asyncio
+
+import httpx
+
+from benchmarks.loadtest import SCENARIOS, Traffic, percentile, run_level, seed_database
+
+
+def test_percentile_is_nearest_rank():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert percentile(values, 50) == 5
+    assert percentile(values, 95) == 10
+    assert percentile([], 99) == 0.0
+
+
+def test_op_counter_counts_each_collection_call_once(env, db):
+    before = env.ops.snapshot()
+    db["students"].insert_one({"id": 1})
+    db["students"].find_one({"id": 1})
+    used = env.ops.snapshot() - before
+    assert used == {("students", "insert_one"): 1, ("students", "find_one"): 1}
+
+
+def test_mixed_level_runs_clean_against_the_stand_ins(env, db):
+    async def scenario():
+        transport = httpx.ASGITransport(app=env.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await seed_database(env, client, students=20, users=2, seed=1)
+            return await run_level(client, Traffic(1, users=2, threads=3), env.ops, SCENARIOS["mixed"], 30, 4)
+
+    result = asyncio.run(scenario())
+    assert result["requests"] == 30 and result["errors"] == 0
+    assert sum(kind["requests"] for kind in result["by_kind"].values()) == 30
+    assert result["db_ops"] > 0 and result["p50_ms"] <= result["p99_ms"]
@@ -0,0 +1,102 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+from utils.log import (
+    TEXT_FORMAT, JsonFormatter, _QueueHandler, _RequestIdFilter, parse_levels, request_id_var, thread_id_var,
+)
+
+
+def _through_queue(formatter: logging.Formatter, emit):
+    """Log via the queue handler and writer thread as setup_logging wires them; returns the output."""
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(_RequestIdFilter())
+    out = io.StringIO()
+    stream = logging.StreamHandler(out)
+    stream.setFormatter(formatter)
+    listener = logging.handlers.QueueListener(records, stream)
+    logger = logging.getLogger("tests.logging")
+    logger.propagate = False
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        emit(logger)
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+    return out.getvalue()
+
+
+def test_json_entry_carries_extras_request_id_and_traceback_separately():
+    token = request_id_var.set("req-1")
+
+    def emit(logger):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("Failed for %s", "ali", extra={"student_id": 7})
+
+    try:
+        entry = json.loads(_through_queue(JsonFormatter(), emit))
+    finally:
+        request_id_var.reset(token)
+    assert entry["msg"] == "Failed for ali"
+    assert entry["level"] == "ERROR" and entry["request_id"] == "req-1" and entry["student_id"] == 7
+    assert entry["exc"].startswith("Traceback") and "ZeroDivisionError" in entry["exc"]
+    assert "Traceback" not in entry["msg"]
+
+
+def test_text_format_still_appends_the_traceback():
+    def emit(logger):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed")
+
+    lines = _through_queue(logging.Formatter("%(levelname)s %(message)s"), emit).splitlines()
+    assert lines[0] == "ERROR Failed"
+    assert lines[-1] == "ValueError: boom"
+
+
+def test_parse_levels():
+    assert parse_levels("db=warning, tools.student_tool=DEBUG,,bad") == {"db": "WARNING", "tools.student_tool": "DEBUG"}
+
+
+def test_startup_warns_about_missing_optional_modules(env, monkeypatch, caplog):
+    import main
+
+    monkeypatch.setitem(main._OPTIONAL_MODULES, "brotli", (None, "responses are only gzip-compressed"))
+    monkeypatch.setitem(main._OPTIONAL_MODULES, "orjson", (object(), "unused"))
+    with caplog.at_level("WARNING", logger="main"):
+        missing = main.log_missing_optional_modules()
+    assert "brotli" in missing and "orjson" not in missing
+    assert "brotli is not installed; responses are only gzip-compressed" in caplog.text
+
+
+def test_chat_turn_log_lines_carry_the_thread_id(client, monkeypatch):
+    from routes import student_routes
+
+    def broken(thread_id, limit):
+        raise RuntimeError("store down")
+
+    monkeypatch.setattr(student_routes.chat_store, "recent", broken)
+    records = []
+    capture = logging.Handler()
+    capture.emit = records.append
+    capture.addFilter(_RequestIdFilter())
+    logger = logging.getLogger("routes.student_routes")
+    logger.addHandler(capture)
+    try:
+        client.post("/students/chat/thread-42", json={"user_input": "hello"})
+    finally:
+        logger.removeHandler(capture)
+
+    (record,) = records
+    assert record.getMessage() == "Chat turn failed" and record.thread_id == "thread-42"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["thread_id"] == "thread-42" and entry["request_id"] != "-"
+    assert " thread-42 " in logging.Formatter(TEXT_FORMAT).format(record)
+    assert thread_id_var.get() == "-"
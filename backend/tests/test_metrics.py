@@ -0,0 +1,53 @@
+import pytest
+
+from utils import metrics
+from utils.metrics import Counter, Gauge, Histogram
+
+
+@pytest.fixture
+def registered():
+    """Metrics created in a test are taken off the global registry afterwards."""
+    before = list(metrics._registry)
+    yield
+    metrics._registry[:] = before
+
+
+def test_histogram_buckets_are_cumulative(registered):
+    histogram = Histogram("test_seconds", "Test latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/a")
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{route="/a"} 4' in lines
+    assert 'test_seconds_sum{route="/a"} 3.65' in lines
+
+
+def test_timer_and_label_escaping(registered):
+    histogram = Histogram("test_timed_seconds", "Timed", ("name",))
+
+    @histogram.time('a"b')
+    def work():
+        return 42
+
+    assert work() == 42
+    assert any(line.startswith('test_timed_seconds_count{name="a\\"b"} 1') for line in histogram.render())
+
+
+def test_gauge_and_counter(registered):
+    gauge, counter = Gauge("test_state", "State", ("dep",)), Counter("test_total", "Total", ("dep",))
+    gauge.set(2, "x")
+    counter.inc("x")
+    counter.inc("x", amount=2)
+    assert gauge.render()[-1] == 'test_state{dep="x"} 2'
+    assert counter.render()[-1] == 'test_total{dep="x"} 3'
+
+
+def test_requests_are_labelled_by_route_template(client):
+    client.get("/students/traces/some-thread")
+    client.get("/no/such/route")
+    body = client.get("/metrics").text
+    assert 'route="/students/traces/{thread_id}",status="200"' in body
+    assert 'route="unmatched",status="404"' in body
+    assert "some-thread" not in body
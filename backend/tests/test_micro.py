@@ -0,0 +1,26 @@
+from benchmarks import micro
+
+
+def _run(**results):
+    return {"results": {name: dict(zip(("relative", "min", "spread"), values)) for name, values in results.items()}}
+
+
+def test_compare_allows_noise_on_top_of_the_threshold():
+    baseline = _run(steady=(1.0, 0.95, 0.05), noisy=(1.0, 0.8, 0.6))
+    current = _run(steady=(1.3, 1.25, 0.05), noisy=(1.5, 1.1, 0.6))
+    assert micro.compare(current, baseline, 0.20) == ["steady"]
+
+
+def test_compare_needs_the_best_round_to_regress_too():
+    baseline = _run(a=(1.0, 1.0, 0.0))
+    assert micro.compare(_run(a=(1.4, 1.1, 0.1)), baseline, 0.20) == []
+    assert micro.compare(_run(a=(1.4, 1.3, 0.1)), baseline, 0.20) == ["a"]
+
+
+def test_run_reports_median_min_and_spread(monkeypatch):
+    timings = iter([1.0, 10.0, 1.0, 30.0, 1.0, 20.0])
+    monkeypatch.setattr(micro, "register_all", lambda: None)
+    monkeypatch.setattr(micro, "_benchmarks", {"x": object()})
+    monkeypatch.setattr(micro, "time_call", lambda fn, repeat: next(timings))
+    result = micro.run(None, repeat=1, rounds=3)["results"]["x"]
+    assert result == {"ns": 20.0, "relative": 20.0, "min": 10.0, "spread": 0.5}
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+import pytest
+
+from utils import auth_utils
+
+
+def test_hash_and_verify_run_in_the_pool():
+    async def scenario():
+        hashed = await auth_utils.hash_password_async("s3cret")
+        return hashed, await auth_utils.verify_password_async("s3cret", hashed), \
+            await auth_utils.verify_password_async("wrong", hashed)
+
+    hashed, good, bad = asyncio.run(scenario())
+    assert hashed.startswith("$2b$04$")
+    assert good is True and bad is False
+    assert auth_utils.verify_password("s3cret", hashed)
+
+
+def test_full_queue_is_shed(monkeypatch):
+    monkeypatch.setattr(auth_utils, "_password_slots", threading.BoundedSemaphore(1))
+    auth_utils._password_slots.acquire()
+    with pytest.raises(auth_utils.PasswordPoolBusy):
+        asyncio.run(auth_utils.hash_password_async("s3cret"))
+
+
+def test_slot_is_released_after_each_job(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(auth_utils, "_password_slots", slots)
+
+    async def twice():
+        await auth_utils.hash_password_async("a")
+        await auth_utils.hash_password_async("b")
+
+    asyncio.run(twice())
+    assert slots.acquire(blocking=False)
+
+
+def test_login_returns_503_while_the_pool_is_busy(client, monkeypatch):
+    async def busy(*args):
+        raise auth_utils.PasswordPoolBusy()
+
+    monkeypatch.setattr("routes.user_routes.verify_password_async", busy)
+    client.post("/users/register", json={"name": "Ali", "email": "ali@example.edu", "password": "s3cret"})
+    response = client.post("/users/login", json={"email": "ali@example.edu", "password": "s3cret"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from middleware.profiling import ProfilingMiddleware
+from routes import profiling
+from utils.profiler import ProfileStore, SamplingProfiler
+
+TOKEN = "admin-secret"
+
+
+def _busy_handler():
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        pass
+    return {"ok": True}
+
+
+def _client(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", TOKEN)
+    app = FastAPI()
+    app.get("/slow")(_busy_handler)
+    app.include_router(profiling.profiles_router)
+    app.add_middleware(ProfilingMiddleware, token=TOKEN)
+    return TestClient(app)
+
+
+def test_flagged_request_is_profiled_and_downloadable(monkeypatch):
+    client = _client(monkeypatch)
+    response = client.get("/slow", headers={"X-Profile": TOKEN})
+    assert response.json() == {"ok": True}
+    profile_id = response.headers["x-profile-id"]
+
+    listed = client.get("/profiles", headers={"X-Profile": TOKEN}).json()
+    assert listed[0]["id"] == profile_id and listed[0]["path"] == "/slow" and listed[0]["samples"] > 0
+    folded = client.get(f"/profiles/{profile_id}", headers={"X-Profile": TOKEN}).text
+    assert "_busy_handler" in folded
+
+
+def test_unflagged_or_wrong_token_is_not_profiled(monkeypatch):
+    client = _client(monkeypatch)
+    assert "x-profile-id" not in client.get("/slow").headers
+    assert "x-profile-id" not in client.get("/slow", params={"profile": "nope"}).headers
+    assert "x-profile-id" in client.get("/slow", params={"profile": TOKEN}).headers
+    assert client.get("/profiles").status_code == 403
+    assert client.get("/profiles/unknown", headers={"X-Profile": TOKEN}).status_code == 404
+
+
+def test_store_keeps_the_latest_profiles():
+    store = ProfileStore(keep=2)
+    ids = [store.add("GET", f"/{i}", 1.0, SamplingProfiler(0.01)) for i in range(3)]
+    assert [p["id"] for p in store.list()] == ids[:0:-1]
+    assert store.get(ids[0]) is None
+
+
+def test_sampler_folds_stacks():
+    profiler = SamplingProfiler(0.001)
+    done = threading.Event()
+
+    def spin():
+        while not done.is_set():
+            pass
+
+    worker = threading.Thread(target=spin)
+    profiler.start(threading.get_ident())
+    worker.start()
+    time.sleep(0.03)
+    done.set()
+    worker.join()
+    profiler.stop()
+    assert profiler.sample_count > 0
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in profiler.folded().splitlines())
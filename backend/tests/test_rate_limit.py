@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from middleware.rate_limit import RateLimitMiddleware, RateLimitRule, parse_limit
+from utils.auth_utils import create_access_token
+
+
+def test_parse_limit():
+    assert parse_limit("10/60") == (10.0, 10 / 60)
+    assert parse_limit("5") == (5.0, 5.0)
+
+
+@pytest.mark.parametrize("value", ["0/60", "3/0", "-1/5", "x/1", "inf/1", "1/nan"])
+def test_parse_limit_rejects_limits_that_never_refill(value):
+    with pytest.raises(ValueError):
+        parse_limit(value)
+
+
+def test_zero_rate_rule_is_rejected_up_front():
+    with pytest.raises(ValueError):
+        RateLimitMiddleware(None, [RateLimitRule("POST", "/login", 1, 0.0)])
+
+
+def test_bucket_refills_at_rate():
+    limiter = RateLimitMiddleware(None, [RateLimitRule("POST", "/login", 2, 1.0)])
+    rule = limiter.rules[0]
+    assert limiter.take("k", rule, 0.0) == 0
+    assert limiter.take("k", rule, 0.0) == 0
+    assert limiter.take("k", rule, 0.0) == pytest.approx(1.0)
+    assert limiter.take("k", rule, 0.5) == pytest.approx(0.5)
+    assert limiter.take("k", rule, 1.0) == 0
+
+
+def test_sweep_drops_only_full_buckets():
+    limiter = RateLimitMiddleware(None, [RateLimitRule("POST", "/login", 2, 1.0)])
+    rule = limiter.rules[0]
+    limiter.take((0, "ip", "a"), rule, 0.0)
+    limiter.take((0, "ip", "b"), rule, 9.5)
+    limiter.sweep(10.0)
+    assert list(limiter._buckets) == [(0, "ip", "b")]
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _call(limiter, path, ip="10.0.0.1", headers=()):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "client": (ip, 1), "headers": list(headers)}
+    asyncio.run(limiter(scope, None, send))
+    return sent[0]
+
+
+def test_429_with_retry_after_per_ip_and_per_user():
+    limiter = RateLimitMiddleware(_ok, [RateLimitRule("POST", "/students/chat/", 1, 1 / 60)])
+    assert _call(limiter, "/students/chat/t1")["status"] == 200
+    limited = _call(limiter, "/students/chat/t2")
+    assert limited["status"] == 429
+    assert dict(limited["headers"])[b"retry-after"] == b"60"
+    assert _call(limiter, "/students/other")["status"] == 200
+
+    # Same user from another address shares the per-user bucket
+    bearer = [(b"authorization", f"Bearer {create_access_token({'user_id': 'u1'})}".encode())]
+    assert _call(limiter, "/students/chat/t1", ip="10.0.0.2", headers=bearer)["status"] == 200
+    assert _call(limiter, "/students/chat/t1", ip="10.0.0.3", headers=bearer)["status"] == 429
+
+
+def test_denied_request_does_not_charge_the_other_bucket():
+    limiter = RateLimitMiddleware(_ok, [RateLimitRule("POST", "/students/chat/", 1, 1 / 60)])
+    bearer = [(b"authorization", f"Bearer {create_access_token({'user_id': 'u1'})}".encode())]
+    # Exhaust the IP bucket anonymously; the user's attempts from it are refused
+    assert _call(limiter, "/students/chat/t1", ip="10.0.0.9")["status"] == 200
+    for _ in range(3):
+        assert _call(limiter, "/students/chat/t1", ip="10.0.0.9", headers=bearer)["status"] == 429
+    # ...without spending the user's token, which is still there from elsewhere
+    assert _call(limiter, "/students/chat/t1", ip="10.0.0.10", headers=bearer)["status"] == 200
+
+
+def test_take_all_consumes_nothing_unless_every_bucket_allows():
+    limiter = RateLimitMiddleware(None, [RateLimitRule("POST", "/login", 1, 1.0)])
+    rule = limiter.rules[0]
+    assert limiter.take("a", rule, 0.0) == 0
+    assert limiter.take_all(["a", "b"], rule, 0.0) == pytest.approx(1.0)
+    assert limiter.take("b", rule, 0.0) == 0
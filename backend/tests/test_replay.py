@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from benchmarks.replay import Cassette, attach_player, drive, export_corpus, load_corpus, stage_report, turn_key
+from db.chats import get_chat_store
+
+
+def test_export_pairs_turns_per_thread(db, tmp_path):
+    store, now = get_chat_store(db), datetime.utcnow()
+    for thread_id, texts in (("a", ["hi", "hello", "bye"]), ("b", ["only question"])):
+        for i, text in enumerate(texts):
+            store.save(thread_id, "user" if i % 2 == 0 else "assistant", text, now + timedelta(seconds=i))
+
+    path = tmp_path / "corpus.jsonl"
+    assert export_corpus(db, str(path), threads=10, since=None, min_turns=1) == 2
+    assert load_corpus(str(path)) == [
+        {"thread_id": "a", "turns": [{"user": "hi", "assistant": "hello"}, {"user": "bye", "assistant": None}]},
+        {"thread_id": "b", "turns": [{"user": "only question", "assistant": None}]},
+    ]
+    assert export_corpus(db, str(path), threads=10, since=None, min_turns=2) == 1
+
+
+def test_replay_plays_recorded_turns_and_counts_misses(env, db, tmp_path, monkeypatch):
+    from routes import student_routes
+
+    for name in ("Runner", "agent", "AGENT_AVAILABLE"):
+        monkeypatch.setattr(student_routes, name, getattr(student_routes, name))
+
+    question = "When does the library open?"
+    # The route sends the stored history (which already holds this message) plus the new input
+    messages = [{"role": "user", "content": question}, {"role": "user", "content": question}]
+    cassette = Cassette(turns={turn_key(messages): {
+        "final_output": "At 9 AM.",
+        "steps": [{"kind": "llm", "provider": "gemini", "model": "m", "duration_ms": 5,
+                   "prompt_tokens": 10, "completion_tokens": 3}],
+    }})
+    path = tmp_path / "cassette.json"
+    cassette.save(str(path))
+    cassette = Cassette.load(str(path))
+
+    attach_player(cassette, student_routes, speed=0)
+    corpus = [{"thread_id": "r1", "turns": [{"user": question}]}, {"thread_id": "r2", "turns": [{"user": "unknown"}]}]
+    asyncio.run(drive(env.app, corpus, concurrency=2))
+
+    assert cassette.misses == 1
+    assert get_chat_store(db).history("r1")[-1]["content"] == "At 9 AM."
+    report = stage_report(db)
+    assert report["turns"]["count"] == 2
+    assert report["stages"]["llm:gemini"]["count"] == 1
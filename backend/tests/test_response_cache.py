@@ -0,0 +1,65 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from utils.events import student_written
+from utils.response_cache import ResponseCache, _etag_matches
+
+
+def _app(cache: ResponseCache, ttl: float = 60):
+    app = FastAPI()
+    calls = []
+
+    @app.get("/figure")
+    def figure(request: Request):
+        def build():
+            calls.append(1)
+            return {"value": len(calls)}
+
+        return cache.respond(request, "figure", ttl, build)
+
+    return TestClient(app), calls
+
+
+def test_hit_skips_build_and_304_on_matching_etag():
+    client, calls = _app(ResponseCache())
+    first = client.get("/figure")
+    assert first.json() == {"value": 1}
+    etag = first.headers["etag"]
+
+    assert client.get("/figure").json() == {"value": 1}
+    not_modified = client.get("/figure", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert len(calls) == 1
+
+
+def test_invalidate_rebuilds_and_changes_the_etag():
+    cache = ResponseCache()
+    client, calls = _app(cache)
+    etag = client.get("/figure").headers["etag"]
+    cache.invalidate("added", ["CS"])
+    fresh = client.get("/figure", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.json() == {"value": 2}
+    assert fresh.headers["etag"] != etag
+
+
+def test_expired_entry_is_rebuilt():
+    client, calls = _app(ResponseCache(), ttl=0)
+    client.get("/figure")
+    client.get("/figure")
+    assert len(calls) == 2
+
+
+def test_etag_matching():
+    assert _etag_matches("*", '"1-ab"')
+    assert _etag_matches('"0-xx", W/"1-ab"', '"1-ab"')
+    assert not _etag_matches(None, '"1-ab"')
+    assert not _etag_matches('"1-ac"', '"1-ab"')
+
+
+def test_student_writes_invalidate_the_analytics_cache(env, client, db):
+    from routes.analytics import analytics_cache
+
+    client.get("/analytics/analytics/total-students")
+    version = analytics_cache.version
+    student_written("added", ["CS"])
+    assert analytics_cache.version == version + 1
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from benchmarks import synthetic
+from db.counters import read_counters
+from db.threads import read_threads
+
+NOW = datetime(2026, 1, 15, 12, 0)
+
+
+def test_generators_are_deterministic_per_seed():
+    assert list(synthetic.students(50, seed=3, now=NOW)) == list(synthetic.students(50, seed=3, now=NOW))
+    assert list(synthetic.students(50, seed=3, now=NOW)) != list(synthetic.students(50, seed=4, now=NOW))
+    assert list(synthetic.chats(30, seed=3, now=NOW)) == list(synthetic.chats(30, seed=3, now=NOW))
+    assert list(synthetic.signups(5, seed=3, password_hash="x")) == list(synthetic.signups(5, seed=3, password_hash="x"))
+
+
+def test_chats_form_alternating_threads():
+    messages = list(synthetic.chats(synthetic.MESSAGES_PER_THREAD + 3, seed=1, now=NOW))
+    assert len(messages) == synthetic.MESSAGES_PER_THREAD + 3
+    first = messages[:synthetic.MESSAGES_PER_THREAD]
+    assert {m["thread_id"] for m in first} == {"thread-1-1"}
+    assert [m["role"] for m in first[:4]] == ["user", "assistant", "user", "assistant"]
+    assert all(a["timestamp"] < b["timestamp"] for a, b in zip(first, first[1:]))
+
+
+def test_populate_builds_derived_collections(db):
+    synthetic.populate(db, students_count=40, chats_count=30, signups_count=3, seed=2, batch_size=7,
+                       password_hash="x")
+
+    assert db["students"].count_documents({}) == 40
+    assert db["signup"].count_documents({}) == 3
+    total, departments = read_counters(db)
+    assert total == 40
+    assert sum(d["count"] for d in departments) == 40
+    buckets = list(db["daily_trends"].find())
+    assert sum(b.get("admissions", 0) for b in buckets) == 40
+    assert sum(b.get("chat_turns", 0) for b in buckets) == 15
+    threads = read_threads(db, synthetic.SYNTHETIC_OWNER, limit=10)
+    assert len(threads) == 3
+    assert sum(t["message_count"] for t in threads) == 30
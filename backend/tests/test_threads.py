@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from db.threads import THREADS_COLLECTION, read_threads, record_message
+from utils.auth_utils import create_access_token
+
+T0 = datetime(2026, 3, 1, 8, 0)
+
+
+def _bearer(user_id):
+    return {"Authorization": f"Bearer {create_access_token({'user_id': user_id})}"}
+
+
+def test_owner_is_stamped_by_the_first_message_only(db):
+    record_message(db, "t", "user", "hi", T0, owner="alice")
+    record_message(db, "t", "assistant", "hello", T0 + timedelta(seconds=1), owner="bob")
+    record_message(db, "anon", "user", "hi", T0)
+
+    summary = db[THREADS_COLLECTION].find_one({"_id": "t"})
+    assert (summary["owner"], summary["message_count"], summary["last_role"]) == ("alice", 2, "assistant")
+    assert "owner" not in db[THREADS_COLLECTION].find_one({"_id": "anon"})
+    assert [t["_id"] for t in read_threads(db, "alice", 10)] == ["t"]
+    assert read_threads(db, "bob", 10) == []
+
+
+def test_listing_requires_a_bearer_token(client):
+    assert client.get("/students/chats").status_code == 401
+    assert client.get("/students/chats", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def test_listing_pages_through_the_callers_threads(client, db):
+    for i in range(5):
+        # Two threads share a timestamp, so the cursor has to break the tie on _id
+        when = T0 + timedelta(minutes=min(i, 3))
+        record_message(db, f"a{i}", "user", f"question {i}", when, owner="alice")
+    record_message(db, "b0", "user", "not yours", T0 + timedelta(hours=1), owner="bob")
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/students/chats", params=params, headers=_bearer("alice")).json()
+        seen += [t["thread_id"] for t in page["threads"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["a4", "a3", "a2", "a1", "a0"]
+
+
+def test_chat_turn_stamps_the_caller_as_owner(client, db):
+    client.post("/students/chat/mine", json={"user_input": "What are the cafeteria timings?"}, headers=_bearer("alice"))
+    client.post("/students/chat/anonymous", json={"user_input": "What are the cafeteria timings?"})
+
+    listed = client.get("/students/chats", headers=_bearer("alice")).json()["threads"]
+    assert [t["thread_id"] for t in listed] == ["mine"]
+    assert listed[0]["message_count"] == 2
@@ -0,0 +1,42 @@
+from utils.tracing import TRACES_COLLECTION, finish_trace, span, start_trace, traced_tool
+
+
+def test_spans_nest_and_persist(db):
+    trace = start_trace("t1")
+    with span("outer", "db"):
+        with span("inner", "tool", rows=3) as s:
+            s.attrs["prompt_tokens"] = 5
+    trace.attrs["handled_by"] = "test"
+    doc = finish_trace(trace, db)
+
+    assert doc["thread_id"] == "t1" and doc["handled_by"] == "test" and doc["prompt_tokens"] == 5
+    outer, inner = doc["spans"]
+    assert (outer["name"], outer["parent"]) == ("outer", None)
+    assert (inner["name"], inner["parent"], inner["rows"]) == ("inner", "outer", 3)
+    assert inner["duration_ms"] <= outer["duration_ms"]
+    assert db[TRACES_COLLECTION].count_documents({"thread_id": "t1"}) == 1
+
+
+def test_spans_outside_a_turn_are_noops():
+    with span("loose") as s:
+        s.attrs["x"] = 1
+
+
+def test_traced_tool_records_payload_sizes(db):
+    @traced_tool("echo")
+    def echo(text):
+        return text * 2
+
+    trace = start_trace("t2")
+    assert echo("ab") == "abab"
+    (tool,) = finish_trace(trace, db)["spans"]
+    assert tool["kind"] == "tool" and tool["args_bytes"] > 0 and tool["result_bytes"] == len('"abab"')
+
+
+def test_chat_turn_is_traced(client):
+    client.post("/students/chat/t3", json={"user_input": "What is the library timing?"})
+    (trace,) = client.get("/students/traces/t3").json()
+    names = [s["name"] for s in trace["spans"]]
+    assert names[0] == "load_context" and {"auto_add", "agent_run", "save_reply", "load_history"} <= set(names)
+    assert trace["handled_by"] == "agent"
+    assert client.get("/students/traces/slowest").json()[0]["thread_id"] == "t3"
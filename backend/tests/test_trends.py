@@ -0,0 +1,75 @@
+from datetime import date, datetime, timedelta
+
+from db.chats import get_chat_store
+from db.trends import TRENDS_COLLECTION, backfill_trends, read_daily_buckets, record_admissions, record_chat_turn
+
+DAY = datetime(2026, 3, 2, 12)
+
+
+def test_writes_bump_the_days_bucket(db):
+    record_admissions(db, ["CS", "CS", None, "a.b"], DAY)
+    record_chat_turn(db, DAY)
+    record_chat_turn(db, DAY + timedelta(days=1))
+    first, second = read_daily_buckets(db, DAY.date(), DAY.date() + timedelta(days=1))
+    assert first["_id"] == "2026-03-02" and first["day"] == datetime(2026, 3, 2)
+    assert first["admissions"] == 4 and first["chat_turns"] == 1
+    assert first["admissions_by_department"] == {"CS": 2, "Unknown": 1, "a_b": 1}
+    assert second["chat_turns"] == 1 and "admissions" not in second
+
+
+def test_backfill_overwrites_drifted_buckets(db):
+    db["students"].insert_many([
+        {"id": 1, "department": "CS", "created_at": DAY},
+        {"id": 2, "created_at": DAY + timedelta(hours=1)},
+    ])
+    store = get_chat_store(db)
+    store.save("t1", "user", "hi", DAY)
+    store.save("t1", "assistant", "hello", DAY)
+    record_admissions(db, ["CS"] * 5, DAY)
+
+    assert backfill_trends(db, recount_archived_days=True) == 1
+    (bucket,) = read_daily_buckets(db, DAY.date(), DAY.date())
+    assert bucket["admissions"] == 2 and bucket["chat_turns"] == 1
+    assert bucket["admissions_by_department"] == {"CS": 1, "Unknown": 1}
+
+
+def test_backfill_since_zeroes_stale_buckets_in_range_only(db):
+    old, stale = DAY - timedelta(days=10), DAY + timedelta(days=1)
+    record_admissions(db, ["CS"], old)          # before --since: kept as is
+    record_admissions(db, ["CS"], stale)        # no students that day any more
+    db["students"].insert_one({"id": 1, "department": "CS", "created_at": DAY})
+
+    assert backfill_trends(db, since=DAY.date(), recount_archived_days=True) == 2
+    buckets = {b["_id"]: b for b in db[TRENDS_COLLECTION].find()}
+    assert [(day, b["admissions"]) for day, b in sorted(buckets.items())] == [
+        ("2026-02-20", 1), ("2026-03-02", 1), ("2026-03-03", 0),
+    ]
+    assert buckets["2026-03-03"]["admissions_by_department"] == {} and buckets["2026-03-03"]["chat_turns"] == 0
+
+
+def test_backfill_keeps_chat_turns_of_days_past_the_archive_horizon(db):
+    now = datetime.utcnow()
+    archived_day, recent_day = now - timedelta(days=60), now - timedelta(days=1)
+    record_chat_turn(db, archived_day)          # its thread has since been archived
+    record_chat_turn(db, recent_day)
+    record_chat_turn(db, recent_day)            # drift: only one message is stored
+    get_chat_store(db).save("t", "user", "hi", recent_day)
+
+    backfill_trends(db)
+    turns = {b["_id"]: b["chat_turns"] for b in db[TRENDS_COLLECTION].find()}
+    assert turns == {archived_day.date().isoformat(): 1, recent_day.date().isoformat(): 1}
+
+
+def test_trends_endpoint_zero_fills_and_groups_by_week(client, db):
+    from routes.analytics import analytics_cache
+
+    analytics_cache.invalidate()
+    record_admissions(db, ["CS"], datetime(2026, 3, 3))      # Tuesday
+    record_admissions(db, ["Math"], datetime(2026, 3, 10))   # next Tuesday
+    params = {"start": "2026-03-02", "end": "2026-03-15"}
+    daily = client.get("/analytics/analytics/trends", params=params).json()["points"]
+    assert len(daily) == 14 and sum(p["admissions"] for p in daily) == 2
+
+    weekly = client.get("/analytics/analytics/trends", params={**params, "granularity": "week"}).json()["points"]
+    assert [(p["period"], p["admissions"]) for p in weekly] == [("2026-03-02", 1), ("2026-03-09", 1)]
+    assert client.get("/analytics/analytics/trends", params={"start": "2026-03-02", "end": "2026-03-01"}).status_code == 400
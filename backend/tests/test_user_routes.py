@@ -0,0 +1,60 @@
+import pytest
+
+import db.db as db_module
+
+ALI = {"name": "Ali", "email": "ali@example.edu", "password": "s3cret"}
+
+
+def register(client, **overrides):
+    return client.post("/users/register", json={**ALI, **overrides}).json()
+
+
+def test_register_login_and_reset(client):
+    body = register(client)
+    assert body["status"] == "success" and body["data"]["token"]
+
+    assert client.post("/users/login", json={"email": "ALI@example.edu", "password": "s3cret"}).json()["status"] == "success"
+    assert client.post("/users/login", json={"email": ALI["email"], "password": "nope"}).json()["message"] == "Invalid password"
+
+    reset = client.post("/users/reset-password", json={"email": ALI["email"], "new_password": "n3w"}).json()
+    assert reset["status"] == "success"
+    assert client.post("/users/login", json={"email": ALI["email"], "password": "n3w"}).json()["status"] == "success"
+
+
+def test_duplicate_email_is_rejected_by_the_index(client, db):
+    assert db_module.email_index_ready()
+    register(client)
+    assert register(client, email="Ali@Example.edu")["message"] == "Email already registered"
+    assert db["signup"].count_documents({}) == 1
+
+
+@pytest.fixture
+def broken_email_index(env, db, monkeypatch):
+    """The unique email index cannot be built (legacy duplicates)."""
+    db["signup"].drop_indexes()
+    original = type(db["signup"]).create_index
+
+    def create_index(collection, keys, **kwargs):
+        if kwargs.get("name") == "email_unique":
+            raise RuntimeError("E11000 duplicate key error building email_unique")
+        return original(collection, keys, **kwargs)
+
+    monkeypatch.setattr(type(db["signup"]), "create_index", create_index)
+    yield
+    monkeypatch.undo()
+    db["signup"].delete_many({})
+    db_module.ensure_indexes(db)
+
+
+def test_one_failed_index_does_not_skip_the_rest(db, broken_email_index):
+    db[db_module.IDEMPOTENCY_COLLECTION].drop_indexes()
+    assert db_module.ensure_indexes(db) == ["signup.email_unique"]
+    assert not db_module.email_index_ready()
+    assert "created_at_ttl" in db[db_module.IDEMPOTENCY_COLLECTION].index_information()
+
+
+def test_registration_checks_for_duplicates_without_the_index(client, db, broken_email_index):
+    db_module.ensure_indexes(db)
+    register(client)
+    assert register(client)["message"] == "Email already registered"
+    assert db["signup"].count_documents({}) == 1
@@ -6,7 +6,13 @@ from langchain.text_splitter import CharacterTextSplitter
 from langchain.memory import ConversationBufferWindowMemory
 from agents import function_tool
 from dotenv import load_dotenv
+from utils.circuit_breaker import GROQ_BREAKER
+from utils.metrics import LLM_CALL_DURATION
+from utils.tracing import record_usage, span, traced_tool
+import logging
 import os
+
+logger = logging.getLogger(__name__)
     
 # ------------------ Load environment ------------------
 load_dotenv()
@@ -34,19 +40,20 @@ def load_documents(file_path: str = r"data\cafeteria.txt", chunk_size: int = 500
         splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
         split_docs = splitter.split_documents(documents)
         return split_docs
-    except Exception as e:
-        print("Error loading documents:", e)
+    except Exception:
+        logger.exception("Error loading documents from %s", file_path)
         return []
 
 split_docs = load_documents()
 
 # ------------------ RAG Tool ------------------
 @function_tool
+@traced_tool("rag_query")
 def rag_query(user_question: str):
     """
     Answer questions based on provided PDF/text documents using RAG.
     """
-    print("RAG Tool Invoked ")
+    logger.debug("rag_query invoked", extra={"question_chars": len(user_question)})
     if not user_question.strip():
         return {"Data": {}, "Error": True, "Message": "User question cannot be empty."}
 
@@ -65,7 +72,13 @@ Question: {user_question}
 
 Answer concisely and clearly."""
         
-        response = groq_llm.invoke(prompt)
+        # An open breaker raises CircuitOpenError here, answered by the except below
+        with GROQ_BREAKER.guard(), \
+                span("groq", "llm", model=groq_llm.model_name, prompt_chars=len(prompt)) as s, \
+                LLM_CALL_DURATION.time("groq", "rag_query"):
+            response = groq_llm.invoke(prompt)
+            usage = getattr(response, "usage_metadata", None) or {}
+            record_usage(s, usage.get("input_tokens"), usage.get("output_tokens"))
         answer = response.content if hasattr(response, "content") else str(response)
         return {"Data": {}, "Error": False, "Message": answer}
 
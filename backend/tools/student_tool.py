@@ -2,11 +2,20 @@ from agents import Agent, OpenAIChatCompletionsModel, ModelSettings, Runner, fun
 from openai import AsyncOpenAI
 from db.db import get_db
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 from typing import Any
 from email_utils.email import _send_welcome_email
+from db.counters import record_department_changed, record_student_removed, record_students_added
+from db.trends import record_admissions
+from pymongo import ReturnDocument
+from utils.events import student_written
+from utils.tracing import traced_tool
+import logging
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 # Database connection
 db = get_db()                  
@@ -14,14 +23,15 @@ collection = db["students"]
 
 
 @function_tool
+@traced_tool("read_students")
 def read_students():
-    print("Fetching all students...")
     """
     Fetch all students from the database.
 
     Returns:
         dict: {"Data": [students...], "Error": bool, "Message": str}
     """
+    logger.debug("read_students")
     try:
         students_list = []
         for stud in collection.find({}):
@@ -38,14 +48,15 @@ def read_students():
 
 
 @function_tool
+@traced_tool("read_student_by_id")
 def read_student_by_id(id: int):
-    print(f"Fetching student by id={id}...")
     """
     Fetch a student by numeric `id`.
 
     Args:
         id (int): Student's numeric id (not Mongo _id).
     """
+    logger.debug("read_student_by_id", extra={"student_id": id})
     try:
         student = collection.find_one({"id": id})
         if student:
@@ -100,8 +111,8 @@ def read_student_by_id(id: int):
 
 # ===== ADD STUDENT (auto-send welcome email after insert) =====
 @function_tool
+@traced_tool("add_student")
 def add_student(id: int, name: str, age: int, email: str, department: str | None = None):
-    print("Adding student...")
     """
     Add a new student to the database. After successful insert, automatically send a
     welcome/department email to the provided student email.
@@ -113,19 +124,26 @@ def add_student(id: int, name: str, age: int, email: str, department: str | None
         email (str)
         department (str | None)
     """
+    logger.debug("add_student", extra={"student_id": id, "department": department})
     try:
         # Ensure id uniqueness
         if collection.find_one({"id": id}):
             return {"Data": {}, "Error": True, "Message": f"Student with id={id} already exists"}
 
+        now = datetime.utcnow()
         doc = {
             "id": id,
             "name": name,
             "email": email.strip() if email else None,
             "department": department,
+            "created_at": now,
+            "last_active": now,
         }
         result = collection.insert_one(doc)
-        print("Student added:", result.inserted_id)
+        logger.info("Student added", extra={"student_id": id, "department": department})
+        record_students_added(db, [department])
+        record_admissions(db, [department], now)
+        student_written("added", [department])
 
         # Build return copy with string _id
         inserted = collection.find_one({"_id": result.inserted_id})
@@ -154,14 +172,17 @@ def add_student(id: int, name: str, age: int, email: str, department: str | None
 
 # ----- DELETE STUDENT -----
 @function_tool
+@traced_tool("delete_student")
 def delete_student(id: int):
-    print(f"Deleting student id={id}...")
     """
     Delete a student by numeric `id`.
     """
+    logger.debug("delete_student", extra={"student_id": id})
     try:
-        result = collection.delete_one({"id": id})
-        if result.deleted_count > 0:
+        deleted = collection.find_one_and_delete({"id": id}, projection={"department": 1})
+        if deleted is not None:
+            record_student_removed(db, deleted.get("department"))
+            student_written("removed", [deleted.get("department")])
             return {"Data": {"id": id}, "Error": False, "Message": "Student deleted successfully"}
         else:
             return {"Data": {}, "Error": True, "Message": "Student not found"}
@@ -171,8 +192,8 @@ def delete_student(id: int):
 
 
 @function_tool
+@traced_tool("update_student")
 def update_student(id: int, field: str, new_value: Any):
-    print(f"Updating student id={id}, field={field}...")
     """
     Update a single field for a student identified by `id`.
 
@@ -181,6 +202,7 @@ def update_student(id: int, field: str, new_value: Any):
         field (str): One of {"name","age","grade","department","email"}.
         new_value (Any): New value to set.
     """
+    logger.debug("update_student", extra={"student_id": id, "field": field})
     try:
         # Disallow changing primary keys and Mongo _id
         if field in {"_id", "id"}:
@@ -198,14 +220,19 @@ def update_student(id: int, field: str, new_value: Any):
                 return {"Data": {}, "Error": True, "Message": "Field 'age' must be an integer"}
 
         update_doc = {"$set": {field: new_value}}
-        result = collection.update_one({"id": id}, update_doc)
+        # BEFORE image gives the old department for the counters; the updated
+        # document is the same with the one field replaced
+        before = collection.find_one_and_update({"id": id}, update_doc, return_document=ReturnDocument.BEFORE)
 
-        if result.matched_count == 0:
+        if before is None:
             return {"Data": {}, "Error": True, "Message": f"Student with id={id} not found"}
 
-        updated = collection.find_one({"id": id})
-        if updated:
-            updated["_id"] = str(updated["_id"])
+        if field == "department":
+            record_department_changed(db, before.get("department"), new_value)
+            student_written("updated", [before.get("department"), new_value])
+        else:
+            student_written("updated")
+        updated = {**before, field: new_value, "_id": str(before["_id"])}
 
         return {
             "Data": {"id": id, "updated_field": field, "new_value": new_value, "student": updated},
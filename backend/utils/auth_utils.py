@@ -1,11 +1,17 @@
 from fastapi import Depends,HTTPException
 from fastapi.security import OAuth2PasswordBearer,APIKeyHeader
 from passlib.context import CryptContext
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from collections import OrderedDict
 from typing import Optional
+import asyncio
+import hashlib
+import logging
 import os
-import base64
-import json
+import threading
+import time
+import jwt
 
 
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret-key")
@@ -14,8 +20,20 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 API_KEY_NAME = "x-api-key"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# For routes open to anonymous callers that still want to know who is asking
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost factor; each +1 doubles the time of a hash/verify
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Worker processes for hashing (defaults to one per core)
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", "0")) or os.cpu_count() or 1
+# Jobs allowed in flight (running + queued) before new ones are shed
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "0")) or PASSWORD_POOL_WORKERS * 4
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password, hashed_password):
@@ -25,51 +43,126 @@ def hash_password(password):
     return pwd_context.hash(password)
 
 
+# ---------- Password process pool ----------
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing queue is full and the request should be shed."""
+
+
+_password_pool: ProcessPoolExecutor | None = None
+_password_pool_lock = threading.Lock()
+_password_slots = threading.BoundedSemaphore(PASSWORD_QUEUE_LIMIT)
+
+
+def _get_password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    if _password_pool is None:
+        with _password_pool_lock:
+            if _password_pool is None:
+                _password_pool = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS)
+    return _password_pool
+
+
+async def _run_in_password_pool(fn, *args):
+    """
+    Run a bcrypt call in the process pool without holding an event-loop or
+    threadpool thread. Raises PasswordPoolBusy when PASSWORD_QUEUE_LIMIT jobs
+    are already pending.
+    """
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordPoolBusy("Too many password operations in progress")
+    try:
+        future = _get_password_pool().submit(fn, *args)
+    except Exception:
+        _password_slots.release()
+        raise
+    future.add_done_callback(lambda _: _password_slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await _run_in_password_pool(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password) -> str:
+    return await _run_in_password_pool(hash_password, password)
+
+
+def shutdown_password_pool():
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is not None:
+            _password_pool.shutdown(wait=False, cancel_futures=True)
+            _password_pool = None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create a simple base64 encoded token for demo purposes"""
+    """Create an HS256-signed JWT with an integer `exp` claim"""
     try: 
         to_encode = data.copy()
-        expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-        to_encode.update({"exp": expire.isoformat()})
-        
-        # Simple base64 encoding for demo (not secure for production)
-        token_string = json.dumps(to_encode)
-        token_bytes = token_string.encode('utf-8')
-        return base64.b64encode(token_bytes).decode('utf-8')
-    except Exception as e:
-        print('An exception occurred creating token:', e)
+        lifetime = expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        to_encode.update({"exp": int(time.time() + lifetime.total_seconds())})
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    except Exception:
+        logger.exception('An exception occurred creating token')
         return None
 
+
+# ---------- Verified token cache ----------
+# Maps a digest of an already-verified token to its claims, so repeat requests
+# with the same token skip the HMAC check and JSON parse. Only the expiry is
+# re-checked on a hit.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+_token_cache: OrderedDict[bytes, dict] = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+
 def verify_access_token(token: str):
-    """Verify simple base64 token"""
-    try:
-        token_bytes = base64.b64decode(token.encode('utf-8'))
-        token_string = token_bytes.decode('utf-8')
-        payload = json.loads(token_string)
-        
-        # Check expiration
-        exp = datetime.fromisoformat(payload.get('exp'))
-        if datetime.utcnow() > exp:
-            print('Token expired')
+    """Verify a signed token; returns its claims or None if invalid/expired"""
+    digest = _token_digest(token)
+    with _token_cache_lock:
+        payload = _token_cache.get(digest)
+        if payload is not None:
+            if payload["exp"] > time.time():
+                _token_cache.move_to_end(digest)
+                return dict(payload)
+            del _token_cache[digest]
             return None
-            
-        return payload
-    except Exception as e:
-        print('Token verification error:', e)
-        return None    
 
-def verify_token(token: str = Depends(oauth2_scheme)):
     try:
-        decoded_token = verify_access_token(token)
-        if decoded_token:
-            return decoded_token
-        else:
-            raise HTTPException(status_code=401, detail="Token not parseable")
-    except Exception as e:
-        print('Token verification exception:', e)
-        raise HTTPException(status_code=401, detail="Invalid token")
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp"]})
+    except jwt.ExpiredSignatureError:
+        return None
+    except jwt.PyJWTError as e:
+        logger.warning('Token verification error: %s', e)
+        return None
+
+    with _token_cache_lock:
+        _token_cache[digest] = payload
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return dict(payload)
+
+def verify_token(token: str = Depends(oauth2_scheme)):
+    """FastAPI dependency returning the token claims; no DB lookup involved"""
+    decoded_token = verify_access_token(token)
+    if decoded_token:
+        return decoded_token
+    raise HTTPException(
+        status_code=401,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
     
 
+def optional_token(token: str | None = Depends(optional_oauth2_scheme)):
+    """FastAPI dependency returning the token claims, or None without a valid bearer token"""
+    return verify_access_token(token) if token else None
+
+
 def verify_api_key(api_key_header: str = Depends(api_key_header)):
     try:
         expected_key = os.getenv("API_KEY", "your-api-key-here")
@@ -78,5 +171,5 @@ def verify_api_key(api_key_header: str = Depends(api_key_header)):
         else:
             raise HTTPException(status_code=401, detail="Invalid API Key")
     except Exception as e:
-      print('API key verification error:', e)
+      logger.warning('API key verification error: %s', e)
       raise HTTPException(status_code=401, detail="Invalid API Key")
\ No newline at end of file
@@ -0,0 +1,193 @@
+# ------------ CIRCUIT BREAKERS ------------
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from utils.metrics import CIRCUIT_BREAKER_FAILURE_RATE, CIRCUIT_BREAKER_REJECTED, CIRCUIT_BREAKER_STATE
+
+# Defaults for every breaker; each dependency below may override them
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Rolling-window breaker for one external dependency.
+
+    Every call outcome is kept for `window` seconds; a call counts as failed
+    when it raised or took longer than `slow_call_seconds`. Once at least
+    `minimum_calls` are in the window and the failed share reaches
+    `failure_rate`, the breaker opens and `before_call()` raises
+    CircuitOpenError immediately. After `open_seconds` it lets
+    `half_open_calls` probes through: a successful probe closes it, a failed
+    one opens it again.
+    """
+
+    def __init__(self, name: str, slow_call_seconds: float | None = None, failure_rate: float = CIRCUIT_FAILURE_RATE,
+                 minimum_calls: int = CIRCUIT_MIN_CALLS, window: float = CIRCUIT_WINDOW_SECONDS,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS, half_open_calls: int = 1):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.failure_rate = failure_rate
+        self.minimum_calls = minimum_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._calls: deque[tuple[float, bool]] = deque()
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        CIRCUIT_BREAKER_STATE.set(0, name)
+        CIRCUIT_BREAKER_FAILURE_RATE.set(0.0, name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current(time.monotonic())
+
+    def _current(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+            self._probes = 0
+        return self._state
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        CIRCUIT_BREAKER_STATE.set(_STATE_VALUES[state], self.name)
+
+    def _reject(self, now: float):
+        CIRCUIT_BREAKER_REJECTED.inc(self.name)
+        return CircuitOpenError(self.name, max(self.open_seconds - (now - self._opened_at), 0.0))
+
+    def check(self) -> None:
+        """Raise CircuitOpenError while open; for callers whose outcomes are recorded elsewhere."""
+        now = time.monotonic()
+        with self._lock:
+            if self._current(now) == OPEN:
+                raise self._reject(now)
+
+    def before_call(self) -> None:
+        """Admit one call (or half-open probe), else raise CircuitOpenError."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._current(now)
+            if state == OPEN or (state == HALF_OPEN and self._probes >= self.half_open_calls):
+                raise self._reject(now)
+            if state == HALF_OPEN:
+                self._probes += 1
+
+    def record(self, failed: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            state = self._current(now)
+            if state == HALF_OPEN:
+                if failed:
+                    self._open(now)
+                else:
+                    self._close()
+                return
+            if state == OPEN:
+                # Result of a call admitted before the breaker opened
+                return
+            calls = self._calls
+            calls.append((now, failed))
+            self._failures += failed
+            cutoff = now - self.window
+            while calls and calls[0][0] < cutoff:
+                self._failures -= calls.popleft()[1]
+            rate = self._failures / len(calls)
+            CIRCUIT_BREAKER_FAILURE_RATE.set(round(rate, 4), self.name)
+            if len(calls) >= self.minimum_calls and rate >= self.failure_rate:
+                self._open(now)
+
+    def record_call(self, duration: float, error: bool) -> None:
+        slow = self.slow_call_seconds is not None and duration >= self.slow_call_seconds
+        self.record(error or slow)
+
+    def _open(self, now: float) -> None:
+        self._set_state(OPEN)
+        self._opened_at = now
+
+    def _close(self) -> None:
+        self._set_state(CLOSED)
+        self._calls.clear()
+        self._failures = 0
+        CIRCUIT_BREAKER_FAILURE_RATE.set(0.0, self.name)
+
+    def _release_probe(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def guard(self, is_failure: Callable[[BaseException], bool] | None = None) -> "_Guard":
+        """
+        Context manager around one call: admits it, then records its outcome.
+        `is_failure` decides which exceptions count against the dependency
+        (default: every Exception).
+        """
+        return _Guard(self, is_failure)
+
+
+class _Guard:
+    __slots__ = ("breaker", "is_failure", "start")
+
+    def __init__(self, breaker: CircuitBreaker, is_failure):
+        self.breaker = breaker
+        self.is_failure = is_failure
+
+    def __enter__(self):
+        self.breaker.before_call()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            # Cancelled or interrupted; says nothing about the dependency
+            self.breaker._release_probe()
+            return False
+        error = exc is not None and (self.is_failure is None or self.is_failure(exc))
+        self.breaker.record_call(time.perf_counter() - self.start, error)
+        return False
+
+
+def retry_after_header(error: CircuitOpenError) -> str:
+    return str(max(1, math.ceil(error.retry_after)))
+
+
+def breaker_model_calls(model, breaker: CircuitBreaker):
+    """Wrap an agents-SDK model instance so every `get_response` goes through `breaker`."""
+    original = model.get_response
+
+    async def get_response(*args, **kwargs):
+        with breaker.guard():
+            return await original(*args, **kwargs)
+
+    model.get_response = get_response
+    return model
+
+
+# ---------- Application breakers ----------
+GEMINI_BREAKER = CircuitBreaker("gemini", slow_call_seconds=float(os.getenv("GEMINI_SLOW_CALL_SECONDS", "20")))
+GROQ_BREAKER = CircuitBreaker("groq", slow_call_seconds=float(os.getenv("GROQ_SLOW_CALL_SECONDS", "15")))
+SMTP_BREAKER = CircuitBreaker("smtp", slow_call_seconds=float(os.getenv("SMTP_SLOW_CALL_SECONDS", "10")))
+# Fed by the driver's command and heartbeat listeners (db/db.py), not by guard()
+MONGO_BREAKER = CircuitBreaker("mongodb", open_seconds=float(os.getenv("MONGO_CIRCUIT_OPEN_SECONDS", "10")))
+# ------------ END CIRCUIT BREAKERS ------------------------------------------------------
@@ -0,0 +1,30 @@
+# ------------ STUDENT WRITE EVENTS ------------
+# Every code path that inserts, updates or deletes a student calls
+# `student_written` after the write succeeds. Caches and other derived views
+# register with `on_student_write` instead of being imported by each writer.
+import logging
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+_listeners: list[Callable[..., None]] = []
+
+
+def on_student_write(listener: Callable[..., None]) -> Callable[..., None]:
+    """Register `listener(action, departments)`; usable as a decorator."""
+    _listeners.append(listener)
+    return listener
+
+
+def student_written(action: str, departments: list[str | None] | tuple = ()) -> None:
+    """
+    Notify listeners of a student write. `action` is "added", "updated" or
+    "removed"; `departments` lists the departments whose counts changed.
+    Listener errors are logged and never fail the write.
+    """
+    for listener in _listeners:
+        try:
+            listener(action, departments)
+        except Exception:
+            logger.exception("Student write listener %r failed", listener)
+# ------------ END STUDENT WRITE EVENTS ------------------------------------------------
@@ -0,0 +1,59 @@
+# ------------ FAST JSON RESPONSES ------------
+# orjson serializes datetimes and dicts natively; ObjectId and the few other
+# types our payloads carry go through `_default`. Without orjson installed the
+# stdlib encoder is used with the same `_default`, which still skips FastAPI's
+# recursive `jsonable_encoder` pass.
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(value) -> bytes:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(value) -> bytes:
+        return _encoder.encode(value).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    App-wide default response class. Handlers that return a plain dict still
+    get FastAPI's `jsonable_encoder` pass first; large payloads (chat history)
+    should return `FastJSONResponse(content)` directly to skip it.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+# ------------ END FAST JSON RESPONSES ------------------------------------------------
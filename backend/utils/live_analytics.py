@@ -0,0 +1,137 @@
+# ------------ LIVE ANALYTICS (coalesced push to dashboards) ------------
+import asyncio
+import itertools
+import time
+from typing import Callable
+
+
+class Subscriber:
+    """One connected dashboard: a bounded queue of (event, payload) plus counters."""
+
+    __slots__ = ("id", "queue", "connected_at", "sent", "dropped")
+
+    def __init__(self, subscriber_id: int, queue_size: int):
+        self.id = subscriber_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+
+
+class LiveAnalyticsPublisher:
+    """
+    Fans student-write notifications out to every subscriber.
+
+    `notify` may be called from any thread. The first write after a quiet
+    period schedules one flush `coalesce_window` seconds later; writes landing
+    before it fires ride along, so a 500-row import produces a handful of
+    pushes. A flush reloads the counters once (`load_state`) and pushes only
+    what changed since the last push.
+
+    A subscriber whose queue is full is not waited on: its queued events are
+    discarded and replaced by one full snapshot, and the discarded count is
+    reported as backpressure in `stats()`.
+    """
+
+    def __init__(self, load_state: Callable[[], dict], coalesce_window: float = 0.25, queue_size: int = 16):
+        self.load_state = load_state
+        self.coalesce_window = coalesce_window
+        self.queue_size = queue_size
+        self.writes_seen = 0
+        self.flushes = 0
+        self._ids = itertools.count(1)
+        self._subscribers: dict[int, Subscriber] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._flush_scheduled = False
+        self._state: dict | None = None
+        self._version = 0
+
+    # ---------- write side ----------
+    def notify(self, *_args, **_kwargs) -> None:
+        """Student-write listener; cheap no-op when nobody is subscribed."""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        self.writes_seen += 1
+        loop.call_soon_threadsafe(self._schedule_flush)
+
+    def _schedule_flush(self) -> None:
+        if self._flush_scheduled:
+            return
+        self._flush_scheduled = True
+        self._loop.call_later(self.coalesce_window, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self) -> None:
+        # Cleared before reading so writes during the read schedule another flush
+        self._flush_scheduled = False
+        state = await self._loop.run_in_executor(None, self.load_state)
+        previous = self._state or {"total_students": 0, "departments": {}}
+        changed = {
+            dept: count for dept, count in state["departments"].items()
+            if previous["departments"].get(dept) != count
+        }
+        changed.update({dept: 0 for dept in previous["departments"] if dept not in state["departments"]})
+        if not changed and state["total_students"] == previous["total_students"]:
+            return
+
+        self._state = state
+        self._version += 1
+        self.flushes += 1
+        delta = {"version": self._version, "total_students": state["total_students"], "changed": changed}
+        for subscriber in list(self._subscribers.values()):
+            self._offer(subscriber, "delta", delta)
+
+    def _snapshot(self) -> dict:
+        state = self._state or {"total_students": 0, "departments": {}}
+        return {"version": self._version, **state}
+
+    def _offer(self, subscriber: Subscriber, event: str, payload: dict) -> None:
+        try:
+            subscriber.queue.put_nowait((event, payload))
+            subscriber.sent += 1
+            return
+        except asyncio.QueueFull:
+            pass
+        # Slow consumer: collapse everything it has not read into one snapshot
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+            subscriber.dropped += 1
+        subscriber.queue.put_nowait(("snapshot", self._snapshot()))
+        subscriber.sent += 1
+
+    # ---------- subscriber side ----------
+    async def subscribe(self) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        state = await self._loop.run_in_executor(None, self.load_state)
+        if not self._subscribers:
+            # Writes are ignored while nobody listens, so this is the new baseline.
+            # Otherwise the baseline stays what existing subscribers last got, or a
+            # pending flush would compare against this load and drop their delta.
+            self._state = state
+        subscriber = Subscriber(next(self._ids), self.queue_size)
+        self._offer(subscriber, "snapshot", {"version": self._version, **state})
+        self._subscribers[subscriber.id] = subscriber
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.pop(subscriber.id, None)
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "writes_seen": self.writes_seen,
+            "flushes": self.flushes,
+            "version": self._version,
+            "subscribers": [
+                {
+                    "id": s.id,
+                    "connected_seconds": round(now - s.connected_at, 1),
+                    "queued": s.queue.qsize(),
+                    "queue_size": self.queue_size,
+                    "sent": s.sent,
+                    "dropped": s.dropped,
+                }
+                for s in self._subscribers.values()
+            ],
+        }
+# ------------ END LIVE ANALYTICS ------------------------------------------------------
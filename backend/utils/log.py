@@ -0,0 +1,133 @@
+# ------------ STRUCTURED LOGGING (queue handler + background writer) ------------
+# Request code only builds a LogRecord and puts it on a queue; a single
+# QueueListener thread formats and writes it. Modules log through
+# `logging.getLogger(__name__)`, so per-module levels follow the package
+# layout (db, tools, email_utils, ...).
+#
+#   LOG_LEVEL=INFO                         root level
+#   LOG_LEVELS=db=WARNING,tools=DEBUG      per-logger overrides
+#   LOG_FORMAT=json | text
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# Set per HTTP request by RequestIdMiddleware; threadpool calls inherit it
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+# Chat thread a request works on, set by the chat route
+thread_id_var: ContextVar[str] = ContextVar("thread_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "thread_id"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class _RequestIdFilter(logging.Filter):
+    """Runs in the calling thread, where the request's context is visible."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        if not hasattr(record, "thread_id"):
+            record.thread_id = thread_id_var.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare folds the traceback into `msg` and drops exc_info, so
+    formatters on the writer thread never see it. Here the message is merged
+    the same way but the traceback is rendered into `exc_text` instead.
+    """
+
+    _traceback_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            # Render now rather than keep the traceback (and its frames) alive on the queue
+            record.exc_text = record.exc_text or self._traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "thread_id": getattr(record, "thread_id", "-"),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s [%(request_id)s %(thread_id)s %(threadName)s] %(name)s: %(message)s"
+
+
+def parse_levels(value: str) -> dict[str, str]:
+    """Parse "db=WARNING,tools.student_tool=DEBUG" into {logger: level}."""
+    levels = {}
+    for item in value.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """Route all logging through the background writer; safe to call twice."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    # Unbounded: a slow stdout delays the writer thread, never the request
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(_RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+# ------------ END STRUCTURED LOGGING -------------------------------------------------
@@ -0,0 +1,108 @@
+# ------------ REQUEST PROFILER (sampling, folded-stack output) ------------
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+# Shared admin secret; profiling is not wired into the app at all when unset
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+# Leaf functions of a parked worker thread; those samples are not request work
+_IDLE_LEAVES = {"wait", "_wait_for_tstate_lock", "select", "poll"}
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampler: a daemon thread snapshots every thread's stack each
+    `interval` seconds and counts identical stacks.
+
+    Sync route handlers and Mongo calls run on threadpool workers, so all
+    threads are sampled; parked workers are skipped. The event loop thread is
+    always kept, so time spent awaiting I/O (e.g. an LLM call) shows up under
+    its selector frame. Other requests served meanwhile are sampled too, which
+    is fine for the intended use: reproducing one slow request locally.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, loop_thread_id: int) -> None:
+        self._loop_thread_id = loop_thread_id
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            self.sample_count += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id != self._loop_thread_id and frame.f_code.co_name in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Brendan Gregg's collapsed format (flamegraph.pl, speedscope, inferno)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """The last `keep` captured profiles, by id, for download."""
+
+    def __init__(self, keep: int):
+        self.keep = keep
+        self._profiles: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, method: str, path: str, duration_ms: float, profiler: SamplingProfiler) -> str:
+        profile_id = uuid.uuid4().hex
+        with self._lock:
+            self._profiles[profile_id] = {
+                "id": profile_id,
+                "method": method,
+                "path": path,
+                "captured_at": time.time(),
+                "duration_ms": duration_ms,
+                "samples": profiler.sample_count,
+                "folded": profiler.folded(),
+            }
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> dict | None:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            return [{k: v for k, v in p.items() if k != "folded"} for p in reversed(self._profiles.values())]
+
+
+profile_store = ProfileStore(PROFILE_KEEP)
+# ------------ END REQUEST PROFILER ----------------------------------------------------
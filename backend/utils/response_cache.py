@@ -0,0 +1,67 @@
+# ------------ RESPONSE CACHE (TTL + ETag) ------------
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from utils.json_response import dumps
+
+
+def _to_json_bytes(value: Any) -> bytes:
+    if isinstance(value, BaseModel):
+        return value.model_dump_json().encode("utf-8")
+    return dumps(value)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    """
+    Serialized JSON responses keyed by endpoint + query, each with its own TTL.
+
+    `version` is the data-version stamp: `invalidate()` bumps it and drops every
+    entry, and it prefixes each ETag together with a digest of the body, so a
+    client's ETag only matches while both the data and the payload are unchanged.
+    Invalidation is per process; in multi-worker deployments the TTL bounds how
+    stale another worker's entry can be.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._entries: dict[Hashable, tuple[float, str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, *_args, **_kwargs) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def respond(self, request: Request, key: Hashable, ttl: float, build: Callable[[], Any]) -> Response:
+        """Serve `key` from cache (or 304), calling `build()` only on a miss."""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= now:
+            version = self.version
+            body = _to_json_bytes(build())
+            etag = f'"{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            entry = (now + ttl, etag, body)
+            with self._lock:
+                # Skip storing if a write invalidated the cache while we built
+                if version == self.version:
+                    self._entries[key] = entry
+
+        headers = {"ETag": entry[1], "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), entry[1]):
+            return Response(status_code=304, headers=headers)
+        return Response(entry[2], media_type="application/json", headers=headers)
+# ------------ END RESPONSE CACHE ------------------------------------------------------
@@ -0,0 +1,170 @@
+# ------------ CHAT TURN TRACING ------------
+import json
+import logging
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+
+from utils.metrics import LLM_CALL_DURATION, TOOL_CALL_DURATION
+
+TRACES_COLLECTION = "chat_traces"
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("current_trace", default=None)
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+def _payload_size(value) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return len(str(value))
+
+
+class Span:
+    """One timed step of a turn; `attrs` may be filled in while it is open."""
+
+    __slots__ = ("trace", "name", "kind", "parent", "start", "duration_ms", "attrs", "_token")
+
+    def __init__(self, trace: "Trace", name: str, kind: str, attrs: dict):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        parent = _current_span.get()
+        self.parent = parent.name if parent is not None and parent.trace is trace else None
+        self.attrs = attrs
+        self.duration_ms = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = round((time.perf_counter() - self.start) * 1000, 3)
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace.spans.append(self)
+        return False
+
+    def to_doc(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "parent": self.parent,
+            "offset_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": self.duration_ms,
+            **self.attrs,
+        }
+
+
+class _NoopSpan:
+    """Returned outside a traced turn so call sites need no branching."""
+
+    __slots__ = ("attrs",)
+
+    def __init__(self):
+        self.attrs = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Trace:
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.spans: list[Span] = []
+        self.attrs: dict = {}
+
+    def to_doc(self) -> dict:
+        spans = sorted(self.spans, key=lambda s: s.start)
+        return {
+            "thread_id": self.thread_id,
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "prompt_tokens": sum(s.attrs.get("prompt_tokens") or 0 for s in spans),
+            "completion_tokens": sum(s.attrs.get("completion_tokens") or 0 for s in spans),
+            "spans": [s.to_doc() for s in spans],
+            **self.attrs,
+        }
+
+
+def start_trace(thread_id: str) -> Trace:
+    trace = Trace(thread_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def span(name: str, kind: str = "step", **attrs):
+    """Open a span in the current turn's trace (no-op when not tracing)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NoopSpan()
+    return Span(trace, name, kind, attrs)
+
+
+def finish_trace(trace: Trace, db) -> dict:
+    """Persist the trace (one insert per turn); failures never break the chat."""
+    _current_trace.set(None)
+    doc = trace.to_doc()
+    try:
+        db[TRACES_COLLECTION].insert_one(doc)
+    except Exception:
+        logger.exception("Failed to persist chat trace")
+    doc.pop("_id", None)
+    return doc
+
+
+# ---------- Instrumentation helpers ----------
+# Traced tool callables by name, for offline replay (benchmarks.replay)
+TOOL_FUNCTIONS: dict = {}
+
+
+def traced_tool(name: str):
+    """
+    Decorator for agent tools: records a `tool` span with argument and result
+    payload sizes, and the tool latency metric. Place it under @function_tool.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, "tool", args_bytes=_payload_size([args, kwargs])) as s, TOOL_CALL_DURATION.time(name):
+                result = fn(*args, **kwargs)
+                s.attrs["result_bytes"] = _payload_size(result)
+                return result
+        TOOL_FUNCTIONS[name] = wrapper
+        return wrapper
+    return decorator
+
+
+def record_usage(s, prompt_tokens, completion_tokens) -> None:
+    s.attrs["prompt_tokens"] = prompt_tokens
+    s.attrs["completion_tokens"] = completion_tokens
+
+
+def trace_model_calls(model, provider: str):
+    """
+    Wrap an agents-SDK model instance so every `get_response` (one LLM call)
+    becomes an `llm` span with token usage and feeds the LLM latency metric.
+    """
+    original = model.get_response
+
+    async def get_response(*args, **kwargs):
+        with span(provider, "llm", model=str(getattr(model, "model", ""))) as s, \
+                LLM_CALL_DURATION.time(provider, "get_response"):
+            response = await original(*args, **kwargs)
+            usage = getattr(response, "usage", None)
+            record_usage(s, getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None))
+            return response
+
+    model.get_response = get_response
+    return model
+# ------------ END CHAT TURN TRACING ---------------------------------------------------
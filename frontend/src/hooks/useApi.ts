@@ -2,9 +2,10 @@
  * React Query hooks for API calls
  */
 
+import { useEffect } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { toast } from 'sonner';
-import { api, type LoginCredentials, type RegisterCredentials, type ResetPasswordRequest, type ChatRequest, ApiError } from '@/services/api';
+import { api, API_BASE_URL, type DashboardResponse, type LiveAnalyticsEvent, type LoginCredentials, type RegisterCredentials, type ResetPasswordRequest, type ChatRequest, ApiError } from '@/services/api';
 
 // Query keys for cache management
 export const queryKeys = {
@@ -13,6 +14,7 @@ export const queryKeys = {
     studentsByDepartment: ['analytics', 'students-by-department'],
     recentStudents: (limit?: number) => ['analytics', 'recent-students', limit],
     activeStudents: ['analytics', 'active-students'],
+    dashboard: (recentLimit?: number) => ['analytics', 'dashboard', recentLimit],
   },
   chat: {
     history: (threadId: string) => ['chat', 'history', threadId],
@@ -21,52 +23,84 @@ export const queryKeys = {
 
 // Analytics Hooks
 export const useAnalytics = () => {
-  const totalStudents = useQuery({
-    queryKey: queryKeys.analytics.totalStudents,
-    queryFn: () => api.analytics.getTotalStudents(),
-    staleTime: 5 * 60 * 1000, // 5 minutes
-    retry: 3,
-  });
-
-  const studentsByDepartment = useQuery({
-    queryKey: queryKeys.analytics.studentsByDepartment,
-    queryFn: () => api.analytics.getStudentsByDepartment(),
-    staleTime: 5 * 60 * 1000,
-    retry: 3,
-  });
-
-  const recentStudents = useQuery({
-    queryKey: queryKeys.analytics.recentStudents(5),
-    queryFn: () => api.analytics.getRecentStudents(5),
+  // One request for everything the dashboard renders; the server answers it
+  // from the maintained counters plus two indexed reads, cached briefly
+  const dashboard = useQuery({
+    queryKey: queryKeys.analytics.dashboard(5),
+    queryFn: () => api.analytics.getDashboard(5),
     staleTime: 2 * 60 * 1000, // 2 minutes
     retry: 3,
   });
 
-  const activeStudents = useQuery({
-    queryKey: queryKeys.analytics.activeStudents,
-    queryFn: () => api.analytics.getActiveStudentsLast7Days(),
-    staleTime: 5 * 60 * 1000,
-    retry: 3,
-  });
+  useLiveAnalytics(5);
+
+  const snapshot = dashboard.data;
 
+  // Same shapes as the per-endpoint responses so pages can stay unchanged
   return {
-    totalStudents,
-    studentsByDepartment,
-    recentStudents,
-    activeStudents,
-    isLoading:
-      totalStudents.isLoading ||
-      studentsByDepartment.isLoading ||
-      recentStudents.isLoading ||
-      activeStudents.isLoading,
-    isError:
-      totalStudents.isError ||
-      studentsByDepartment.isError ||
-      recentStudents.isError ||
-      activeStudents.isError,
+    dashboard,
+    totalStudents: {
+      data: snapshot && { total_students: snapshot.total_students, as_of: snapshot.as_of },
+    },
+    studentsByDepartment: {
+      data: snapshot && {
+        results: snapshot.departments,
+        total_departments: snapshot.total_departments,
+        total_students: snapshot.total_students,
+        as_of: snapshot.as_of,
+      },
+    },
+    recentStudents: {
+      data: snapshot?.recent,
+    },
+    activeStudents: {
+      data: snapshot && { count: snapshot.active_last_7_days, students: [] },
+    },
+    isLoading: dashboard.isLoading,
+    isError: dashboard.isError,
   };
 };
 
+// Applies pushed totals/department counts to the cached dashboard instead of polling
+export const useLiveAnalytics = (recentLimit: number = 5) => {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return;
+    const source = new EventSource(`${API_BASE_URL}/analytics/analytics/live`);
+
+    const apply = (event: MessageEvent) => {
+      const update: LiveAnalyticsEvent = JSON.parse(event.data);
+      queryClient.setQueryData<DashboardResponse>(
+        queryKeys.analytics.dashboard(recentLimit),
+        (old) => {
+          if (!old) return old;
+          const counts: Record<string, number> = update.departments
+            ? { ...update.departments }
+            : Object.fromEntries(old.departments.map((d) => [d.department, d.count]));
+          Object.entries(update.changed ?? {}).forEach(([department, count]) => {
+            if (count > 0) counts[department] = count;
+            else delete counts[department];
+          });
+          const departments = Object.entries(counts)
+            .map(([department, count]) => ({ department, count }))
+            .sort((a, b) => b.count - a.count || a.department.localeCompare(b.department));
+          return {
+            ...old,
+            total_students: update.total_students,
+            total_departments: departments.length,
+            departments,
+          };
+        },
+      );
+    };
+
+    source.addEventListener('snapshot', apply);
+    source.addEventListener('delta', apply);
+    return () => source.close();
+  }, [queryClient, recentLimit]);
+};
+
 // Helper to surface API errors
 const extractDetailMessage = (detail: unknown): string | undefined => {
   if (!detail) return undefined;
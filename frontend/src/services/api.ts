@@ -3,7 +3,7 @@
  * Backend URL: http://127.0.0.1:5050
  */
 
-const API_BASE_URL = 'http://127.0.0.1:5050';
+export const API_BASE_URL = 'http://127.0.0.1:5050';
 
 // Types based on backend models
 export interface User {
@@ -57,6 +57,19 @@ export interface ChatResponse {
   history: ChatMessage[];
 }
 
+export interface ThreadSummary {
+  thread_id: string;
+  message_count: number;
+  last_activity: string;
+  last_role: 'user' | 'assistant' | null;
+  preview: string;
+}
+
+export interface ThreadListResponse {
+  threads: ThreadSummary[];
+  next_cursor: string | null;
+}
+
 export interface DepartmentCount {
   department: string;
   count: number;
@@ -77,11 +90,29 @@ export interface TotalStudentsResponse {
 export interface RecentStudentsResponse {
   count: number;
   students: Student[];
+  next_cursor?: string | null;
 }
 
 export interface ActiveStudentsResponse {
   count: number;
   students: Student[];
+  next_cursor?: string | null;
+}
+
+export interface LiveAnalyticsEvent {
+  version: number;
+  total_students: number;
+  departments?: Record<string, number>; // snapshot events
+  changed?: Record<string, number>;     // delta events (0 = department gone)
+}
+
+export interface DashboardResponse {
+  total_students: number;
+  total_departments: number;
+  departments: DepartmentCount[];
+  recent: RecentStudentsResponse;
+  active_last_7_days: number;
+  as_of: string;
 }
 
 // Generic API response type
@@ -240,6 +271,12 @@ class ApiClient {
 // Create API client instance
 const apiClient = new ApiClient(API_BASE_URL);
 
+// Bearer header for the signed-in user, if any (the token useAuth stores)
+const authHeaders = (): Record<string, string> => {
+  const token = localStorage.getItem('authToken');
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
 // Auth API
 export const authApi = {
   async register(credentials: RegisterCredentials): Promise<ApiResponse<User>> {
@@ -258,12 +295,24 @@ export const authApi = {
 // Student API
 export const studentApi = {
   async chat(threadId: string, request: ChatRequest): Promise<ChatResponse> {
-    return apiClient.post<ChatResponse>(`/students/chat/${threadId}`, request);
+    return apiClient.post<ChatResponse>(`/students/chat/${threadId}`, request, authHeaders());
+  },
+
+  async listThreads(limit: number = 20, cursor?: string): Promise<ThreadListResponse> {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    return apiClient.get<ThreadListResponse>(`/students/chats?${params}`, authHeaders());
   },
 };
 
 // Analytics API
 export const analyticsApi = {
+  async getDashboard(recentLimit: number = 5): Promise<DashboardResponse> {
+    return apiClient.get<DashboardResponse>(`/analytics/analytics/dashboard?recent_limit=${recentLimit}`);
+  },
+
   async getTotalStudents(): Promise<TotalStudentsResponse> {
     return apiClient.get<TotalStudentsResponse>('/analytics/analytics/total-students');
   },